@@ -0,0 +1 @@
+"""Micro-benchmarks and the load harness. Run from the repository root, e.g. `python -m benchmarks.micro`."""
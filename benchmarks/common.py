@@ -0,0 +1,86 @@
+import json
+import math
+import platform
+import resource
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+BASELINE_DIR = Path(__file__).parent / "baselines"
+
+
+def percentile(samples: list[float], percent: float) -> float:
+    """Nearest-rank percentile of a list of samples (0.0 when empty)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process and its reaped children (CPU executor workers), in MiB."""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return max(own, children) / scale
+
+
+def environment() -> dict[str, Any]:
+    """Context stored next to the results, to spot baselines taken on another machine."""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def save_results(path: Path, results: dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2, sort_keys=True))
+    print(f"Saved {path}")
+
+
+def load_results(path: Path) -> dict[str, Any] | None:
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def compare(
+    current: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    higher_is_better: frozenset[str],
+    tolerance: float,
+) -> list[str]:
+    """
+    Prints the relative change of every metric against the baseline.
+
+    Args:
+        current: Results by case, then by metric.
+        baseline: Baseline results with the same layout.
+        higher_is_better: Metrics where a decrease is a regression (e.g. req/s).
+        tolerance: Relative change tolerated before flagging a regression (0.1 = 10%).
+
+    Returns:
+        Descriptions of the regressions found.
+    """
+    regressions = []
+    for case, metrics in current.items():
+        base_metrics = baseline.get(case)
+        if not base_metrics:
+            continue
+        for metric, value in metrics.items():
+            base = base_metrics.get(metric)
+            if not isinstance(base, (int, float)) or not base:
+                continue
+            change = (value - base) / base
+            worse = -change if metric in higher_is_better else change
+            flag = "REGRESSION" if worse > tolerance else ""
+            print(f"{case:<48} {metric:<12} {base:>12.3f} -> {value:>12.3f} ({change:+.1%}) {flag}")
+            if flag:
+                regressions.append(f"{case} {metric} {change:+.1%}")
+    return regressions
@@ -0,0 +1,168 @@
+"""
+Local stand-ins of the Vertex AI and Gradio clients, with configurable
+latency and error injection, so load tests never reach the real providers.
+"""
+import asyncio
+import io
+import random
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from dataclasses import dataclass
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+from PIL import Image
+
+from src.application.services.external import GoogleService, GradioService, ProviderRegistry, ProviderState
+
+
+class FakeUpstreamError(Exception):
+    """Error injected by a fake provider; `code` drives the resilience layer like an SDK error would."""
+
+    def __init__(self, message: str, code: int = 503) -> None:
+        super().__init__(message)
+        self.code = code
+
+
+@dataclass(frozen=True)
+class FakeBehavior:
+    """Latency and error injection of a fake provider."""
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    error_code: int = 503
+
+    def delay(self) -> float:
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+    def maybe_fail(self) -> None:
+        if self.error_rate and random.random() < self.error_rate:
+            raise FakeUpstreamError(f"injected upstream error {self.error_code}", self.error_code)
+
+
+def _solid_image(size: tuple[int, int], image_format: str) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (90, 140, 200)).save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+class FakeGenaiModels:
+    """Imitates `genai.Client().aio.models`: returns `number_of_images` flat images the size of the input canvas."""
+
+    def __init__(self, behavior: FakeBehavior) -> None:
+        self.behavior = behavior
+        self.calls = 0
+
+    async def get(self, model: str) -> SimpleNamespace:
+        return SimpleNamespace(name=model)
+
+    async def edit_image(self, model: str, prompt: str, reference_images: list[Any], config: Any) -> SimpleNamespace:
+        self.calls += 1
+        await asyncio.sleep(self.behavior.delay())
+        self.behavior.maybe_fail()
+        source = reference_images[0].reference_image.image_bytes
+        with Image.open(io.BytesIO(source)) as image:
+            size = image.size
+        generated = SimpleNamespace(image_bytes=_solid_image(size, "PNG"), mime_type="image/png")
+        count = getattr(config, "number_of_images", None) or 1
+        return SimpleNamespace(generated_images=[SimpleNamespace(image=generated) for _ in range(count)])
+
+
+class FakeGenaiClient:
+    """Imitates the parts of `genai.Client` used by GoogleService."""
+
+    def __init__(self, behavior: FakeBehavior) -> None:
+        self.aio = SimpleNamespace(models=FakeGenaiModels(behavior))
+
+
+class FakeJob:
+    """Imitates `gradio_client.Job`: a running prediction that can be cancelled between iterations."""
+
+    def __init__(self) -> None:
+        self.future: Future = Future()
+        self.cancelled = threading.Event()
+
+    def cancel(self) -> bool:
+        self.cancelled.set()
+        return True
+
+
+class FakeGradioClient:
+    """
+    Imitates `gradio_client.Client` for the Flux Fill Outpaint Space:
+    `predict` blocks, then "downloads" a WEBP of the requested size into
+    `output_dir/<uuid>/` and returns its path twice, as the Space does.
+    `submit` runs the same prediction as a cancellable job.
+    """
+
+    def __init__(self, behavior: FakeBehavior, output_dir: str | None = None) -> None:
+        self.behavior = behavior
+        self.output_dir = output_dir or tempfile.mkdtemp(prefix="fake-gradio-")
+        self.calls = 0
+        self.cancelled = 0
+
+    def view_api(self, print_info: bool = False, return_format: str | None = None) -> dict[str, Any]:
+        return {"named_endpoints": {"/inpaint": {}}, "unnamed_endpoints": {}}
+
+    def submit(self, *args: Any, api_name: str | None = None, **kwargs: Any) -> FakeJob:
+        job = FakeJob()
+
+        def run() -> None:
+            job.future.set_running_or_notify_cancel()
+            try:
+                job.future.set_result(self._predict(job.cancelled, **kwargs))
+            except Exception as e:
+                job.future.set_exception(e)
+
+        threading.Thread(target=run, daemon=True).start()
+        return job
+
+    def predict(self, *args: Any, api_name: str | None = None, **kwargs: Any) -> list[str]:
+        return self._predict(threading.Event(), **kwargs)
+
+    def _predict(self, cancelled: threading.Event, **kwargs: Any) -> list[str]:
+        self.calls += 1
+        if cancelled.wait(self.behavior.delay()):
+            # The Space drops a cancelled job without producing files
+            self.cancelled += 1
+            raise FakeUpstreamError("job cancelled", 499)
+        self.behavior.maybe_fail()
+        directory = Path(self.output_dir) / uuid.uuid4().hex
+        directory.mkdir(parents=True)
+        path = directory / "image.webp"
+        path.write_bytes(_solid_image((kwargs.get("width") or 512, kwargs.get("height") or 512), "WEBP"))
+        return [str(path), str(path)]
+
+    def close(self) -> None:
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+
+class FakeProviderRegistry(ProviderRegistry):
+    """ProviderRegistry whose services talk to the local stand-ins instead of Vertex AI and the Space."""
+
+    def __init__(self, vertex: FakeBehavior, gradio: FakeBehavior, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.vertex_behavior = vertex
+        self.gradio_behavior = gradio
+
+    async def _start_google(self) -> None:
+        started = time.perf_counter()
+        client = FakeGenaiClient(self.vertex_behavior)
+        self.google = GoogleService(
+            cache=self.cache, single_flight=self.single_flight, client=client, near_duplicates=self.near_duplicates
+        )
+        self._set_status("vertex", ProviderState.READY, None, started)
+
+    async def _start_gradio(self) -> None:
+        started = time.perf_counter()
+        client = FakeGradioClient(self.gradio_behavior)
+        self.gradio = GradioService(
+            self.gradio_space, self.cache, self.single_flight, client=client, image_fetcher=self.image_fetcher
+        )
+        self._set_status("gradio", ProviderState.READY, None, started)
@@ -0,0 +1,221 @@
+"""
+End-to-end load test of the FastAPI app against local stand-ins of Vertex AI
+and the Gradio Space (see benchmarks/fakes.py), or against a running server.
+
+    python -m benchmarks.load --endpoint vertex --concurrency 16 --requests 500
+    python -m benchmarks.load --endpoint outpaint --duration 30 --vertex-latency 2 --vertex-error-rate 0.05
+    python -m benchmarks.load --endpoint gradio --url http://localhost:8000 --requests 50
+    python -m benchmarks.load --endpoint vertex --save-baseline
+
+The result cache and request coalescing are disabled by default, since every
+request carries the same image; set RESULT_CACHE_ENABLED / SINGLE_FLIGHT_ENABLED
+to measure them instead.
+"""
+import os
+
+# Read by the app at import time
+os.environ.setdefault("RESULT_CACHE_ENABLED", "false")
+os.environ.setdefault("SINGLE_FLIGHT_ENABLED", "false")
+# The Gradio payload points at a placeholder URL that must not be downloaded
+os.environ.setdefault("IMAGE_FETCH_ENABLED", "false")
+
+import argparse
+import asyncio
+import base64
+import logging
+import sys
+import time
+from collections import Counter
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any
+
+import httpx
+from PIL import Image
+
+from src.application.services.external import ProviderRouter
+from src.application.services.jobs import JobManager
+from src.infrastructure.external import close_http_client
+from src.interfaces.main import app
+from src.shared import API, shutdown_cpu_executor
+from src.shared.helpers.encode import image_to_bytes
+
+from .common import BASELINE_DIR, compare, environment, load_results, peak_rss_mb, percentile, save_results
+from .fakes import FakeBehavior, FakeProviderRegistry
+
+DEFAULT_BASELINE = BASELINE_DIR / "load.json"
+ENDPOINTS = {
+    "vertex": f"{API.V1}/vertex/outpaint",
+    "gradio": f"{API.V1}/gradio/outpaint",
+    "outpaint": f"{API.V1}/outpaint",
+}
+
+
+def build_payload(endpoint: str, image_size: int) -> dict[str, Any]:
+    """JSON body of one request: a noisy JPEG padded by a quarter of its width on each side."""
+    image = Image.effect_noise((image_size, image_size * 3 // 4), 64).convert("RGB")
+    padding = image_size // 4
+    if endpoint == "gradio":
+        # The Space downloads the input itself; the fake client never fetches it
+        return {
+            "url": "https://example.com/input.png",
+            "has_url": True,
+            "width": image_size + 2 * padding,
+            "height": image_size * 3 // 4,
+            "overlap_percentage": 10,
+            "num_inference_steps": 8,
+            "resize_option": "Full",
+            "custom_resize_percentage": 100,
+            "prompt": "benchmark",
+            "alignment": "Middle",
+        }
+    return {
+        "input_image_b64": base64.b64encode(image_to_bytes(image, "JPEG")).decode(),
+        "prompt": "benchmark",
+        "left_pixels": padding,
+        "right_pixels": padding,
+    }
+
+
+@asynccontextmanager
+async def harness_lifespan(vertex: FakeBehavior, gradio: FakeBehavior) -> AsyncIterator[None]:
+    """Same wiring as the application lifespan, with providers backed by the fakes."""
+    providers = FakeProviderRegistry(vertex=vertex, gradio=gradio)
+    app.state.providers = providers
+    app.state.router = ProviderRouter(providers)
+    jobs = JobManager()
+    app.state.jobs = jobs
+    await providers.start()
+    jobs.start()
+    try:
+        yield
+    finally:
+        await jobs.stop()
+        await providers.close()
+        await close_http_client()
+        # Reaps the CPU workers so their memory counts in the peak RSS
+        shutdown_cpu_executor()
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    path: str,
+    payload: dict[str, Any],
+    concurrency: int,
+    requests: int | None,
+    duration: float | None,
+) -> tuple[list[float], Counter, float]:
+    """
+    Sends requests from `concurrency` workers until `requests` were sent or `duration` elapsed.
+
+    Returns:
+        Latencies of the successful requests (seconds), response counts by status, wall time.
+    """
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+    sent = 0
+    started = time.perf_counter()
+    deadline = started + duration if duration else None
+
+    async def worker() -> None:
+        nonlocal sent
+        while True:
+            if requests is not None and sent >= requests:
+                return
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            sent += 1
+            request_started = time.perf_counter()
+            try:
+                response = await client.post(path, json=payload)
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+                continue
+            statuses[int(response.status_code)] += 1
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - request_started)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, statuses, time.perf_counter() - started
+
+
+async def run(args: argparse.Namespace) -> dict[str, float]:
+    payload = build_payload(args.endpoint, args.image_size)
+    path = ENDPOINTS[args.endpoint]
+    timeout = httpx.Timeout(args.timeout)
+    limits = httpx.Limits(max_connections=args.concurrency)
+    requests = None if args.duration else args.requests
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=timeout, limits=limits) as client:
+            latencies, statuses, wall = await drive(client, path, payload, args.concurrency, requests, args.duration)
+    else:
+        vertex = FakeBehavior(args.vertex_latency, args.vertex_jitter, args.vertex_error_rate)
+        gradio = FakeBehavior(args.gradio_latency, args.gradio_jitter, args.gradio_error_rate)
+        transport = httpx.ASGITransport(app=app)
+        async with harness_lifespan(vertex, gradio):
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=timeout) as client:
+                latencies, statuses, wall = await drive(client, path, payload, args.concurrency, requests, args.duration)
+
+    total = sum(statuses.values())
+    errors = total - statuses.get(200, 0)
+    print(f"{args.endpoint}: {total} requests in {wall:.2f}s at concurrency {args.concurrency}")
+    print(f"  statuses: {dict(sorted(statuses.items(), key=str))}")
+    results = {
+        "rps": len(latencies) / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "error_rate": errors / total if total else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    print(
+        f"  {results['rps']:.1f} req/s, p50 {results['p50_ms']:.1f} ms, p95 {results['p95_ms']:.1f} ms, "
+        f"p99 {results['p99_ms']:.1f} ms, errors {results['error_rate']:.1%}, peak RSS {results['peak_rss_mb']:.1f} MiB"
+    )
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoint", choices=sorted(ENDPOINTS), default="vertex")
+    parser.add_argument("--url", help="Base URL of a running server; the in-process app and fakes are used when omitted.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight at any time.")
+    parser.add_argument("--requests", type=int, default=200, help="Requests to send.")
+    parser.add_argument("--duration", type=float, help="Send requests for this many seconds instead of a fixed count.")
+    parser.add_argument("--image-size", type=int, default=1024, help="Width of the input image.")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-request timeout, in seconds.")
+    parser.add_argument("--vertex-latency", type=float, default=0.5, help="Seconds taken by the fake Vertex AI.")
+    parser.add_argument("--vertex-jitter", type=float, default=0.1)
+    parser.add_argument("--vertex-error-rate", type=float, default=0.0, help="Fraction of fake Vertex calls failing with 503.")
+    parser.add_argument("--gradio-latency", type=float, default=2.0, help="Seconds taken by the fake Gradio Space.")
+    parser.add_argument("--gradio-jitter", type=float, default=0.5)
+    parser.add_argument("--gradio-error-rate", type=float, default=0.0, help="Fraction of fake Space calls failing with 503.")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="Baseline file to compare with.")
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the new baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Relative change flagged as a regression.")
+    args = parser.parse_args()
+    # One line per request would drown the report
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    results = {f"{args.endpoint}/c{args.concurrency}/{args.image_size}": asyncio.run(run(args))}
+
+    if args.save_baseline:
+        # Merge so each endpoint/concurrency combination keeps its own baseline
+        stored = load_results(args.baseline) or {"results": {}}
+        stored["results"].update(results)
+        stored["environment"] = environment()
+        save_results(args.baseline, stored)
+        return 0
+    baseline = load_results(args.baseline)
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 0
+    print(f"\nCompared with {args.baseline} ({baseline['environment']['timestamp']}):")
+    regressions = compare(results, baseline["results"], frozenset({"rps"}), args.tolerance)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
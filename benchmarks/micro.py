@@ -0,0 +1,110 @@
+"""
+Micro-benchmarks of the image helpers across image sizes, modes and padding amounts.
+
+    python -m benchmarks.micro                    # run and compare with the saved baseline
+    python -m benchmarks.micro --save-baseline    # run and store the results as the new baseline
+    python -m benchmarks.micro --sizes 512 1024 --modes RGB --repeat 3
+"""
+import argparse
+import base64
+import io
+import statistics
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from PIL import Image
+
+from src.shared.helpers.add_black_pixels import add_black_pixel_padding
+from src.shared.helpers.add_mask import create_mask
+from src.shared.helpers.encode import (
+    convert_image_bytes,
+    encode_bytes_to_base64,
+    encode_image_bytes_to_png_base64,
+    image_to_bytes,
+)
+from src.shared.helpers.prepare_outpaint import prepare_outpaint_canvas
+
+from .common import BASELINE_DIR, compare, environment, load_results, peak_rss_mb, save_results
+
+DEFAULT_BASELINE = BASELINE_DIR / "micro.json"
+# Padding added on the left and right, as a fraction of the image width
+PADDING_FRACTIONS = {"small": 0.05, "quarter": 0.25, "double": 1.0}
+
+
+def make_image(size: int, mode: str) -> bytes:
+    """Noisy test image (noise defeats PNG compression like a photo does), encoded like a client upload."""
+    image = Image.effect_noise((size, size * 3 // 4), 64).convert("RGB")
+    if mode == "RGBA":
+        image.putalpha(200)
+    elif mode == "P":
+        image = image.convert("P", palette=Image.Palette.ADAPTIVE)
+    return image_to_bytes(image, "JPEG" if mode == "RGB" else "PNG")
+
+
+def time_call(fn: Callable[[], object], repeat: int) -> dict[str, float]:
+    """Runs `fn` once to warm up, then `repeat` times; returns median and best time in ms."""
+    fn()
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        durations.append((time.perf_counter() - started) * 1000)
+    return {"median_ms": statistics.median(durations), "min_ms": min(durations)}
+
+
+def run(sizes: list[int], modes: list[str], repeat: int) -> dict[str, dict[str, float]]:
+    results: dict[str, dict[str, float]] = {}
+    for size in sizes:
+        for mode in modes:
+            image_bytes = make_image(size, mode)
+            image_b64 = base64.b64encode(image_bytes).decode()
+            png_bytes = image_to_bytes(Image.open(io.BytesIO(image_bytes)), "PNG")
+
+            cases: dict[str, Callable[[], object]] = {}
+            for name, fraction in PADDING_FRACTIONS.items():
+                pixels = int(size * fraction)
+                cases[f"add_black_pixel_padding/{name}"] = lambda p=pixels: add_black_pixel_padding(image_b64, p, p, 0, 0)
+                cases[f"create_mask/{name}"] = lambda p=pixels: create_mask(image_b64, p, p, 0, 0)
+                cases[f"prepare_outpaint_canvas/{name}"] = lambda p=pixels: prepare_outpaint_canvas(image_bytes, p, p, 0, 0)
+            cases["encode_bytes_to_base64"] = lambda: encode_bytes_to_base64(png_bytes)
+            cases["encode_image_bytes_to_png_base64/png"] = lambda: encode_image_bytes_to_png_base64(png_bytes)
+            cases["encode_image_bytes_to_png_base64/other"] = lambda: encode_image_bytes_to_png_base64(image_bytes)
+            cases["transcode/webp"] = lambda: convert_image_bytes(png_bytes, "image/webp", 90)
+            cases["transcode/jpeg"] = lambda: convert_image_bytes(png_bytes, "image/jpeg", 90)
+
+            for name, fn in cases.items():
+                key = f"{name}/{mode}/{size}"
+                results[key] = time_call(fn, repeat)
+                print(f"{key:<56} median {results[key]['median_ms']:>9.2f} ms   min {results[key]['min_ms']:>9.2f} ms")
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[512, 1024, 2048, 4096], help="Image widths.")
+    parser.add_argument("--modes", nargs="+", default=["RGB", "RGBA", "P"], choices=["RGB", "RGBA", "P"])
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case.")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="Baseline file to compare with.")
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the new baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Relative slowdown flagged as a regression.")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.modes, args.repeat)
+    print(f"Peak RSS: {peak_rss_mb():.1f} MiB")
+
+    if args.save_baseline:
+        save_results(args.baseline, {"environment": environment(), "results": results})
+        return 0
+    baseline = load_results(args.baseline)
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 0
+    print(f"\nCompared with {args.baseline} ({baseline['environment']['timestamp']}):")
+    regressions = compare(results, baseline["results"], frozenset(), args.tolerance)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
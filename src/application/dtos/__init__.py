@@ -1,7 +1,10 @@
+from .image_dtos import GeneratedImage, GeneratedImageFile
 from .response_dtos import ResponseBase, ResponseDataDictDTO, ResponseDataListDTO
 
 __all__ = [
+    "GeneratedImage",
+    "GeneratedImageFile",
     "ResponseBase",
     "ResponseDataDictDTO", 
     "ResponseDataListDTO",
-]
\ No newline at end of file
+]
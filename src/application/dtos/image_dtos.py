@@ -0,0 +1,25 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class GeneratedImage:
+    """Encoded image returned by a provider, kept as the upstream bytes."""
+
+    data: bytes
+    mime_type: str
+
+
+@dataclass(frozen=True)
+class GeneratedImageFile:
+    """
+    Generated image still on local disk, to be streamed to the client.
+
+    The receiver owns `cleanup_paths` and must delete them (together with
+    their empty parent directories under `cleanup_root`) once the image
+    has been delivered.
+    """
+
+    path: str
+    mime_type: str
+    cleanup_paths: tuple[str, ...]
+    cleanup_root: str
@@ -1,8 +1,17 @@
 from .google_service import GoogleService
 from .gradio_service import GradioService
+from .provider_router import ProviderRouter, RoutedImage
+from .registry import ProviderRegistry, ProviderState, ProviderStatus
+from .tiled_outpaint import TiledOutpainter
 
 
 __all__ = [
     "GoogleService",
     "GradioService",
+    "ProviderRegistry",
+    "ProviderRouter",
+    "ProviderState",
+    "ProviderStatus",
+    "RoutedImage",
+    "TiledOutpainter",
 ]
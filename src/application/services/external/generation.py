@@ -0,0 +1,69 @@
+import asyncio
+from typing import Awaitable, Callable
+
+from src.application.dtos import GeneratedImage
+from src.infrastructure.cache import ResultCache
+from src.shared.metrics import timed_stage
+from src.shared.singleflight import SingleFlight
+
+
+def candidate_keys(key: str, count: int) -> list[str]:
+    """
+    Cache keys of the `count` candidates of a generation. The first one is the
+    key itself, so a single-image request and the first candidate of a
+    multi-image request share their cache entry.
+    """
+    return [key] + [f"{key}-{index}" for index in range(1, count)]
+
+
+async def cached_generations(key: str, count: int, cache: ResultCache) -> list[GeneratedImage] | None:
+    """Returns the `count` cached candidates of a generation, or None unless all of them are cached."""
+    with timed_stage("cache"):
+        cached_images = await asyncio.gather(*(cache.get(candidate_key) for candidate_key in candidate_keys(key, count)))
+    if any(image is None for image in cached_images):
+        return None
+    return list(cached_images)
+
+
+async def deduplicated_generations(
+    key: str,
+    count: int,
+    generate: Callable[[], Awaitable[list[GeneratedImage]]],
+    cache: ResultCache | None,
+    single_flight: SingleFlight | None,
+) -> list[GeneratedImage]:
+    """
+    Returns the cached candidates of a generation when all of them are
+    available, otherwise runs `generate` once for all concurrent identical
+    requests and stores each candidate it returned.
+
+    Args:
+        key: Content-addressed key of the generation (see `build_cache_key`),
+            without the number of candidates.
+        count: Number of candidates requested.
+        generate: Coroutine function calling the provider for `count` candidates.
+        cache: Optional result cache.
+        single_flight: Optional coalescing group for in-flight requests.
+
+    Returns:
+        The generated images; the provider may return fewer than `count`.
+    """
+    keys = candidate_keys(key, count)
+    if cache is not None:
+        cached_images = await cached_generations(key, count, cache)
+        if cached_images is not None:
+            return cached_images
+
+    async def generate_and_store() -> list[GeneratedImage]:
+        generated_images = await generate()
+        if cache is not None:
+            for candidate_key, generated_image in zip(keys, generated_images):
+                await cache.set(candidate_key, generated_image)
+        return generated_images
+
+    if single_flight is None:
+        return await generate_and_store()
+    # Requests asking for a different number of candidates do not share a call
+    flight_key = key if count == 1 else f"{key}#{count}"
+    return await single_flight.do(flight_key, generate_and_store)
+
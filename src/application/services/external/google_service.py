@@ -1,26 +1,59 @@
-from typing import Any
+from typing import TYPE_CHECKING, Any, Final
 
-from src.application.dtos import ResponseDataDictDTO, ResponseDataListDTO
+from src.application.dtos import GeneratedImage, ResponseDataDictDTO, ResponseDataListDTO
 from src.domain.schema.google_payload import GooglePayload
-from google import genai
-from google.genai.types import RawReferenceImage, MaskReferenceImage, MaskReferenceConfig, EditImageConfig
+from src.domain.schema.image_edit_payload import ImgExpandOptions
+import asyncio
 import base64
 
-import io
+from src.application.services.external.generation import cached_generations, deduplicated_generations
+from src.infrastructure.cache import NearDuplicateIndex, ResultCache, build_cache_key, digest_bytes
+from src.infrastructure.external.google import GoogleClient
+from src.shared.singleflight import SingleFlight
+from src.shared.concurrency import ProviderBusyError
+from src.shared.executor import ExecutorOverloadedError, run_cpu_bound
+from src.shared.metrics import timed_stage
+from src.shared.resilience import ProviderCallError, get_provider_resilience
+from src.shared.helpers.encode import encode_image_bytes_to_png_base64, sniff_mime_type
+from src.shared.helpers.prepare_outpaint import OutpaintCanvas, recompose_outpaint
 
-from PIL import Image 
+if TYPE_CHECKING:
+    # google.genai takes about a second to import: it is loaded when the first client is built
+    from google import genai
 
-from os import getenv
+import logging
 
-import logging # Import logging
+from os import getenv
 
-# Configure basic logging for debugging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+DEFAULT_OUTPAINT_MODEL: Final[str] = "imagen-3.0-capability-001"
+# Working resolution of Imagen: larger canvases are downscaled to it before upload when requested
+VERTEX_UPLOAD_MAX_PIXELS: Final[int] = int(getenv("VERTEX_UPLOAD_MAX_PIXELS", str(1024 * 1024)))
 
-from os import getenv
 
 class GoogleService:
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        cache: ResultCache | None = None,
+        single_flight: SingleFlight | None = None,
+        client: "genai.Client | None" = None,
+        near_duplicates: NearDuplicateIndex | None = None,
+    ) -> None:
+        """
+        Args:
+            cache: Optional result cache consulted before calling Vertex AI.
+            single_flight: Optional group coalescing identical in-flight requests.
+            client: Already configured client (e.g. a local stand-in). Built
+                from the GOOGLE_* environment variables when omitted.
+            near_duplicates: Optional index of previous generations, consulted
+                by the outpaint endpoints before preparing a canvas.
+        """
+        self.cache = cache
+        self.single_flight = single_flight
+        self.near_duplicates = near_duplicates
+        if client is not None:
+            self.google_client = client
+            return
+
         cloud_project = getenv("GOOGLE_CLOUD_PROJECT")
         cloud_location = getenv("GOOGLE_CLOUD_LOCATION")
         use_vertexai_str = getenv("GOOGLE_GENAI_USE_VERTEXAI", "false")
@@ -36,17 +69,24 @@ class GoogleService:
                 "Please set these (e.g., `export VAR_NAME=value`) before running the app."
             )
 
-        self.google_client: genai.Client = genai.Client(
-            vertexai=use_vertexai,
+        self.google_client: genai.Client = GoogleClient.create(
             project=cloud_project,
             location=cloud_location,
+            use_vertexai=use_vertexai,
         )
         #logging.info("genai.Client initialized successfully.")
 
     @property
-    def client(self) -> genai.Client:
+    def client(self) -> "genai.Client":
         """Get the GoogleClient instance."""
         return self.google_client
+
+    async def warm_up(self, model_name: str = DEFAULT_OUTPAINT_MODEL) -> None:
+        """
+        Fetches the model metadata once so credentials are resolved and the
+        TLS connection to Vertex AI is open before the first real request.
+        """
+        await self.client.aio.models.get(model=model_name)
     
     async def outpaint(self, data: GooglePayload) -> ResponseDataDictDTO:
         """Outline image using Vertex AI"""
@@ -54,9 +94,6 @@ class GoogleService:
         try:
             input_image_b64 = data.input_image_b64
             mask_image_b64 = data.mask_image_b64
-            prompt = data.prompt
-            model_name = data.model
-            mask_dilation = data.mask_dilation
 
             if not input_image_b64 or not mask_image_b64:
                 logging.error("Input image or mask image (base64) is missing in payload.")
@@ -64,14 +101,6 @@ class GoogleService:
 
             input_image_bytes = base64.b64decode(input_image_b64)
             mask_image_bytes = base64.b64decode(mask_image_b64)
-            
-            # logging.info(f"Decoded input_image_bytes size: {len(input_image_bytes)} bytes")
-            # logging.info(f"Decoded mask_image_bytes size: {len(mask_image_bytes)} bytes")
-
-            if not input_image_bytes:
-                raise ValueError("Decoded input image bytes are empty.")
-            if not mask_image_bytes:
-                raise ValueError("Decoded mask image bytes are empty.")
 
         except ValueError as ve:
             raise ve
@@ -79,7 +108,300 @@ class GoogleService:
             logging.error(f"Error parsing input data in outline method: {e}", exc_info=True)
             raise ValueError(f"Failed to parse input data for image processing: {e}")
 
+        return await self.outpaint_bytes(
+            input_image_bytes=input_image_bytes,
+            mask_image_bytes=mask_image_bytes,
+            prompt=data.prompt,
+            model_name=data.model,
+            mask_dilation=data.mask_dilation,
+        )
+
+    async def outpaint_bytes(
+        self,
+        input_image_bytes: bytes,
+        mask_image_bytes: bytes,
+        prompt: str,
+        model_name: str,
+        mask_dilation: float = 0.03,
+    ) -> ResponseDataDictDTO:
+        """
+        Outline image using Vertex AI from already encoded image and mask bytes.
+
+        Args:
+            input_image_bytes: The padded input image (PNG/JPEG bytes).
+            mask_image_bytes: The mask image (PNG bytes), white where pixels must be generated.
+            prompt: Text prompt to guide the generation.
+            model_name: Name of the Vertex AI model to use.
+            mask_dilation: Mask dilation factor between 0.0 and 1.0.
+
+        Returns:
+            ResponseDataDictDTO with the generated image as base64 PNG.
+        """
+        generated_image = await self.generate_image(
+            input_image_bytes=input_image_bytes,
+            mask_image_bytes=mask_image_bytes,
+            prompt=prompt,
+            model_name=model_name,
+            mask_dilation=mask_dilation,
+        )
+        return await self.build_response(generated_image)
+
+    async def outpaint_canvas(
+        self,
+        canvas: OutpaintCanvas,
+        prompt: str,
+        model_name: str,
+        mask_dilation: float = 0.03,
+    ) -> ResponseDataDictDTO:
+        """
+        Outline a prepared canvas using Vertex AI.
+
+        Args:
+            canvas: The padded canvas and mask, possibly downscaled for upload.
+            prompt: Text prompt to guide the generation.
+            model_name: Name of the Vertex AI model to use.
+            mask_dilation: Mask dilation factor between 0.0 and 1.0.
+
+        Returns:
+            ResponseDataDictDTO with the generated image as base64 PNG.
+        """
+        generated_image = await self.generate_canvas_image(canvas, prompt, model_name, mask_dilation)
+        return await self.build_response(generated_image)
+
+    async def generate_canvas_image(
+        self,
+        canvas: OutpaintCanvas,
+        prompt: str,
+        model_name: str,
+        mask_dilation: float = 0.03,
+    ) -> GeneratedImage:
+        """
+        Calls Vertex AI with a prepared canvas. A downscaled canvas is
+        recomposed at full resolution around the untouched original pixels.
+
+        Args:
+            canvas: The padded canvas and mask, possibly downscaled for upload.
+            prompt: Text prompt to guide the generation.
+            model_name: Name of the Vertex AI model to use.
+            mask_dilation: Mask dilation factor between 0.0 and 1.0.
+
+        Returns:
+            GeneratedImage at the requested canvas size (PNG when recomposed).
+        """
+        generated_images = await self.generate_canvas_images(canvas, prompt, model_name, mask_dilation)
+        return generated_images[0]
+
+    async def generate_canvas_images(
+        self,
+        canvas: OutpaintCanvas,
+        prompt: str,
+        model_name: str,
+        mask_dilation: float = 0.03,
+        num_candidates: int = 1,
+        cache_key: str | None = None,
+    ) -> list[GeneratedImage]:
+        """
+        Like `generate_canvas_image`, but asks Vertex AI for `num_candidates`
+        variants in one call. Downscaled variants are recomposed in parallel.
+
+        Args:
+            cache_key: `outpaint_cache_key` of the request the canvas was
+                prepared from. The recomposed images are then cached under it
+                instead of under a digest of the canvas.
+
+        Returns:
+            The generated images; Vertex AI may return fewer than requested
+            (e.g. when some are filtered out).
+        """
+        if cache_key is None:
+            generated_images = await self.generate_images(
+                input_image_bytes=canvas.image_bytes,
+                mask_image_bytes=canvas.mask_bytes,
+                prompt=prompt,
+                model_name=model_name,
+                mask_dilation=mask_dilation,
+                num_candidates=num_candidates,
+            )
+            return await self._recompose_canvas_images(canvas, generated_images)
+
+        async def generate() -> list[GeneratedImage]:
+            generated_images = await self._edit_image(
+                canvas.image_bytes, canvas.mask_bytes, prompt, model_name, mask_dilation, num_candidates
+            )
+            return await self._recompose_canvas_images(canvas, generated_images)
+
+        return await deduplicated_generations(cache_key, num_candidates, generate, self.cache, self.single_flight)
+
+    async def outpaint_cache_key(self, image_bytes: bytes, options: ImgExpandOptions, model_name: str) -> str | None:
+        """
+        Cache key of an outpaint, from the input image and every parameter,
+        so that a cached result is found before any canvas is prepared.
+        None when neither the cache nor the single flight are enabled.
+        """
+        if self.cache is None and self.single_flight is None:
+            return None
+        image_digest = await asyncio.to_thread(digest_bytes, image_bytes)
+        return build_cache_key(
+            "vertex",
+            image_digest,
+            {
+                "prompt": options.prompt,
+                "model": model_name,
+                "mask_dilation": options.mask_dilation,
+                "left_pixels": options.left_pixels,
+                "right_pixels": options.right_pixels,
+                "top_pixels": options.top_pixels,
+                "bottom_pixels": options.bottom_pixels,
+                "downscale": options.downscale,
+            },
+        )
+
+    async def cached_images(self, cache_key: str, num_candidates: int = 1) -> list[GeneratedImage] | None:
+        """Returns the cached images of an `outpaint_cache_key`, or None when they are not all cached."""
+        if self.cache is None:
+            return None
+        return await cached_generations(cache_key, num_candidates, self.cache)
+
+    async def _recompose_canvas_images(
+        self, canvas: OutpaintCanvas, generated_images: list[GeneratedImage]
+    ) -> list[GeneratedImage]:
+        """Recomposes the images generated for a downscaled canvas at full resolution."""
+        if not canvas.downscaled:
+            return generated_images
+        try:
+            with timed_stage("recompose"):
+                recomposed = await asyncio.gather(
+                    *(run_cpu_bound(recompose_outpaint, canvas, image.data) for image in generated_images)
+                )
+        except ExecutorOverloadedError:
+            raise
+        except Exception as e:
+            logging.error(f"Full-resolution recomposition error: {e}", exc_info=True)
+            raise RuntimeError(f"Failed to recompose the generated image at full resolution: {e}")
+        return [GeneratedImage(data=image_bytes, mime_type="image/png") for image_bytes in recomposed]
+
+    async def build_candidates_response(self, generated_images: list[GeneratedImage]) -> ResponseDataDictDTO:
+        """
+        Wraps several generated variants into the JSON response, encoded in
+        parallel: `generated_images_b64` lists all of them and
+        `generated_image_b64` repeats the first one.
+        """
+        try:
+            with timed_stage("encode"):
+                images_b64 = await asyncio.gather(
+                    *(run_cpu_bound(encode_image_bytes_to_png_base64, image.data) for image in generated_images)
+                )
+        except ExecutorOverloadedError:
+            raise
+        except Exception as e:
+            logging.error(f"Vertex AI response processing error: {e}", exc_info=True)
+            raise RuntimeError(f"Vertex AI API call or image processing failed: {e}")
+
+        return ResponseDataDictDTO(
+            message="Image outlined successfully",
+            data={"generated_image_b64": images_b64[0], "generated_images_b64": list(images_b64)}
+        )
+
+    async def build_response(self, generated_image: GeneratedImage) -> ResponseDataDictDTO:
+        """Wraps a generated image into the JSON response, as base64 PNG."""
+        try:
+            # PNG/base64 encode off the event loop; PNG bytes are passed through as-is
+            with timed_stage("encode"):
+                output_image_b64 = await run_cpu_bound(encode_image_bytes_to_png_base64, generated_image.data)
+        except ExecutorOverloadedError:
+            raise
+        except Exception as e:
+            logging.error(f"Vertex AI response processing error: {e}", exc_info=True)
+            raise RuntimeError(f"Vertex AI API call or image processing failed: {e}")
+
+        return ResponseDataDictDTO(
+            message="Image outlined successfully",
+            data={"generated_image_b64": output_image_b64}
+        )
+
+    async def generate_image(
+        self,
+        input_image_bytes: bytes,
+        mask_image_bytes: bytes,
+        prompt: str,
+        model_name: str,
+        mask_dilation: float = 0.03,
+    ) -> GeneratedImage:
+        """
+        Calls Vertex AI and returns the generated image exactly as the API sent it.
+
+        Args:
+            input_image_bytes: The padded input image (PNG/JPEG bytes).
+            mask_image_bytes: The mask image (PNG bytes), white where pixels must be generated.
+            prompt: Text prompt to guide the generation.
+            model_name: Name of the Vertex AI model to use.
+            mask_dilation: Mask dilation factor between 0.0 and 1.0.
+
+        Returns:
+            GeneratedImage with the upstream bytes and their MIME type.
+        """
+        generated_images = await self.generate_images(
+            input_image_bytes, mask_image_bytes, prompt, model_name, mask_dilation
+        )
+        return generated_images[0]
+
+    async def generate_images(
+        self,
+        input_image_bytes: bytes,
+        mask_image_bytes: bytes,
+        prompt: str,
+        model_name: str,
+        mask_dilation: float = 0.03,
+        num_candidates: int = 1,
+    ) -> list[GeneratedImage]:
+        """
+        Like `generate_image`, but asks Vertex AI for `num_candidates` variants
+        in a single call instead of one call per variant.
+
+        Returns:
+            The generated images, exactly as the API sent them.
+        """
+        if self.cache is None and self.single_flight is None:
+            return await self._edit_image(
+                input_image_bytes, mask_image_bytes, prompt, model_name, mask_dilation, num_candidates
+            )
+
+        # The canvas and mask bytes already encode the source image and the paddings
+        image_digest = await asyncio.to_thread(digest_bytes, input_image_bytes, mask_image_bytes)
+        cache_key = build_cache_key(
+            "vertex",
+            image_digest,
+            {"prompt": prompt, "model": model_name, "mask_dilation": mask_dilation},
+        )
+        return await deduplicated_generations(
+            cache_key,
+            num_candidates,
+            lambda: self._edit_image(
+                input_image_bytes, mask_image_bytes, prompt, model_name, mask_dilation, num_candidates
+            ),
+            self.cache,
+            self.single_flight,
+        )
+
+    async def _edit_image(
+        self,
+        input_image_bytes: bytes,
+        mask_image_bytes: bytes,
+        prompt: str,
+        model_name: str,
+        mask_dilation: float,
+        num_candidates: int = 1,
+    ) -> list[GeneratedImage]:
+        """Sends the outpaint request to Vertex AI and returns every generated image."""
+        if not input_image_bytes:
+            raise ValueError("Decoded input image bytes are empty.")
+        if not mask_image_bytes:
+            raise ValueError("Decoded mask image bytes are empty.")
+
         # --- 2. Construct genai objects by explicitly passing bytes to 'image_bytes' field ---
+        from google import genai
+        from google.genai.types import RawReferenceImage, MaskReferenceImage, MaskReferenceConfig, EditImageConfig
+
         try:
             raw_ref = RawReferenceImage(
                 reference_image=genai.types.Image(image_bytes=input_image_bytes),
@@ -93,48 +415,45 @@ class GoogleService:
                     mask_dilation=mask_dilation,
                 ),
             )
-            # logging.info("genai.types.Image objects created successfully using 'image_bytes' keyword.")
         except Exception as e:
             logging.error(f"Error creating genai.types.Image objects (explicit image_bytes): {e}", exc_info=True)
             raise RuntimeError(f"Failed to prepare image data for Vertex AI: {e}")
 
-        # --- 3. Call the Imagen API (already corrected for 'await') ---
+        # --- 3. Call the Imagen API through the SDK's async surface and the provider resilience layer ---
         try:
-            # logging.info(f"Calling Vertex AI Imagen API with model: {model_name} and prompt: '{prompt}'")
-            image_response = self.client.models.edit_image(
-                model=model_name,
-                prompt=prompt,
-                reference_images=[raw_ref, mask_ref],
-                config=EditImageConfig(
-                    edit_mode="EDIT_MODE_OUTPAINT",
-                ),
+            image_response = await get_provider_resilience("vertex").call(
+                lambda: self.client.aio.models.edit_image(
+                    model=model_name,
+                    prompt=prompt,
+                    reference_images=[raw_ref, mask_ref],
+                    config=EditImageConfig(
+                        edit_mode="EDIT_MODE_OUTPAINT",
+                        number_of_images=num_candidates,
+                    ),
+                )
             )
-            # logging.info("Vertex AI Imagen API call completed.")
-            
-            # --- 4. Process the Response (NEW CORRECTION HERE) ---
+
+            # --- 4. Process the Response ---
             if not image_response.generated_images:
                 logging.error("Vertex AI returned no generated images.")
                 raise RuntimeError("No image generated by Vertex AI.")
 
-            # Get the raw bytes from the generated Image object
-            generated_image_bytes = image_response.generated_images[0].image.image_bytes
-
-            # Convert these bytes to a PIL Image object
-            generated_pil_image = Image.open(io.BytesIO(generated_image_bytes))
-            
-            # logging.info(f"Generated image converted to PIL. Size: {generated_pil_image.size}")
-
-            # Convert generated PIL Image back to base64 for response
-            output_buffer = io.BytesIO()
-            generated_pil_image.save(output_buffer, format="PNG") # Save as PNG or JPEG
-            output_image_b64 = base64.b64encode(output_buffer.getvalue()).decode("utf-8")
-            # logging.info(f"Generated image encoded to base64. Size: {len(output_image_b64)} chars.")
+            # Get the raw bytes from the generated Image objects
+            generated_images = []
+            for generated_image in image_response.generated_images:
+                generated = generated_image.image
+                if generated is None or not generated.image_bytes:
+                    continue
+                mime_type = generated.mime_type or sniff_mime_type(generated.image_bytes) or "image/png"
+                generated_images.append(GeneratedImage(data=generated.image_bytes, mime_type=mime_type))
+            if not generated_images:
+                logging.error("Vertex AI returned no image bytes.")
+                raise RuntimeError("No image generated by Vertex AI.")
 
-            return ResponseDataDictDTO(
-                message="Image outlined successfully",
-                data={"generated_image_b64": output_image_b64}
-            )
+            return generated_images
 
+        except (ProviderBusyError, ProviderCallError):
+            raise
         except Exception as e:
             logging.error(f"Vertex AI API call or response processing error: {e}", exc_info=True)
             raise RuntimeError(f"Vertex AI API call or image processing failed: {e}")
@@ -1,36 +1,92 @@
-from gradio_client import Client, handle_file
+import asyncio
+import mimetypes
+import tempfile
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from pathlib import Path
+
 from pydantic import AnyUrl
-from typing import Any
+from typing import TYPE_CHECKING, Any, Final
 from os import getenv
-from src.application.dtos import ResponseDataDictDTO
+from src.application.dtos import GeneratedImage, GeneratedImageFile, ResponseDataDictDTO
 
 from src.domain.schema.image_edit_payload import ImgExpandPayloadV2
-from src.shared.helpers.encode import encode_image_to_base64
+from src.application.services.external.generation import deduplicated_generations
+from src.infrastructure.cache import ImageFetchCache, ImageFetchError, ResultCache, build_cache_key, digest_bytes, digest_file
+from src.shared.singleflight import SingleFlight
+from src.shared.concurrency import ProviderBusyError
+from src.shared.executor import ExecutorOverloadedError, run_cpu_bound
+from src.shared.metrics import timed_stage
+from src.shared.resilience import ProviderCallError, get_provider_resilience
+from src.shared.helpers.encode import encode_bytes_to_base64, sniff_mime_type
+from src.shared.helpers.temp_files import remove_file, remove_files_under, write_tempfile
+
+if TYPE_CHECKING:
+    # gradio_client is loaded when the first client is built, not when the app starts
+    from gradio_client import Client
+    from gradio_client.client import Job
+
+import logging
 
-import logging # Import logging
 
-# Configure basic logging for debugging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+DEFAULT_GRADIO_SPACE: Final[str] = getenv("GRADIO_SPACE", "jallenjia/flux-fill-outpaint")
+# Same default as gradio_client's DEFAULT_TEMP_DIR, without importing it
+GRADIO_DOWNLOAD_DIR: Final[str] = getenv("GRADIO_DOWNLOAD_DIR") or getenv("GRADIO_TEMP_DIR") or str(
+    Path(tempfile.gettempdir()) / "gradio"
+)
 
 
 class GradioService:
-    def __init__(self, gradio_url: str) -> None:
+    def __init__(
+            self,
+            gradio_url: str,
+            cache: ResultCache | None = None,
+            single_flight: SingleFlight | None = None,
+            client: "Client | None" = None,
+            image_fetcher: ImageFetchCache | None = None,
+    ) -> None:
         """
         Initialize the GradioService with the provided Gradio URL.
         
         Args:
             gradio_url (str): The URL of the Gradio interface.
+            cache (ResultCache, optional): Result cache consulted before calling the Space.
+            single_flight (SingleFlight, optional): Group coalescing identical in-flight requests.
+            client (Client, optional): Already connected client (e.g. a local stand-in).
+            image_fetcher (ImageFetchCache, optional): Downloads URL inputs with revalidation,
+                instead of letting the Space download them on every request.
         """
-        hf_token=getenv("GRADIO_HF_TOKEN")
-        if not gradio_url or not hf_token:
-            raise ValueError("Gradio URL must be provided.")
-        
-        self.client = Client(gradio_url, hf_token=hf_token)
+        self.cache = cache
+        self.single_flight = single_flight
+        self.image_fetcher = image_fetcher
+        if client is None:
+            hf_token=getenv("GRADIO_HF_TOKEN")
+            if not gradio_url or not hf_token:
+                raise ValueError("Gradio URL and the GRADIO_HF_TOKEN environment variable must be provided.")
+            from gradio_client import Client
+
+            client = Client(gradio_url, hf_token=hf_token, download_files=GRADIO_DOWNLOAD_DIR)
+
+        self.client = client
+        # Directory the client downloads the generated files to, cleaned after each result
+        self.download_dir = client.output_dir
+
+    async def warm_up(self) -> None:
+        """
+        Resolves the Space API description so the first prediction does
+        not pay for it. The Space config itself is fetched by the constructor.
+        """
+        await asyncio.to_thread(self.client.view_api, print_info=False, return_format="dict")
+
+    def close(self) -> None:
+        """Stops the client's heartbeat thread."""
+        self.client.close()
 
     async def outpaint(
             self, 
             img_payload: ImgExpandPayloadV2,
-            api_name: str ="/inpaint"
+            api_name: str ="/inpaint",
+            image_path: str | None = None,
     ) -> dict[str, Any] | None:
         """
         Outpaint an image using the Gradio interface.
@@ -50,66 +106,289 @@ class GradioService:
             overlap_top (bool, optional): Whether to apply overlap on the top side. Defaults to True.
             overlap_bottom (bool, optional): Whether to apply overlap on the bottom side. Defaults to True.
             api_name (str, optional): The API endpoint name for outpainting. Defaults to "/inpaint".
+            image_path (str, optional): Local file to upload as the input image. Takes precedence over the payload url/image.
         
         Returns:
             str: Base64 encoded string of the outpainted image.
         """
         logging.info("Starting outpainting process with payload: %s", img_payload)
-        # result = img_payload
         try:
-            if img_payload.has_url:
-                image_data=handle_file(img_payload.url)
-            elif img_payload.image:
-                if(img_payload.image.url):
-                    image_url = img_payload.image.url
-                else:
-                    image_url = ''
-                if(img_payload.image.size):
-                    image_size = img_payload.image.size
-                else:
-                    image_size = None
-                if(img_payload.image.mime_type):
-                    image_mime_type = img_payload.image.mime_type
-                else:
-                    image_mime_type = None
-                image_data={
-                    "path": None,
-                    "meta": {"_type": "gradio.FileData"},
-                    "orig_name": "None",
-                    "url": image_url,
-                    "size": image_size,
-                    "mime_type": image_mime_type
-                }
-            result = self.client.predict(
-                    image=image_data,
-                    width=img_payload.width,
-                    height=img_payload.height,
-                    overlap_percentage=img_payload.overlap_percentage,
-                    num_inference_steps=img_payload.num_inference_steps,
-                    resize_option=img_payload.resize_option,
-                    custom_resize_percentage=img_payload.custom_resize_percentage,
-                    prompt_input=img_payload.prompt,
-                    alignment=img_payload.alignment,
-                    overlap_left=img_payload.overlap_left,
-                    overlap_right=img_payload.overlap_right,
-                    overlap_top=img_payload.overlap_top,
-                    overlap_bottom=img_payload.overlap_bottom,
-                    api_name=api_name
-            )
+            generated_images = await self.generate_images(img_payload, api_name, image_path)
 
-            image_b64=encode_image_to_base64(result[0])
+            # Variants are encoded in parallel on the CPU executor
+            with timed_stage("encode"):
+                images_b64 = await asyncio.gather(
+                    *(run_cpu_bound(encode_bytes_to_base64, image.data) for image in generated_images)
+                )
+            data = {"generated_image_b64": images_b64[0], "success": True}
+            if img_payload.num_candidates > 1:
+                data["generated_images_b64"] = list(images_b64)
             return ResponseDataDictDTO(
                 message="Image outpainted successfully",
-                data={"generated_image_b64": image_b64,
-                      "success": True}
+                data=data
             )
+        except (ExecutorOverloadedError, ProviderBusyError, ProviderCallError, ImageFetchError):
+            raise
         except Exception as e:
             logging.error(f"Gradio AI API call or response processing error: {e}", exc_info=True)
-            return ResponseDataDictDTO(
-                message="Image outpainted successfully",
-                data={"generated_image_b64": None,
-                      "success": False,
-                      "error": f"Gradio AI API call or image processing failed: {e}"
-                      }
+            raise RuntimeError(f"Gradio AI API call or image processing failed: {e}")
+
+    async def generate_image(
+            self,
+            img_payload: ImgExpandPayloadV2,
+            api_name: str ="/inpaint",
+            image_path: str | None = None,
+    ) -> GeneratedImage:
+        """
+        Outpaint an image using the Gradio interface and return the generated
+        file exactly as the Space produced it (usually WEBP).
+
+        Args:
+            img_payload (ImgExpandPayloadV2): The outpainting parameters.
+            api_name (str, optional): The API endpoint name for outpainting. Defaults to "/inpaint".
+            image_path (str, optional): Local file to upload as the input image.
+
+        Returns:
+            GeneratedImage: The generated image bytes and MIME type.
+        """
+        generated_images = await self.generate_images(
+            img_payload.model_copy(update={"num_candidates": 1}), api_name, image_path
+        )
+        return generated_images[0]
+
+    async def generate_images(
+            self,
+            img_payload: ImgExpandPayloadV2,
+            api_name: str ="/inpaint",
+            image_path: str | None = None,
+    ) -> list[GeneratedImage]:
+        """
+        Generates `img_payload.num_candidates` variants, each exactly as the
+        Space produced it. The input image is fetched or uploaded once for all
+        of them.
+
+        Args:
+            img_payload (ImgExpandPayloadV2): The outpainting parameters.
+            api_name (str, optional): The API endpoint name for outpainting. Defaults to "/inpaint".
+            image_path (str, optional): Local file to upload as the input image.
+
+        Returns:
+            list[GeneratedImage]: The generated images, in prediction order.
+        """
+        async with self._input_file(img_payload, image_path) as image_path:
+            if self.cache is None and self.single_flight is None:
+                return await self._generate_images(img_payload, api_name, image_path)
+
+            cache_key = await self._cache_key(img_payload, api_name, image_path)
+            return await deduplicated_generations(
+                cache_key,
+                img_payload.num_candidates,
+                lambda: self._generate_images(img_payload, api_name, image_path),
+                self.cache,
+                self.single_flight,
+            )
+
+    @asynccontextmanager
+    async def _input_file(self, img_payload: ImgExpandPayloadV2, image_path: str | None) -> AsyncIterator[str | None]:
+        """
+        Yields the local file to upload as the input image: `image_path`, or the
+        payload url downloaded through the fetch cache into a temporary file
+        (deleted afterwards). Yields None when the Space should get the url itself.
+        """
+        url = img_payload.url if img_payload.has_url else None
+        if image_path or self.image_fetcher is None or not url or not url.startswith(("http://", "https://")):
+            yield image_path
+            return
+        with timed_stage("fetch"):
+            fetched = await self.image_fetcher.fetch(url)
+        suffix = mimetypes.guess_extension(fetched.mime_type or "") or Path(url.split("?")[0]).suffix
+        path = await asyncio.to_thread(write_tempfile, fetched.data, suffix)
+        try:
+            yield path
+        finally:
+            await asyncio.to_thread(remove_file, path)
+
+    async def _cache_key(
+            self,
+            img_payload: ImgExpandPayloadV2,
+            api_name: str,
+            image_path: str | None,
+    ) -> str:
+        """Cache key from the input image (file content, or its url/reference) and every parameter."""
+        if image_path:
+            image_digest = await asyncio.to_thread(digest_file, image_path)
+        else:
+            image_reference = img_payload.model_dump_json(include={"url", "has_url", "image"})
+            image_digest = digest_bytes(image_reference.encode("utf-8"))
+        # The number of candidates is part of each candidate's key (see `candidate_keys`)
+        params = img_payload.model_dump(exclude={"url", "has_url", "image", "num_candidates"})
+        params["api_name"] = api_name
+        return build_cache_key("gradio", image_digest, params)
+
+    async def generate_image_file(
+            self,
+            img_payload: ImgExpandPayloadV2,
+            api_name: str ="/inpaint",
+            image_path: str | None = None,
+    ) -> GeneratedImage | GeneratedImageFile:
+        """
+        Outpaint an image and hand over the generated file still on disk, so it
+        can be streamed to the client without loading it in memory.
+
+        When a result cache or request coalescing is configured the bytes are
+        needed anyway, so this falls back to `generate_image`.
+
+        Args:
+            img_payload (ImgExpandPayloadV2): The outpainting parameters.
+            api_name (str, optional): The API endpoint name for outpainting. Defaults to "/inpaint".
+            image_path (str, optional): Local file to upload as the input image.
+
+        Returns:
+            GeneratedImageFile: The generated file, whose `cleanup_paths` the caller
+            must delete after delivery; or GeneratedImage when the bytes were read.
+        """
+        if self.cache is not None or self.single_flight is not None:
+            return await self.generate_image(img_payload, api_name, image_path)
+
+        async with self._input_file(img_payload, image_path) as image_path:
+            result = await self._predict(img_payload, api_name, image_path)
+        result_paths = _result_paths(result)
+        output_path = result_paths[0]
+        try:
+            # The header is enough to identify the format
+            head = await asyncio.to_thread(_read_head, output_path)
+        except Exception:
+            await asyncio.to_thread(remove_files_under, result_paths, self.download_dir)
+            raise
+        mime_type = sniff_mime_type(head) or mimetypes.guess_type(output_path)[0] or "application/octet-stream"
+        return GeneratedImageFile(path=output_path, mime_type=mime_type, cleanup_paths=tuple(result_paths),
+                                  cleanup_root=self.download_dir)
+
+    async def _generate_images(
+            self,
+            img_payload: ImgExpandPayloadV2,
+            api_name: str,
+            image_path: str | None,
+    ) -> list[GeneratedImage]:
+        """
+        Runs one prediction per candidate, concurrently: the Space generates a
+        single image per call (the files it returns are views of that one
+        generation), with a random seed each time.
+        """
+        return list(await asyncio.gather(
+            *(self._generate_image(img_payload, api_name, image_path) for _ in range(img_payload.num_candidates))
+        ))
+
+    async def _generate_image(
+            self,
+            img_payload: ImgExpandPayloadV2,
+            api_name: str,
+            image_path: str | None,
+    ) -> GeneratedImage:
+        """Calls the Space, reads the first generated file and deletes every downloaded output."""
+        result = await self._predict(img_payload, api_name, image_path)
+        result_paths = _result_paths(result)
+        try:
+            with timed_stage("read_result"):
+                image_bytes = await asyncio.to_thread(Path(result_paths[0]).read_bytes)
+        finally:
+            await asyncio.to_thread(remove_files_under, result_paths, self.download_dir)
+        mime_type = sniff_mime_type(image_bytes) or mimetypes.guess_type(result_paths[0])[0] or "application/octet-stream"
+        return GeneratedImage(data=image_bytes, mime_type=mime_type)
+
+    async def _predict(
+            self,
+            img_payload: ImgExpandPayloadV2,
+            api_name: str,
+            image_path: str | None,
+    ) -> Any:
+        """Calls the Space and returns its raw result (a list of generated file paths)."""
+        from gradio_client import handle_file
+
+        if image_path:
+            image_data=handle_file(image_path)
+        elif img_payload.has_url:
+            image_data=handle_file(img_payload.url)
+        elif img_payload.image:
+            if(img_payload.image.url):
+                image_url = img_payload.image.url
+            else:
+                image_url = ''
+            if(img_payload.image.size):
+                image_size = img_payload.image.size
+            else:
+                image_size = None
+            if(img_payload.image.mime_type):
+                image_mime_type = img_payload.image.mime_type
+            else:
+                image_mime_type = None
+            image_data={
+                "path": None,
+                "meta": {"_type": "gradio.FileData"},
+                "orig_name": "None",
+                "url": image_url,
+                "size": image_size,
+                "mime_type": image_mime_type
+            }
+        # Submitted as a job through the provider resilience layer, so a cancelled request cancels it upstream
+        result = await get_provider_resilience("gradio").call(
+            lambda: self._run_job(
+                image=image_data,
+                width=img_payload.width,
+                height=img_payload.height,
+                overlap_percentage=img_payload.overlap_percentage,
+                num_inference_steps=img_payload.num_inference_steps,
+                resize_option=img_payload.resize_option,
+                custom_resize_percentage=img_payload.custom_resize_percentage,
+                prompt_input=img_payload.prompt,
+                alignment=img_payload.alignment,
+                overlap_left=img_payload.overlap_left,
+                overlap_right=img_payload.overlap_right,
+                overlap_top=img_payload.overlap_top,
+                overlap_bottom=img_payload.overlap_bottom,
+                api_name=api_name
             )
-            #raise RuntimeError(f"Gradio AI API call or image processing failed: {e}")
\ No newline at end of file
+        )
+        return result
+
+    async def _run_job(self, api_name: str, **kwargs: Any) -> Any:
+        """
+        Submits a prediction and awaits it without holding a thread.
+
+        When this coroutine is cancelled (client disconnected, hedge lost), the
+        job is cancelled too: gradio_client removes it from the Space queue, or
+        stops it at its next iteration, instead of letting it use GPU time.
+        """
+        job = self.client.submit(api_name=api_name, **kwargs)
+        try:
+            return await asyncio.wrap_future(job.future)
+        except asyncio.CancelledError:
+            # Job.cancel() posts to the Space's cancel endpoint: keep it off the event loop
+            asyncio.get_running_loop().run_in_executor(None, _cancel_job, job)
+            raise
+
+
+def _result_paths(result: Any) -> list[str]:
+    """Local file paths downloaded by gradio_client for a prediction (strings or FileData dicts)."""
+    items = result if isinstance(result, (list, tuple)) else [result]
+    paths = []
+    for item in items:
+        if isinstance(item, dict):
+            item = item.get("path")
+        if isinstance(item, str) and item:
+            paths.append(item)
+    if not paths:
+        raise RuntimeError(f"Gradio Space returned no file: {result!r}")
+    return paths
+
+
+def _cancel_job(job: "Job") -> None:
+    try:
+        job.cancel()
+    except Exception as e:
+        logging.warning(f"Could not cancel the Gradio job: {e}")
+
+
+def _read_head(path: str, size: int = 64) -> bytes:
+    with open(path, "rb") as f:
+        return f.read(size)
@@ -0,0 +1,71 @@
+import asyncio
+from dataclasses import dataclass
+
+from src.application.dtos import GeneratedImage
+from src.domain.schema.image_edit_payload import ImgExpandOptions
+from src.infrastructure.cache import NearDuplicateIndex, build_params_key
+from src.shared.executor import run_cpu_bound
+from src.shared.helpers.perceptual_hash import ImageFingerprint, fingerprint_image
+from src.shared.helpers.prepare_outpaint import compose_outpaint
+from src.shared.metrics import timed_stage
+
+
+@dataclass(frozen=True)
+class NearDuplicateLookup:
+    """Fingerprint of a request's input, and the generation reused for it when a near duplicate was found."""
+
+    fingerprint: ImageFingerprint
+    images: list[GeneratedImage] | None = None
+    provider: str | None = None
+
+
+def _paddings(options: ImgExpandOptions) -> tuple[int, int, int, int]:
+    return options.left_pixels, options.right_pixels, options.top_pixels, options.bottom_pixels
+
+
+def _params_key(options: ImgExpandOptions) -> str:
+    # The provider is not part of the key: a stored Vertex AI result serves a routed request and vice versa
+    return build_params_key({"prompt": options.prompt, "mask_dilation": options.mask_dilation})
+
+
+async def find_near_duplicate(
+    index: NearDuplicateIndex,
+    image_bytes: bytes,
+    options: ImgExpandOptions,
+) -> NearDuplicateLookup:
+    """
+    Looks up a previous generation for a re-encoded or resized copy of the
+    input with the same prompt and proportional paddings. The stored images
+    are fitted to the requested canvas around the request's own pixels.
+
+    Args:
+        index: The near-duplicate index.
+        image_bytes: The encoded input image.
+        options: The expansion parameters.
+
+    Returns:
+        NearDuplicateLookup with the fitted images when a near duplicate was found.
+    """
+    with timed_stage("fingerprint"):
+        fingerprint = await run_cpu_bound(fingerprint_image, image_bytes)
+    with timed_stage("near_duplicate"):
+        match = await index.find(fingerprint, _paddings(options), _params_key(options), options.num_candidates)
+    if match is None:
+        return NearDuplicateLookup(fingerprint)
+    with timed_stage("recompose"):
+        composed = await asyncio.gather(
+            *(run_cpu_bound(compose_outpaint, image.data, image_bytes, _paddings(options)) for image in match.images)
+        )
+    images = [GeneratedImage(data=data, mime_type="image/png") for data in composed]
+    return NearDuplicateLookup(fingerprint, images, match.provider)
+
+
+async def remember_generation(
+    index: NearDuplicateIndex,
+    fingerprint: ImageFingerprint,
+    options: ImgExpandOptions,
+    provider: str,
+    images: list[GeneratedImage],
+) -> None:
+    """Stores a provider's generation so that near duplicates of its input can reuse it."""
+    await index.add(fingerprint, _paddings(options), _params_key(options), provider, images)
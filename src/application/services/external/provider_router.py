@@ -0,0 +1,370 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from os import getenv
+from typing import Any, Final
+
+from src.application.dtos import GeneratedImage
+from src.domain.schema.image_edit_payload import ImgExpandOptions, ImgExpandPayloadV2
+from src.shared.concurrency import ProviderBusyError
+from src.shared.executor import ExecutorOverloadedError, run_cpu_bound
+from src.shared.helpers.encode import read_image_size, sniff_mime_type
+from src.shared.helpers.prepare_outpaint import prepare_outpaint_canvas
+from src.shared.helpers.temp_files import remove_file, write_tempfile
+from src.shared.latency import LatencyWindow
+from src.shared.metrics import record_stages, timed_stage
+
+from .google_service import DEFAULT_OUTPAINT_MODEL, VERTEX_UPLOAD_MAX_PIXELS
+from .near_duplicates import find_near_duplicate, remember_generation
+from .registry import ProviderRegistry, ProviderState
+from .tiled_outpaint import TiledOutpainter
+
+
+PROVIDER_ORDER: Final[tuple[str, ...]] = tuple(
+    name.strip().lower() for name in getenv("PROVIDER_ORDER", "vertex,gradio").split(",") if name.strip()
+)
+HEDGE_ENABLED: Final[bool] = getenv("HEDGE_ENABLED", "true").strip().lower() == "true"
+HEDGE_PERCENTILE: Final[float] = float(getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_SAMPLES: Final[int] = int(getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_DEFAULT_DELAY: Final[float] = float(getenv("HEDGE_DEFAULT_DELAY", "20"))
+HEDGE_MIN_DELAY: Final[float] = float(getenv("HEDGE_MIN_DELAY", "1"))
+FAILOVER_ENABLED: Final[bool] = getenv("FAILOVER_ENABLED", "true").strip().lower() == "true"
+# Answer with the local edge/blur fill when every provider is down or failed
+LOCAL_FALLBACK_ENABLED: Final[bool] = getenv("LOCAL_FALLBACK_ENABLED", "false").strip().lower() == "true"
+
+# Parameters of the Flux Fill Outpaint Space used when a Vertex-style request is routed to it
+GRADIO_ROUTED_STEPS: Final[int] = int(getenv("GRADIO_ROUTED_STEPS", "28"))
+GRADIO_ROUTED_OVERLAP_PERCENTAGE: Final[int] = int(getenv("GRADIO_ROUTED_OVERLAP_PERCENTAGE", "10"))
+
+
+class NoProviderAvailableError(RuntimeError):
+    """Raised when no enabled provider is ready to take a request."""
+
+
+@dataclass(frozen=True)
+class RoutedImage:
+    """Generated images (one per requested candidate) together with the provider that produced them."""
+
+    images: tuple[GeneratedImage, ...]
+    provider: str
+    hedged: bool = False
+    failed_over: bool = False
+    # Reused from a previous generation for a near-duplicate input
+    near_duplicate: bool = False
+
+    @property
+    def image(self) -> GeneratedImage:
+        """The first generated candidate."""
+        return self.images[0]
+
+
+@dataclass
+class RouterStats:
+    """Counters of the provider router."""
+
+    requests: int = 0
+    hedges: int = 0
+    hedge_wins: int = 0
+    failovers: int = 0
+    local_fallbacks: int = 0
+    near_duplicates: int = 0
+    wins: dict[str, int] = field(default_factory=dict)
+
+
+def gradio_payload_from_options(options: ImgExpandOptions, image_size: tuple[int, int]) -> ImgExpandPayloadV2:
+    """
+    Maps a padding-based expansion onto the Flux Fill Outpaint parameters.
+
+    The Space places the image inside a width x height canvas according to
+    `alignment`, so paddings on one side only map exactly; paddings on
+    opposite sides are approximated by centering. Sizes are rounded down to
+    multiples of 8 as the model requires.
+
+    Args:
+        options: The Vertex-style expansion.
+        image_size: (width, height) of the input image.
+
+    Returns:
+        The equivalent Gradio payload (the image itself is uploaded as a file).
+    """
+    width, height = image_size
+    left, right, top, bottom = options.left_pixels, options.right_pixels, options.top_pixels, options.bottom_pixels
+    if left == 0 and right > 0 and top == bottom:
+        alignment = "Left"
+    elif right == 0 and left > 0 and top == bottom:
+        alignment = "Right"
+    elif top == 0 and bottom > 0 and left == right:
+        alignment = "Top"
+    elif bottom == 0 and top > 0 and left == right:
+        alignment = "Bottom"
+    else:
+        alignment = "Middle"
+
+    return ImgExpandPayloadV2(
+        url=None,
+        has_url=False,
+        image=None,
+        width=max(8, (width + left + right) // 8 * 8),
+        height=max(8, (height + top + bottom) // 8 * 8),
+        overlap_percentage=GRADIO_ROUTED_OVERLAP_PERCENTAGE,
+        num_inference_steps=GRADIO_ROUTED_STEPS,
+        resize_option="Full",
+        custom_resize_percentage=100,
+        prompt=options.prompt,
+        alignment=alignment,
+        overlap_left=left > 0,
+        overlap_right=right > 0,
+        overlap_top=top > 0,
+        overlap_bottom=bottom > 0,
+        num_candidates=options.num_candidates,
+    )
+
+
+class ProviderRouter:
+    """
+    Sends an expansion request to the preferred provider, hedging it on the
+    other provider once the primary exceeds its usual latency, and failing
+    over to the other provider when the primary errors out.
+
+    The hedge deadline is a percentile of the primary's recent successful
+    latencies (HEDGE_DEFAULT_DELAY until enough samples were observed). The
+    first successful answer wins and the other call is cancelled.
+    """
+
+    def __init__(
+        self,
+        providers: ProviderRegistry,
+        order: tuple[str, ...] = PROVIDER_ORDER,
+        hedge: bool = HEDGE_ENABLED,
+        failover: bool = FAILOVER_ENABLED,
+        local_fallback: bool = LOCAL_FALLBACK_ENABLED,
+    ) -> None:
+        """
+        Args:
+            providers: The registry holding the provider clients.
+            order: Provider names by preference.
+            hedge: Whether slow requests are duplicated on the next provider.
+            failover: Whether failed requests are retried on the next provider.
+            local_fallback: Whether the local fill answers when no provider did.
+        """
+        self.providers = providers
+        self.order = order
+        self.hedge = hedge
+        self.failover = failover
+        self.local_fallback = local_fallback
+        self.latencies: dict[str, LatencyWindow] = {name: LatencyWindow() for name in ("vertex", "gradio")}
+        self.stats = RouterStats()
+
+    def available(self) -> list[str]:
+        """Providers able to take a request right now, by preference."""
+        clients = {"vertex": self.providers.google, "gradio": self.providers.gradio}
+        available = []
+        for name in self.order:
+            if name not in clients:
+                continue
+            state = self.providers.status[name].state
+            # Idle providers are started by their first request
+            if state == ProviderState.IDLE or (
+                clients[name] is not None and state in (ProviderState.READY, ProviderState.DEGRADED)
+            ):
+                available.append(name)
+        return available
+
+    def hedge_delay(self, provider: str) -> float:
+        """Seconds to wait on `provider` before hedging."""
+        window = self.latencies[provider]
+        if len(window) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        return max(HEDGE_MIN_DELAY, window.percentile(HEDGE_PERCENTILE))
+
+    async def generate(self, image_bytes: bytes, options: ImgExpandOptions) -> RoutedImage:
+        """
+        Outpaints an image on whichever provider answers first. A previous
+        generation for a near duplicate of the input is reused when the
+        near-duplicate index is enabled. With `local_fallback`, a request no
+        provider could serve gets the local fill instead of an error
+        (provider "local", a single image).
+
+        Args:
+            image_bytes: The encoded input image.
+            options: The expansion parameters.
+
+        Returns:
+            RoutedImage with the generated images and the winning provider.
+        """
+        index = self.providers.near_duplicates
+        lookup = None
+        if index is not None and not options.tiled:
+            lookup = await find_near_duplicate(index, image_bytes, options)
+            if lookup.images is not None:
+                self.stats.near_duplicates += 1
+                return RoutedImage(tuple(lookup.images), lookup.provider, near_duplicate=True)
+        try:
+            routed = await self._route(image_bytes, options)
+        except (ValueError, TypeError, ExecutorOverloadedError):
+            raise
+        except Exception as e:
+            if not self.local_fallback:
+                raise
+            logging.warning(f"No provider served the outpaint, falling back to the local fill: {e}")
+            return await self._generate_local(image_bytes, options)
+        if lookup is not None:
+            await remember_generation(index, lookup.fingerprint, options, routed.provider, list(routed.images))
+        return routed
+
+    async def _generate_local(self, image_bytes: bytes, options: ImgExpandOptions) -> RoutedImage:
+        """Expands the image with the local blur fill."""
+        # numpy takes about 100 ms to import: it is loaded by the first fallback
+        from src.shared.helpers.local_outpaint import local_outpaint
+
+        self.stats.local_fallbacks += 1
+        with timed_stage("local_outpaint"):
+            data = await run_cpu_bound(
+                local_outpaint,
+                image_bytes,
+                options.left_pixels,
+                options.right_pixels,
+                options.top_pixels,
+                options.bottom_pixels,
+            )
+        return RoutedImage((GeneratedImage(data, sniff_mime_type(data) or "image/jpeg"),), "local", failed_over=True)
+
+    async def _route(self, image_bytes: bytes, options: ImgExpandOptions) -> RoutedImage:
+        """Runs the request on the providers, hedging and failing over between them."""
+        candidates = self.available()
+        if not candidates:
+            raise NoProviderAvailableError("No outpaint provider is available.")
+        self.stats.requests += 1
+
+        running: dict[asyncio.Task, str] = {}
+        failed_over = hedged = False
+        last_error: Exception | None = None
+
+        def launch(provider: str) -> None:
+            task = asyncio.create_task(self._generate_on(provider, image_bytes, options))
+            running[task] = provider
+
+        primary = candidates.pop(0)
+        launch(primary)
+        try:
+            while running:
+                can_hedge = self.hedge and candidates and not hedged
+                timeout = self.hedge_delay(primary) if can_hedge else None
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # The primary is slower than usual: race it against the next provider
+                    hedged = True
+                    self.stats.hedges += 1
+                    launch(candidates.pop(0))
+                    continue
+
+                for task in done:
+                    provider = running.pop(task)
+                    try:
+                        generated_images = task.result()
+                    except (ValueError, TypeError, ExecutorOverloadedError):
+                        # Invalid input or local overload: another provider would not do better
+                        raise
+                    except Exception as e:
+                        logging.warning(f"Outpaint on {provider} failed: {e}")
+                        last_error = e
+                        continue
+                    self.stats.wins[provider] = self.stats.wins.get(provider, 0) + 1
+                    if hedged and provider != primary:
+                        self.stats.hedge_wins += 1
+                    return RoutedImage(tuple(generated_images), provider, hedged=hedged, failed_over=failed_over)
+
+                if not running and candidates and self.failover:
+                    failed_over = True
+                    self.stats.failovers += 1
+                    launch(candidates.pop(0))
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+        raise last_error if last_error is not None else NoProviderAvailableError("No outpaint provider answered.")
+
+    async def _generate_on(self, provider: str, image_bytes: bytes, options: ImgExpandOptions) -> list[GeneratedImage]:
+        """Runs the request on one provider and records its latency when it succeeds."""
+        started = time.perf_counter()
+        if provider == "vertex":
+            generated_images = await self._generate_vertex(image_bytes, options)
+        else:
+            generated_images = await self._generate_gradio(image_bytes, options)
+        self.latencies[provider].observe(time.perf_counter() - started)
+        return generated_images
+
+    async def _generate_vertex(self, image_bytes: bytes, options: ImgExpandOptions) -> list[GeneratedImage]:
+        await self.providers.ensure_started("vertex")
+        google_service = self.providers.google
+        if google_service is None:
+            raise ProviderBusyError("Vertex AI is unavailable.")
+        if options.tiled:
+            # Tiled requests are validated to a single candidate
+            generated_image = await TiledOutpainter(google_service).outpaint(
+                image_bytes=image_bytes,
+                left_pixels=options.left_pixels,
+                right_pixels=options.right_pixels,
+                top_pixels=options.top_pixels,
+                bottom_pixels=options.bottom_pixels,
+                prompt=options.prompt,
+                model_name=DEFAULT_OUTPAINT_MODEL,
+                mask_dilation=options.mask_dilation,
+            )
+            return [generated_image]
+        with timed_stage("prepare"):
+            canvas = await run_cpu_bound(
+                prepare_outpaint_canvas,
+                image_bytes,
+                options.left_pixels,
+                options.right_pixels,
+                options.top_pixels,
+                options.bottom_pixels,
+                VERTEX_UPLOAD_MAX_PIXELS if options.downscale else None,
+            )
+        record_stages(canvas.timings)
+        return await google_service.generate_canvas_images(
+            canvas=canvas,
+            prompt=options.prompt,
+            model_name=DEFAULT_OUTPAINT_MODEL,
+            mask_dilation=options.mask_dilation,
+            num_candidates=options.num_candidates,
+            # Shares its cache entries with the Vertex AI endpoints
+            cache_key=await google_service.outpaint_cache_key(image_bytes, options, DEFAULT_OUTPAINT_MODEL),
+        )
+
+    async def _generate_gradio(self, image_bytes: bytes, options: ImgExpandOptions) -> list[GeneratedImage]:
+        await self.providers.ensure_started("gradio")
+        gradio_service = self.providers.gradio
+        if gradio_service is None:
+            raise ProviderBusyError("The Gradio Space is unavailable.")
+        payload = gradio_payload_from_options(options, read_image_size(image_bytes))
+        suffix = {"image/png": ".png", "image/jpeg": ".jpg", "image/webp": ".webp"}.get(
+            sniff_mime_type(image_bytes) or "", ".png"
+        )
+        image_path = await asyncio.to_thread(write_tempfile, image_bytes, suffix)
+        try:
+            return await gradio_service.generate_images(payload, image_path=image_path)
+        finally:
+            await asyncio.to_thread(remove_file, image_path)
+
+    def describe(self) -> dict[str, Any]:
+        """Router counters and current hedge deadlines, serializable as JSON."""
+        return {
+            "order": list(self.order),
+            "hedge": self.hedge,
+            "failover": self.failover,
+            "local_fallback": self.local_fallback,
+            "requests": self.stats.requests,
+            "hedges": self.stats.hedges,
+            "hedge_wins": self.stats.hedge_wins,
+            "failovers": self.stats.failovers,
+            "local_fallbacks": self.stats.local_fallbacks,
+            "near_duplicates": self.stats.near_duplicates,
+            "wins": dict(self.stats.wins),
+            "hedge_delay_s": {name: self.hedge_delay(name) for name in self.latencies},
+        }
@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from enum import StrEnum
+from os import getenv
+from typing import Any, Final
+
+from src.infrastructure.cache import ResultCache, create_image_fetch_cache, create_near_duplicate_index, create_result_cache
+from src.shared.resilience import get_provider_resilience
+from src.shared.singleflight import SingleFlight
+from src.shared.sweeper import DirectorySweeper
+
+from .google_service import GoogleService
+from .gradio_service import DEFAULT_GRADIO_SPACE, GRADIO_DOWNLOAD_DIR, GradioService
+
+
+PROVIDER_WARMUP_TIMEOUT: Final[float] = float(getenv("PROVIDER_WARMUP_TIMEOUT", "30"))
+SINGLE_FLIGHT_ENABLED: Final[bool] = getenv("SINGLE_FLIGHT_ENABLED", "true").strip().lower() == "true"
+GRADIO_TEMP_MAX_BYTES: Final[int] = int(getenv("GRADIO_TEMP_MAX_BYTES", str(1024 * 1024 * 1024)))
+GRADIO_TEMP_MAX_AGE: Final[float] = float(getenv("GRADIO_TEMP_MAX_AGE", "3600"))
+GRADIO_TEMP_SWEEP_INTERVAL: Final[float] = float(getenv("GRADIO_TEMP_SWEEP_INTERVAL", "300"))
+# Build each provider client (and import its SDK) on its first request instead of at startup
+PROVIDER_LAZY_START: Final[bool] = getenv("PROVIDER_LAZY_START", "false").strip().lower() == "true"
+ENABLED_PROVIDERS: Final[frozenset[str]] = frozenset(
+    name.strip().lower() for name in getenv("ENABLED_PROVIDERS", "vertex,gradio").split(",") if name.strip()
+)
+
+
+class ProviderState(StrEnum):
+    """Lifecycle state of a provider client."""
+
+    STARTING = "starting"
+    IDLE = "idle"
+    DISABLED = "disabled"
+    READY = "ready"
+    DEGRADED = "degraded"
+    UNAVAILABLE = "unavailable"
+
+
+@dataclass
+class ProviderStatus:
+    """Readiness information reported for one provider."""
+
+    state: ProviderState = ProviderState.STARTING
+    detail: str | None = None
+    warmup_ms: float | None = None
+    updated_at: float = field(default_factory=time.time)
+
+
+class ProviderRegistry:
+    """
+    Owns the long-lived provider services shared by every request.
+
+    The services are built and warmed up once by the application lifespan
+    (`start`) and released on shutdown (`close`). A provider whose
+    configuration is missing is reported as unavailable instead of
+    preventing the application from starting.
+
+    With `lazy`, `start` only marks the enabled providers as idle and each
+    one is built on its first use (`ensure_started`), so cold starts do not
+    pay for importing and warming up the provider SDKs.
+    """
+
+    def __init__(
+        self,
+        gradio_space: str = DEFAULT_GRADIO_SPACE,
+        enabled: frozenset[str] = ENABLED_PROVIDERS,
+        cache: ResultCache | None = None,
+        lazy: bool = PROVIDER_LAZY_START,
+    ) -> None:
+        """
+        Args:
+            gradio_space: Hugging Face Space used by the Gradio provider.
+            enabled: Names of the providers to start ("vertex", "gradio").
+            cache: Result cache shared by the providers. Defaults to the
+                one configured through the RESULT_CACHE_* environment.
+            lazy: Whether providers are started on their first use.
+        """
+        self.gradio_space = gradio_space
+        self.enabled = enabled
+        self.lazy = lazy
+        self.cache = cache if cache is not None else create_result_cache()
+        self.single_flight = SingleFlight() if SINGLE_FLIGHT_ENABLED else None
+        # Shared by every Gradio request whose input image is a URL
+        self.image_fetcher = create_image_fetch_cache()
+        # Reuses generations across re-encoded or resized copies of an input (NEAR_DUPLICATE_DB)
+        self.near_duplicates = create_near_duplicate_index()
+        self.google: GoogleService | None = None
+        self.gradio: GradioService | None = None
+        # Enforces a disk budget on the Gradio downloads left behind by failed deliveries
+        self.gradio_sweeper = DirectorySweeper(
+            GRADIO_DOWNLOAD_DIR, GRADIO_TEMP_MAX_BYTES, GRADIO_TEMP_MAX_AGE, GRADIO_TEMP_SWEEP_INTERVAL
+        )
+        self.status: dict[str, ProviderStatus] = {
+            name: ProviderStatus() if name in enabled else ProviderStatus(ProviderState.DISABLED, "disabled by ENABLED_PROVIDERS")
+            for name in ("vertex", "gradio")
+        }
+        self._start_locks = {name: asyncio.Lock() for name in self.status}
+
+    @property
+    def ready(self) -> bool:
+        """True when every enabled provider is ready, degraded or waiting for its first use."""
+        return all(
+            status.state in (ProviderState.READY, ProviderState.DEGRADED, ProviderState.IDLE, ProviderState.DISABLED)
+            for status in self.status.values()
+        )
+
+    async def start(self) -> None:
+        """Builds and warms up every enabled provider concurrently, or marks them idle when lazy."""
+        if "gradio" in self.enabled:
+            self.gradio_sweeper.start()
+        if self.lazy:
+            for name in self.enabled & self.status.keys():
+                self._set_status(name, ProviderState.IDLE, "starts on first use")
+            return
+        await asyncio.gather(*(self._starter(name)() for name in self.status if name in self.enabled))
+
+    async def ensure_started(self, provider: str) -> None:
+        """
+        Starts an idle provider; concurrent first requests wait for the same start.
+
+        Args:
+            provider: "vertex" or "gradio".
+        """
+        if self.status[provider].state != ProviderState.IDLE:
+            return
+        async with self._start_locks[provider]:
+            if self.status[provider].state == ProviderState.IDLE:
+                self._set_status(provider, ProviderState.STARTING, None)
+                await self._starter(provider)()
+
+    def _starter(self, provider: str) -> Callable[[], Awaitable[None]]:
+        return {"vertex": self._start_google, "gradio": self._start_gradio}[provider]
+
+    async def _start_google(self) -> None:
+        started = time.perf_counter()
+        try:
+            self.google = GoogleService(
+                cache=self.cache, single_flight=self.single_flight, near_duplicates=self.near_duplicates
+            )
+        except Exception as e:
+            logging.error(f"Vertex AI client could not be created: {e}")
+            self._set_status("vertex", ProviderState.UNAVAILABLE, str(e))
+            return
+        try:
+            await asyncio.wait_for(self.google.warm_up(), timeout=PROVIDER_WARMUP_TIMEOUT)
+        except Exception as e:
+            # The client exists, requests may still succeed once the upstream recovers.
+            logging.warning(f"Vertex AI warm-up failed: {e!r}")
+            self._set_status("vertex", ProviderState.DEGRADED, f"warm-up failed: {e!r}", started)
+            return
+        self._set_status("vertex", ProviderState.READY, None, started)
+
+    async def _start_gradio(self) -> None:
+        started = time.perf_counter()
+        try:
+            # The gradio_client constructor fetches the Space config over the network.
+            self.gradio = await asyncio.wait_for(
+                asyncio.to_thread(
+                    GradioService, self.gradio_space, self.cache, self.single_flight, image_fetcher=self.image_fetcher
+                ),
+                timeout=PROVIDER_WARMUP_TIMEOUT,
+            )
+        except Exception as e:
+            logging.error(f"Gradio client could not be created: {e!r}")
+            self._set_status("gradio", ProviderState.UNAVAILABLE, repr(e))
+            return
+        try:
+            await asyncio.wait_for(self.gradio.warm_up(), timeout=PROVIDER_WARMUP_TIMEOUT)
+        except Exception as e:
+            logging.warning(f"Gradio warm-up failed: {e!r}")
+            self._set_status("gradio", ProviderState.DEGRADED, f"warm-up failed: {e!r}", started)
+            return
+        self._set_status("gradio", ProviderState.READY, None, started)
+
+    def _set_status(
+        self,
+        provider: str,
+        state: ProviderState,
+        detail: str | None,
+        started: float | None = None,
+    ) -> None:
+        self.status[provider] = ProviderStatus(
+            state=state,
+            detail=detail,
+            warmup_ms=round((time.perf_counter() - started) * 1000, 1) if started is not None else None,
+        )
+
+    async def close(self) -> None:
+        """Releases the provider clients."""
+        await self.gradio_sweeper.stop()
+        if self.gradio is not None:
+            self.gradio.close()
+            self.gradio = None
+        self.google = None
+        if self.near_duplicates is not None:
+            self.near_duplicates.close()
+            self.near_duplicates = None
+        for status in self.status.values():
+            if status.state != ProviderState.DISABLED:
+                status.state = ProviderState.UNAVAILABLE
+                status.detail = "shut down"
+
+    def describe(self) -> dict[str, Any]:
+        """Readiness report, serializable as JSON."""
+        return {
+            name: {
+                "state": status.state,
+                "detail": status.detail,
+                "warmup_ms": status.warmup_ms,
+                **get_provider_resilience(name).describe(),
+            }
+            for name, status in self.status.items()
+        }
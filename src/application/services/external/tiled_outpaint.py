@@ -0,0 +1,161 @@
+import asyncio
+from os import getenv
+from typing import Final
+
+from PIL import Image
+
+from src.application.dtos import GeneratedImage
+from src.shared.helpers.encode import image_to_bytes, open_image
+from src.shared.helpers.add_black_pixels import validate_padding
+from src.shared.helpers.prepare_outpaint import OutpaintCanvas
+from src.shared.metrics import record_stages
+from src.shared.helpers.tiles import Side, Tile, build_tile_canvas, paste_tile, plan_strip
+
+from .google_service import GoogleService
+
+
+TILED_OUTPAINT_TILE_SIZE: Final[int] = int(getenv("TILED_OUTPAINT_TILE_SIZE", "1024"))
+TILED_OUTPAINT_OVERLAP: Final[int] = int(getenv("TILED_OUTPAINT_OVERLAP", "128"))
+TILED_OUTPAINT_CONCURRENCY: Final[int] = int(getenv("TILED_OUTPAINT_CONCURRENCY", "4"))
+
+
+class TiledOutpainter:
+    """
+    Outpaints large expansions as strips of tiles generated concurrently on Vertex AI.
+
+    The left and right strips are generated first, then the top and bottom
+    strips over the full new width, so corners get context from both
+    directions. Each strip extends the known region by at most half a tile;
+    deeper expansions take several rounds. Within a round every tile is
+    independent, so wall-clock time follows the number of rounds rather than
+    the total area.
+    """
+
+    def __init__(
+        self,
+        google_service: GoogleService,
+        tile_size: int = TILED_OUTPAINT_TILE_SIZE,
+        overlap: int = TILED_OUTPAINT_OVERLAP,
+        concurrency: int = TILED_OUTPAINT_CONCURRENCY,
+    ) -> None:
+        """
+        Args:
+            google_service: The Vertex AI service generating each tile.
+            tile_size: Maximum side of a tile canvas, in pixels.
+            overlap: Pixels shared by neighbouring tiles of a strip, cross-faded.
+            concurrency: Tiles of one request generated at the same time.
+        """
+        if not 0 <= overlap < tile_size // 2:
+            raise ValueError("The tile overlap must be smaller than half the tile size.")
+        self.google_service = google_service
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def outpaint(
+        self,
+        image_bytes: bytes,
+        left_pixels: int,
+        right_pixels: int,
+        top_pixels: int,
+        bottom_pixels: int,
+        prompt: str,
+        model_name: str,
+        mask_dilation: float = 0.03,
+    ) -> GeneratedImage:
+        """
+        Expands an image tile by tile.
+
+        Args:
+            image_bytes: The encoded input image.
+            left_pixels: Number of pixels to add to the left side.
+            right_pixels: Number of pixels to add to the right side.
+            top_pixels: Number of pixels to add to the top side.
+            bottom_pixels: Number of pixels to add to the bottom side.
+            prompt: Text prompt to guide the generation of every tile.
+            model_name: Name of the Vertex AI model to use.
+            mask_dilation: Mask dilation factor between 0.0 and 1.0.
+
+        Returns:
+            GeneratedImage with the full canvas as PNG.
+        """
+        validate_padding(left_pixels, right_pixels, top_pixels, bottom_pixels)
+        # The working canvas stays in this process between rounds: pixel work runs on threads
+        canvas, known_box = await asyncio.to_thread(
+            _new_canvas, image_bytes, left_pixels, right_pixels, top_pixels, bottom_pixels
+        )
+
+        remaining = {Side.LEFT: left_pixels, Side.RIGHT: right_pixels, Side.TOP: top_pixels, Side.BOTTOM: bottom_pixels}
+        for sides in ((Side.LEFT, Side.RIGHT), (Side.TOP, Side.BOTTOM)):
+            while any(remaining[side] for side in sides):
+                tiles = []
+                for side in sides:
+                    if remaining[side]:
+                        depth = min(remaining[side], self.tile_size // 2)
+                        tiles += plan_strip(side, known_box, depth, self.tile_size, self.overlap)
+                        remaining[side] -= depth
+                await self._run_round(canvas, tiles, prompt, model_name, mask_dilation)
+                known_box = _extend_box(known_box, tiles)
+
+        image_data = await asyncio.to_thread(image_to_bytes, canvas, "PNG")
+        return GeneratedImage(data=image_data, mime_type="image/png")
+
+    async def _run_round(
+        self,
+        canvas: Image.Image,
+        tiles: list[Tile],
+        prompt: str,
+        model_name: str,
+        mask_dilation: float,
+    ) -> None:
+        """Generates every tile of a round concurrently, then pastes them in strip order."""
+
+        async def generate(tile: Tile) -> tuple[OutpaintCanvas, bytes]:
+            tile_canvas = await asyncio.to_thread(build_tile_canvas, canvas, tile)
+            record_stages(tile_canvas.timings)
+            async with self._semaphore:
+                generated_image = await self.google_service.generate_image(
+                    input_image_bytes=tile_canvas.image_bytes,
+                    mask_image_bytes=tile_canvas.mask_bytes,
+                    prompt=prompt,
+                    model_name=model_name,
+                    mask_dilation=mask_dilation,
+                )
+            return tile_canvas, generated_image.data
+
+        results = await asyncio.gather(*(generate(tile) for tile in tiles))
+        for tile, (tile_canvas, generated_bytes) in zip(tiles, results):
+            await asyncio.to_thread(paste_tile, canvas, tile, tile_canvas, generated_bytes)
+
+
+def _new_canvas(
+    image_bytes: bytes,
+    left_pixels: int,
+    right_pixels: int,
+    top_pixels: int,
+    bottom_pixels: int,
+) -> tuple[Image.Image, tuple[int, int, int, int]]:
+    """Pastes the original onto the full-size working canvas and returns the box it covers."""
+    original_image = open_image(image_bytes)
+    mode = "RGBA" if original_image.mode in ("RGBA", "LA") else "RGB"
+    if original_image.mode != mode:
+        original_image = original_image.convert(mode)
+    width, height = original_image.size
+    canvas = Image.new(mode, (width + left_pixels + right_pixels, height + top_pixels + bottom_pixels))
+    canvas.paste(original_image, (left_pixels, top_pixels))
+    return canvas, (left_pixels, top_pixels, left_pixels + width, top_pixels + height)
+
+
+def _extend_box(known_box: tuple[int, int, int, int], tiles: list[Tile]) -> tuple[int, int, int, int]:
+    """Known region after a round."""
+    x0, y0, x1, y1 = known_box
+    for tile in tiles:
+        if tile.side == Side.LEFT:
+            x0 = min(x0, tile.target_box[0])
+        elif tile.side == Side.RIGHT:
+            x1 = max(x1, tile.target_box[2])
+        elif tile.side == Side.TOP:
+            y0 = min(y0, tile.target_box[1])
+        else:
+            y1 = max(y1, tile.target_box[3])
+    return x0, y0, x1, y1
@@ -0,0 +1,9 @@
+from .job_manager import Job, JobManager, JobQueueFullError, JobStatus
+
+
+__all__ = [
+    "Job",
+    "JobManager",
+    "JobQueueFullError",
+    "JobStatus",
+]
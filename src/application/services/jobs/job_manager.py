@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from enum import StrEnum
+from os import getenv
+from typing import Any, Awaitable, Callable, Final
+
+
+JOB_WORKERS: Final[int] = int(getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_MAX_SIZE: Final[int] = int(getenv("JOB_QUEUE_MAX_SIZE", "100"))
+JOB_RESULT_TTL: Final[float] = float(getenv("JOB_RESULT_TTL", "3600"))
+
+JobFunction = Callable[[], Awaitable[dict[str, Any]]]
+
+
+class JobStatus(StrEnum):
+    """Lifecycle of a job."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+    @property
+    def finished(self) -> bool:
+        return self in (JobStatus.SUCCEEDED, JobStatus.FAILED)
+
+
+class JobQueueFullError(RuntimeError):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+@dataclass
+class Job:
+    """A unit of provider work executed by the JobManager workers."""
+
+    id: str
+    kind: str
+    status: JobStatus = JobStatus.QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    result: dict[str, Any] | None = None
+    error: str | None = None
+    _changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Public view of the job, serializable as JSON."""
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+    def _notify(self) -> None:
+        # Wake current watchers and arm a fresh event for the next change
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+
+class JobManager:
+    """
+    In-process job queue drained by a bounded pool of worker tasks.
+
+    Jobs are kept in memory, so a job id is only known to the worker
+    process that accepted it. Finished jobs are forgotten after `result_ttl`.
+    """
+
+    def __init__(
+        self,
+        workers: int = JOB_WORKERS,
+        max_queue_size: int = JOB_QUEUE_MAX_SIZE,
+        result_ttl: float = JOB_RESULT_TTL,
+    ) -> None:
+        """
+        Args:
+            workers: Number of jobs executed concurrently.
+            max_queue_size: Number of queued jobs beyond which submissions are rejected.
+            result_ttl: Seconds a finished job stays retrievable.
+        """
+        if workers < 1 or max_queue_size < 1:
+            raise ValueError("Job workers and queue size must be positive integers.")
+        self.workers = workers
+        self.result_ttl = result_ttl
+        self.jobs: dict[str, Job] = {}
+        self._queue: asyncio.Queue[tuple[Job, JobFunction]] = asyncio.Queue(maxsize=max_queue_size)
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def queued(self) -> int:
+        """Number of jobs waiting for a worker."""
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        """Starts the worker tasks on the running event loop."""
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker(), name=f"job-worker-{i}") for i in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Cancels the workers; queued jobs are dropped."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, kind: str, fn: JobFunction) -> Job:
+        """
+        Queues a job.
+
+        Args:
+            kind: Label of the job (e.g. "vertex.outpaint").
+            fn: Zero-argument coroutine function producing the job result.
+
+        Raises:
+            JobQueueFullError: If the queue is at capacity.
+        """
+        self._prune()
+        job = Job(id=uuid.uuid4().hex, kind=kind)
+        try:
+            self._queue.put_nowait((job, fn))
+        except asyncio.QueueFull:
+            raise JobQueueFullError(f"Job queue is full ({self._queue.maxsize} queued jobs). Retry later.")
+        self.jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        """Returns a job by id, or None if unknown or expired."""
+        return self.jobs.get(job_id)
+
+    async def watch(self, job: Job, heartbeat: float = 15.0) -> AsyncIterator[dict[str, Any] | None]:
+        """
+        Yields the job snapshot now and after every status change until it
+        finishes. Yields None every `heartbeat` seconds without change.
+        """
+        while True:
+            changed = job._changed
+            yield job.snapshot()
+            if job.status.finished:
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=heartbeat)
+            except TimeoutError:
+                yield None
+
+    async def _worker(self) -> None:
+        while True:
+            job, fn = await self._queue.get()
+            try:
+                job.status = JobStatus.RUNNING
+                job.started_at = time.time()
+                job._notify()
+                try:
+                    job.result = await fn()
+                    job.status = JobStatus.SUCCEEDED
+                except asyncio.CancelledError:
+                    job.status = JobStatus.FAILED
+                    job.error = "Job cancelled by shutdown."
+                    raise
+                except Exception as e:
+                    logging.error(f"Job {job.id} ({job.kind}) failed: {e}", exc_info=True)
+                    job.status = JobStatus.FAILED
+                    job.error = str(e)
+            finally:
+                job.finished_at = time.time()
+                job._notify()
+                self._queue.task_done()
+
+    def _prune(self) -> None:
+        """Forgets finished jobs older than the result TTL."""
+        expiry = time.time() - self.result_ttl
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job.status.finished and job.finished_at is not None and job.finished_at < expiry
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
@@ -1,7 +1,19 @@
-from .image_examples import TINY_IMAGE_B64, TINY_MASK_IMAGE_B64
+from typing import Any
+
+from .schema_examples import EXAMPLE_IMAGE_B64, EXAMPLE_MASK_IMAGE_B64
 
 __all__ = [
+    "EXAMPLE_IMAGE_B64",
+    "EXAMPLE_MASK_IMAGE_B64",
     "TINY_IMAGE_B64",
     "TINY_MASK_IMAGE_B64",
 ]
 
+
+def __getattr__(name: str) -> Any:
+    # The full-size example images (~370 KB of source) are only loaded when asked for
+    if name in ("TINY_IMAGE_B64", "TINY_MASK_IMAGE_B64"):
+        from . import image_examples
+
+        return getattr(image_examples, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,22 @@
+# Small images embedded in the OpenAPI examples. The full-size example images
+# (image_examples.py) are served on demand by GET /api/v1/examples/{name}.
+
+# 48x36 thumbnail of TINY_IMAGE_B64
+EXAMPLE_IMAGE_B64 = (
+    "iVBORw0KGgoAAAANSUhEUgAAADAAAAAkCAMAAAD4m0k4AAAAYFBMVEXl5eDe29HZ1MnT0cXRzMDIwrautbWppZ2PpLWmlYSNjoqC"
+    "nLN7lKtyiZ6ecjiRZi53gYd1cmmJXit/Wix0USZmf5RedolUYWhkSydbRCNQQy02SlQ8NSIVFQ4CAQEAAADNEuE/AAACHElEQVR4"
+    "2o3T65KjIBAFYKNcBEXuIkJ23v8t9xCTnfzB2jMpqqbSH92IGX4++fNjuGCUPhBCyTSO4+PKIPHlJ8MXsNYaSgmTlNBp+hU3YGCS"
+    "I4zQcfwVXWAs51ZyRqexdfgP8GB0HIZhIhOdCGniHsjhFcLYxEkLCOrHG4CRrJ2HiV6AkDbVDeCnOZ9leTDGKfn0GMfBdEFJNUlF"
+    "OZ4VQ+jr6ZJHD1hmpdljVO8YYyQQ7YKTSWuUWq8oFfdiZojR9gBlKaF+WdZFRRUB4ox7JH0wiKQWRK0R5XsqaeWC0x6ovIF5wTit"
+    "HPW1RCkE63YA2JcZ4+wppVJKrXWXQvJuBznxiAYxpVkas9cGZil56oCnTXVFg3LiLRSCp+fzGWcp+iDUqmZV/gVgX8UNyCGnWEpq"
+    "2fGXyjOZO3DqgPL9KynJG1CzP8q+f16NuLfLUIzfjHSccV3mT3DjYDOh3Q5nLihn7zSC92QWk+mDtL47LK/t0UCton9xGQA3vbSd"
+    "1/V9lJmL/qHz2V7SK3hG+EGYVQp2A6rdcjha8nl4750T2ombkfK2ZRRnLGcN3vkA4M4eOHLdfM4hNIHFO+2F9r52bxo1PgSvsWA9"
+    "stdu25zrAswUrlrngtPbkV0DunbvoVacGEJr7bzetpAPv+luh5qPeoQDTXwT2HzT+cByA7B7E9j9I1py/7G2gfB5CeebaJdRb8DV"
+    "5DXUdXCN/77BX1M7lQeq+M0AAAAAAElFTkSuQmCC"
+)
+
+# 48x36 mask matching EXAMPLE_IMAGE_B64: white where pixels are generated
+EXAMPLE_MASK_IMAGE_B64 = (
+    "iVBORw0KGgoAAAANSUhEUgAAADAAAAAkAQAAAADnPoSnAAAAGElEQVR42mP4z8DAwPCfiYGBgYGBYWRRABKdAkXrpBd9AAAAAElF"
+    "TkSuQmCC"
+)
@@ -1,12 +1,12 @@
 from pydantic import BaseModel, ConfigDict,Field
 from typing import Annotated, Any
-from src.domain.constants.examples import TINY_IMAGE_B64, TINY_MASK_IMAGE_B64
+from src.domain.constants.examples import EXAMPLE_IMAGE_B64, EXAMPLE_MASK_IMAGE_B64
 
 
 
 google_payload_example: dict[str, Any] = {
-    "input_image_b64": TINY_IMAGE_B64, # Use placeholder or truncated actual data
-    "mask_image_b64": TINY_MASK_IMAGE_B64,  # Use placeholder or truncated actual data
+    "input_image_b64": EXAMPLE_IMAGE_B64, # Use placeholder or truncated actual data
+    "mask_image_b64": EXAMPLE_MASK_IMAGE_B64,  # Use placeholder or truncated actual data
     "prompt": "A cozy, minimalist living room with a large window overlooking a city skyline. Add some modern art on the walls.",
     "model": "imagen-3.0-capability-001",
     "mask_dilation": 0.03 
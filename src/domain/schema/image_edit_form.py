@@ -0,0 +1,44 @@
+from typing import Annotated
+
+from fastapi import UploadFile
+from pydantic import ConfigDict, Field
+
+from src.domain.schema.image_edit_payload import ImgExpandOptions, ImgExpandOptionsV2
+
+
+class ImgExpandForm(ImgExpandOptions):
+    """
+    Multipart variant of ImgExpandPayload: the image is sent as a raw file
+    part and the expansion parameters as form fields.
+    """
+
+    image: Annotated[
+        UploadFile,
+        Field(description="The input reference image to be expanded (PNG, JPEG, WEBP...)."),
+    ]
+
+    model_config: ConfigDict = ConfigDict(
+        str_strip_whitespace=True,
+        extra="forbid",
+        frozen=True,
+        arbitrary_types_allowed=True,
+    )
+
+
+class ImgExpandFormV2(ImgExpandOptionsV2):
+    """
+    Multipart variant of ImgExpandPayloadV2: the image is sent as a raw file
+    part and the Flux Fill Outpaint parameters as form fields.
+    """
+
+    image: Annotated[
+        UploadFile,
+        Field(description="The input reference image to be expanded (PNG, JPEG, WEBP...)."),
+    ]
+
+    model_config: ConfigDict = ConfigDict(
+        str_strip_whitespace=True,
+        extra="forbid",
+        frozen=True,
+        arbitrary_types_allowed=True,
+    )
@@ -1,17 +1,20 @@
-from pydantic import BaseModel, ConfigDict,Field
-from typing import Annotated, Any
-from src.domain.constants.examples import TINY_IMAGE_B64, TINY_MASK_IMAGE_B64
+from pydantic import BaseModel, ConfigDict,Field, model_validator
+from typing import Annotated, Any, Final
+from src.domain.constants.examples import EXAMPLE_IMAGE_B64
 
 img_payload_example: dict[str, Any] = {
-    "url": TINY_IMAGE_B64,  # Use placeholder or truncated actual data
+    "url": EXAMPLE_IMAGE_B64,  # Use placeholder or truncated actual data
     "size": None,
     "mime_type": "image/png",
     "orig_name": None,
     "is_stream": False,
 }
 
+# Variants one request may ask for; Imagen returns at most 4 images per call
+MAX_CANDIDATES: Final[int] = 4
+
 imgexpand_payload_example: dict[str, Any] = {
-    "input_image_b64": TINY_IMAGE_B64, # Use placeholder or truncated actual data
+    "input_image_b64": EXAMPLE_IMAGE_B64, # Use placeholder or truncated actual data
     "prompt": "A cozy, minimalist living room with a large window overlooking a city skyline. Add some modern art on the walls.",
     "mask_dilation": 0.03,
     "left_pixels": 200,
@@ -73,16 +76,12 @@ class ImgPayload(BaseModel):
         json_schema_extra={"example": img_payload_example},
     )
 
-class ImgExpandPayload(BaseModel):
+class ImgExpandOptions(BaseModel):
     """
-    Schema for the payload to expand an image's canvas by adding pixels to its sides.
-    This can be used in conjunction with image generation/outpainting.
+    Expansion parameters shared by the JSON and multipart outpaint endpoints:
+    the prompt and the number of pixels to add to each side of the canvas.
     """
 
-    input_image_b64: Annotated[
-        str,
-        Field(min_length=1, description="Base64 encoded string of the input reference image to be expanded."),
-    ]
     prompt: Annotated[
         str,
         Field(description="Text prompt to guide the image generation or editing process after expansion."),
@@ -107,29 +106,53 @@ class ImgExpandPayload(BaseModel):
         int,
         Field(default=0, description="Number of pixels to add to the bottom side of the image canvas.")
     ]
+    downscale: Annotated[
+        bool,
+        Field(default=False, description="Upload the canvas at the provider's working resolution, then upscale only the generated borders and paste the original pixels back at full resolution.")
+    ]
+    tiled: Annotated[
+        bool,
+        Field(default=False, description="Generate the expansion as overlapping tiles in parallel, for wide banners and panoramas. Takes precedence over `downscale`.")
+    ]
+    num_candidates: Annotated[
+        int,
+        Field(default=1, ge=1, le=MAX_CANDIDATES, description="Number of variants generated in one upstream call. With more than one, the JSON response also lists every variant in `generated_images_b64`.")
+    ]
 
     model_config: ConfigDict = ConfigDict(
         str_strip_whitespace=True,
         extra="forbid",
         frozen=True,
-        json_schema_extra={"example": imgexpand_payload_example},
     )
 
-class ImgExpandPayloadV2(BaseModel):
+    @model_validator(mode="after")
+    def check_candidates(self) -> "ImgExpandOptions":
+        if self.tiled and self.num_candidates > 1:
+            raise ValueError("Tiled outpainting generates a single image: `num_candidates` must be 1.")
+        return self
+
+class ImgExpandPayload(ImgExpandOptions):
     """
     Schema for the payload to expand an image's canvas by adding pixels to its sides.
     This can be used in conjunction with image generation/outpainting.
     """
-    print("INTO...")
-    url: Annotated[
-        str | None,
-        Field(description="Base64 encoded string of the input reference image to be expanded."),
-    ]
-    has_url: Annotated[
-        bool,
-        Field(default=True, description="Set value as true if the url is provided, otherwise false."),
+
+    input_image_b64: Annotated[
+        str,
+        Field(min_length=1, description="Base64 encoded string of the input reference image to be expanded."),
     ]
-    image: ImgPayload | None = None
+
+    model_config: ConfigDict = ConfigDict(
+        str_strip_whitespace=True,
+        extra="forbid",
+        frozen=True,
+        json_schema_extra={"example": imgexpand_payload_example},
+    )
+
+class ImgExpandOptionsV2(BaseModel):
+    """
+    Flux Fill Outpaint parameters shared by the JSON and multipart Gradio endpoints.
+    """
     width: Annotated[
         int, 
         Field(description="Specifies the output Width."),
@@ -181,6 +204,31 @@ class ImgExpandPayloadV2(BaseModel):
         bool,
         Field(default=True, description="Alignment option for the outpainting. Defaults to 'Middle'."),
     ]
+    num_candidates: Annotated[
+        int,
+        Field(default=1, ge=1, le=MAX_CANDIDATES, description="Number of variants to generate. With more than one, the JSON response also lists every variant in `generated_images_b64`."),
+    ]
+
+    model_config: ConfigDict = ConfigDict(
+        str_strip_whitespace=True,
+        extra="forbid",
+        frozen=True,
+    )
+
+class ImgExpandPayloadV2(ImgExpandOptionsV2):
+    """
+    Schema for the payload to expand an image's canvas by adding pixels to its sides.
+    This can be used in conjunction with image generation/outpainting.
+    """
+    url: Annotated[
+        str | None,
+        Field(description="Base64 encoded string of the input reference image to be expanded."),
+    ]
+    has_url: Annotated[
+        bool,
+        Field(default=True, description="Set value as true if the url is provided, otherwise false."),
+    ]
+    image: ImgPayload | None = None
 
     model_config: ConfigDict = ConfigDict(
         str_strip_whitespace=True,
@@ -0,0 +1,24 @@
+from .image_fetch_cache import FetchedImage, ImageFetchCache, ImageFetchError, create_image_fetch_cache
+from .near_duplicate_index import (
+    NearDuplicateIndex,
+    NearDuplicateMatch,
+    build_params_key,
+    create_near_duplicate_index,
+)
+from .result_cache import ResultCache, build_cache_key, create_result_cache, digest_bytes, digest_file
+
+__all__ = [
+    "FetchedImage",
+    "ImageFetchCache",
+    "ImageFetchError",
+    "NearDuplicateIndex",
+    "NearDuplicateMatch",
+    "ResultCache",
+    "build_cache_key",
+    "build_params_key",
+    "create_image_fetch_cache",
+    "create_near_duplicate_index",
+    "create_result_cache",
+    "digest_bytes",
+    "digest_file",
+]
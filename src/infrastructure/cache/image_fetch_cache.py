@@ -0,0 +1,195 @@
+import logging
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from http import HTTPStatus
+from os import getenv
+from typing import Any, Final
+
+import httpx
+from cachetools import TTLCache
+
+from src.infrastructure.external.http_client import HttpClient, get_http_client
+from src.shared.singleflight import SingleFlight
+
+
+IMAGE_FETCH_ENABLED: Final[bool] = getenv("IMAGE_FETCH_ENABLED", "true").strip().lower() == "true"
+IMAGE_FETCH_CACHE_MAX_BYTES: Final[int] = int(getenv("IMAGE_FETCH_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+IMAGE_FETCH_CACHE_TTL: Final[float] = float(getenv("IMAGE_FETCH_CACHE_TTL", "86400"))
+IMAGE_FETCH_MAX_BYTES: Final[int] = int(getenv("IMAGE_FETCH_MAX_BYTES", str(32 * 1024 * 1024)))
+
+
+class ImageFetchError(ValueError):
+    """Raised when a remote input image cannot be downloaded."""
+
+
+@dataclass(frozen=True)
+class FetchedImage:
+    """A downloaded image with the validators needed to revalidate it."""
+
+    data: bytes
+    mime_type: str | None
+    etag: str | None = None
+    last_modified: str | None = None
+    # time.monotonic() until which the entry is used without revalidation
+    fresh_until: float = 0.0
+
+
+@dataclass
+class ImageFetchStats:
+    """Counters of an ImageFetchCache."""
+
+    fresh_hits: int = 0
+    revalidated: int = 0
+    downloads: int = 0
+
+
+def _freshness(headers: httpx.Headers) -> tuple[bool, float]:
+    """(storable, seconds the response may be used without revalidation) from Cache-Control / Expires."""
+    directives = {
+        part.strip().split("=", 1)[0].lower(): part.strip().split("=", 1)[1] if "=" in part else ""
+        for part in headers.get("cache-control", "").split(",")
+        if part.strip()
+    }
+    if "no-store" in directives:
+        return False, 0.0
+    if "no-cache" in directives:
+        return True, 0.0
+    if "max-age" in directives:
+        try:
+            return True, max(0.0, float(directives["max-age"].strip('"')))
+        except ValueError:
+            return True, 0.0
+    if "expires" in headers and "date" in headers:
+        try:
+            delta = parsedate_to_datetime(headers["expires"]) - parsedate_to_datetime(headers["date"])
+            return True, max(0.0, delta.total_seconds())
+        except (TypeError, ValueError):
+            pass
+    # No explicit freshness: revalidate on every use
+    return True, 0.0
+
+
+class ImageFetchCache:
+    """
+    Downloads remote input images through the shared HTTP client and keeps
+    them in an in-memory LRU.
+
+    Entries are reused as-is while fresh (Cache-Control max-age / Expires),
+    then revalidated with If-None-Match / If-Modified-Since: a `304` reuses the
+    cached bytes without downloading them again. Concurrent fetches of the
+    same URL share one request.
+    """
+
+    def __init__(
+        self,
+        http_client: HttpClient,
+        max_bytes: int = IMAGE_FETCH_CACHE_MAX_BYTES,
+        ttl: float = IMAGE_FETCH_CACHE_TTL,
+        max_download_bytes: int = IMAGE_FETCH_MAX_BYTES,
+    ) -> None:
+        """
+        Args:
+            http_client: The pooled client used for downloads.
+            max_bytes: Size budget of the cached images.
+            ttl: Seconds an entry is kept at most, revalidated or not.
+            max_download_bytes: Size above which a download is aborted.
+        """
+        self.http_client = http_client
+        self.max_download_bytes = max_download_bytes
+        self.entries: TTLCache = TTLCache(maxsize=max_bytes, ttl=ttl, getsizeof=lambda image: len(image.data))
+        self.single_flight = SingleFlight()
+        self.stats = ImageFetchStats()
+
+    async def fetch(self, url: str) -> FetchedImage:
+        """
+        Returns the image at `url`, from the cache when it is still valid.
+
+        Raises:
+            ImageFetchError: If the download fails or exceeds `max_download_bytes`.
+        """
+        cached: FetchedImage | None = self.entries.get(url)
+        if cached is not None and time.monotonic() < cached.fresh_until:
+            self.stats.fresh_hits += 1
+            return cached
+        return await self.single_flight.do(url, lambda: self._download(url, cached))
+
+    async def _download(self, url: str, cached: FetchedImage | None) -> FetchedImage:
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+        try:
+            async with self.http_client.stream("GET", url, headers=headers) as response:
+                if response.status_code == HTTPStatus.NOT_MODIFIED and cached is not None:
+                    self.stats.revalidated += 1
+                    storable, max_age = _freshness(response.headers)
+                    image = FetchedImage(
+                        data=cached.data,
+                        mime_type=cached.mime_type,
+                        etag=response.headers.get("etag", cached.etag),
+                        last_modified=response.headers.get("last-modified", cached.last_modified),
+                        fresh_until=time.monotonic() + max_age,
+                    )
+                    self._store(url, image, storable)
+                    return image
+                response.raise_for_status()
+                data = await self._read_limited(response)
+        except httpx.HTTPStatusError as e:
+            raise ImageFetchError(f"Could not download {url}: HTTP {e.response.status_code}") from e
+        except httpx.HTTPError as e:
+            raise ImageFetchError(f"Could not download {url}: {e!r}") from e
+
+        self.stats.downloads += 1
+        storable, max_age = _freshness(response.headers)
+        image = FetchedImage(
+            data=data,
+            mime_type=response.headers.get("content-type", "").split(";")[0].strip() or None,
+            etag=response.headers.get("etag"),
+            last_modified=response.headers.get("last-modified"),
+            fresh_until=time.monotonic() + max_age,
+        )
+        # Without validators nor freshness the entry could never be reused
+        self._store(url, image, storable and (max_age > 0 or bool(image.etag or image.last_modified)))
+        return image
+
+    async def _read_limited(self, response: httpx.Response) -> bytes:
+        declared = response.headers.get("content-length")
+        if declared and declared.isdigit() and int(declared) > self.max_download_bytes:
+            raise ImageFetchError(f"Remote image is larger than {self.max_download_bytes} bytes.")
+        chunks = []
+        size = 0
+        async for chunk in response.aiter_bytes():
+            size += len(chunk)
+            if size > self.max_download_bytes:
+                raise ImageFetchError(f"Remote image is larger than {self.max_download_bytes} bytes.")
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    def _store(self, url: str, image: FetchedImage, storable: bool) -> None:
+        if not storable:
+            self.entries.pop(url, None)
+            return
+        try:
+            self.entries[url] = image
+        except ValueError:
+            logging.info(f"Remote image {url} is larger than the fetch cache; not cached")
+
+    def describe(self) -> dict[str, Any]:
+        """Counters and sizes, serializable as JSON."""
+        return {
+            "fresh_hits": self.stats.fresh_hits,
+            "revalidated": self.stats.revalidated,
+            "downloads": self.stats.downloads,
+            "entries": len(self.entries),
+            "bytes": self.entries.currsize,
+        }
+
+
+def create_image_fetch_cache() -> ImageFetchCache | None:
+    """Builds the fetch cache on the shared HTTP client from the IMAGE_FETCH_* environment, or None when disabled."""
+    if not IMAGE_FETCH_ENABLED:
+        return None
+    return ImageFetchCache(get_http_client())
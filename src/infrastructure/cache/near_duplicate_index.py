@@ -0,0 +1,316 @@
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from os import getenv
+from pathlib import Path
+from typing import Any, Final
+
+import orjson
+
+from src.application.dtos import GeneratedImage
+from src.shared.helpers.perceptual_hash import HASH_BITS, ImageFingerprint, hamming_distance
+
+
+# SQLite file of the index; unset disables near-duplicate reuse
+NEAR_DUPLICATE_DB: Final[str | None] = getenv("NEAR_DUPLICATE_DB") or None
+NEAR_DUPLICATE_MAX_DISTANCE: Final[int] = int(getenv("NEAR_DUPLICATE_MAX_DISTANCE", "6"))
+NEAR_DUPLICATE_GEOMETRY_TOLERANCE: Final[float] = float(getenv("NEAR_DUPLICATE_GEOMETRY_TOLERANCE", "0.01"))
+NEAR_DUPLICATE_MAX_ENTRIES: Final[int] = int(getenv("NEAR_DUPLICATE_MAX_ENTRIES", "10000"))
+
+# The pHash is split into bands stored in indexed columns. Two hashes at
+# distance d < HASH_BANDS share at least one band, so lookups within that
+# distance only visit the rows sharing a band with the query.
+HASH_BANDS: Final[int] = 8
+BAND_BITS: Final[int] = HASH_BITS // HASH_BANDS
+
+_BAND_COLUMNS: Final[list[str]] = [f"band{index}" for index in range(HASH_BANDS)]
+_SCHEMA: Final[str] = f"""
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    params_key TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    phash INTEGER NOT NULL,
+    dhash INTEGER NOT NULL,
+    {", ".join(f"{column} INTEGER NOT NULL" for column in _BAND_COLUMNS)},
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    left_pixels INTEGER NOT NULL,
+    right_pixels INTEGER NOT NULL,
+    top_pixels INTEGER NOT NULL,
+    bottom_pixels INTEGER NOT NULL,
+    candidates INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+{"".join(f"CREATE INDEX IF NOT EXISTS entries_{column} ON entries (params_key, {column});" for column in _BAND_COLUMNS)}
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+CREATE TABLE IF NOT EXISTS images (
+    entry_id INTEGER NOT NULL,
+    candidate INTEGER NOT NULL,
+    mime_type TEXT NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (entry_id, candidate)
+);
+"""
+
+
+def _to_signed(value: int) -> int:
+    """SQLite integers are signed 64-bit: store the upper half of the hashes as negatives."""
+    return value - (1 << HASH_BITS) if value >= 1 << (HASH_BITS - 1) else value
+
+
+def _bands(value: int) -> list[int]:
+    return [(value >> (index * BAND_BITS)) & ((1 << BAND_BITS) - 1) for index in range(HASH_BANDS)]
+
+
+def build_params_key(params: dict[str, Any]) -> str:
+    """SHA-256 hex digest of the generation parameters that must match exactly (prompt, ...)."""
+    return hashlib.sha256(orjson.dumps(params, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+@dataclass(frozen=True)
+class NearDuplicateMatch:
+    """Stored generation of a near-duplicate input."""
+
+    images: list[GeneratedImage]
+    provider: str
+    distance: int
+
+
+@dataclass
+class NearDuplicateStats:
+    """Counters of a NearDuplicateIndex."""
+
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+    errors: int = 0
+
+
+class NearDuplicateIndex:
+    """
+    SQLite index of processed inputs by perceptual hash, with their
+    expansion geometry and generated images.
+
+    A lookup matches an entry with the same parameters, the same aspect
+    ratio and proportional paddings (within `geometry_tolerance` of each
+    side), whose pHash and dHash are both within `max_distance` bits of the
+    query: a re-encoded or resized copy of a processed image. Least recently
+    used entries are removed beyond `max_entries`. The database may be shared
+    by several worker processes.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_distance: int = NEAR_DUPLICATE_MAX_DISTANCE,
+        geometry_tolerance: float = NEAR_DUPLICATE_GEOMETRY_TOLERANCE,
+        max_entries: int = NEAR_DUPLICATE_MAX_ENTRIES,
+    ) -> None:
+        """
+        Args:
+            path: SQLite database file, created when missing.
+            max_distance: Largest Hamming distance, in bits, of a near duplicate.
+            geometry_tolerance: Largest difference of aspect ratio (relative)
+                and of each padding (as a fraction of its side).
+            max_entries: Entries kept at most.
+        """
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_distance = max_distance
+        self.geometry_tolerance = geometry_tolerance
+        self.max_entries = max_entries
+        self.stats = NearDuplicateStats()
+        # One connection used from worker threads, one statement at a time
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._connection.create_function("hamming", 2, hamming_distance, deterministic=True)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(_SCHEMA)
+
+    async def find(
+        self,
+        fingerprint: ImageFingerprint,
+        paddings: tuple[int, int, int, int],
+        params_key: str,
+        num_candidates: int = 1,
+    ) -> NearDuplicateMatch | None:
+        """
+        Returns the stored generation of the closest near duplicate, or None.
+
+        Args:
+            fingerprint: Perceptual hashes and size of the input image.
+            paddings: (left, right, top, bottom) pixels of the requested expansion.
+            params_key: `build_params_key` of the other generation parameters.
+            num_candidates: Images the match must provide.
+        """
+        try:
+            match = await asyncio.to_thread(self._find, fingerprint, paddings, params_key, num_candidates)
+        except sqlite3.Error as e:
+            self.stats.errors += 1
+            logging.warning(f"Near-duplicate lookup failed: {e}")
+            return None
+        if match is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return match
+
+    async def add(
+        self,
+        fingerprint: ImageFingerprint,
+        paddings: tuple[int, int, int, int],
+        params_key: str,
+        provider: str,
+        images: list[GeneratedImage],
+    ) -> None:
+        """Stores the images generated for an input, evicting the least recently used entries beyond the limit."""
+        if not images:
+            return
+        try:
+            self.stats.evictions += await asyncio.to_thread(
+                self._add, fingerprint, paddings, params_key, provider, images
+            )
+            self.stats.stores += 1
+        except sqlite3.Error as e:
+            self.stats.errors += 1
+            logging.warning(f"Near-duplicate store failed: {e}")
+
+    def _find(
+        self,
+        fingerprint: ImageFingerprint,
+        paddings: tuple[int, int, int, int],
+        params_key: str,
+        num_candidates: int,
+    ) -> NearDuplicateMatch | None:
+        left, right, top, bottom = paddings
+        parameters: dict[str, Any] = {
+            "params_key": params_key,
+            "phash": _to_signed(fingerprint.phash),
+            "dhash": _to_signed(fingerprint.dhash),
+            "distance": self.max_distance,
+            "width": fingerprint.width,
+            "height": fingerprint.height,
+            "left": left,
+            "right": right,
+            "top": top,
+            "bottom": bottom,
+            "tolerance": self.geometry_tolerance,
+            "candidates": num_candidates,
+        }
+        if self.max_distance < HASH_BANDS:
+            parameters.update(zip(_BAND_COLUMNS, _bands(fingerprint.phash)))
+            hash_filter = " OR ".join(f"(params_key = :params_key AND {column} = :{column})" for column in _BAND_COLUMNS)
+        else:
+            hash_filter = "params_key = :params_key"
+        # Ratios are compared cross-multiplied: |a/b - c/d| <= t  <=>  |a*d - c*b| <= t*b*d
+        query = f"""
+            SELECT id, provider, hamming(phash, :phash) AS distance
+            FROM entries
+            WHERE ({hash_filter})
+              AND candidates >= :candidates
+              AND hamming(phash, :phash) <= :distance
+              AND hamming(dhash, :dhash) <= :distance
+              AND abs(width * :height - :width * height) <= :tolerance * width * :height
+              AND abs(left_pixels * :width - :left * width) <= :tolerance * width * :width
+              AND abs(right_pixels * :width - :right * width) <= :tolerance * width * :width
+              AND abs(top_pixels * :height - :top * height) <= :tolerance * height * :height
+              AND abs(bottom_pixels * :height - :bottom * height) <= :tolerance * height * :height
+            ORDER BY distance, last_used DESC
+            LIMIT 1
+        """
+        with self._lock:
+            row = self._connection.execute(query, parameters).fetchone()
+            if row is None:
+                return None
+            entry_id, provider, distance = row
+            images = self._connection.execute(
+                "SELECT mime_type, data FROM images WHERE entry_id = ? ORDER BY candidate LIMIT ?",
+                (entry_id, num_candidates),
+            ).fetchall()
+            with self._connection:
+                self._connection.execute("UPDATE entries SET last_used = ? WHERE id = ?", (time.time(), entry_id))
+        if len(images) < num_candidates:
+            return None
+        return NearDuplicateMatch(
+            images=[GeneratedImage(data=data, mime_type=mime_type) for mime_type, data in images],
+            provider=provider,
+            distance=distance,
+        )
+
+    def _add(
+        self,
+        fingerprint: ImageFingerprint,
+        paddings: tuple[int, int, int, int],
+        params_key: str,
+        provider: str,
+        images: list[GeneratedImage],
+    ) -> int:
+        """Inserts an entry and returns the number of entries evicted."""
+        row = (
+            params_key,
+            provider,
+            _to_signed(fingerprint.phash),
+            _to_signed(fingerprint.dhash),
+            *_bands(fingerprint.phash),
+            fingerprint.width,
+            fingerprint.height,
+            *paddings,
+            len(images),
+            time.time(),
+        )
+        columns = (
+            "params_key, provider, phash, dhash, "
+            + ", ".join(_BAND_COLUMNS)
+            + ", width, height, left_pixels, right_pixels, top_pixels, bottom_pixels, candidates, last_used"
+        )
+        with self._lock:
+            with self._connection:
+                cursor = self._connection.execute(
+                    f"INSERT INTO entries ({columns}) VALUES ({', '.join('?' * len(row))})", row
+                )
+                self._connection.executemany(
+                    "INSERT INTO images (entry_id, candidate, mime_type, data) VALUES (?, ?, ?, ?)",
+                    [(cursor.lastrowid, index, image.mime_type, image.data) for index, image in enumerate(images)],
+                )
+                (count,) = self._connection.execute("SELECT count(*) FROM entries").fetchone()
+                excess = count - self.max_entries
+                if excess <= 0:
+                    return 0
+                evicted = [
+                    entry_id
+                    for (entry_id,) in self._connection.execute(
+                        "SELECT id FROM entries ORDER BY last_used LIMIT ?", (excess,)
+                    )
+                ]
+                self._connection.executemany("DELETE FROM images WHERE entry_id = ?", [(entry_id,) for entry_id in evicted])
+                self._connection.executemany("DELETE FROM entries WHERE id = ?", [(entry_id,) for entry_id in evicted])
+                return len(evicted)
+
+    def describe(self) -> dict[str, Any]:
+        """Counters and settings, serializable as JSON."""
+        return {
+            "hits": self.stats.hits,
+            "misses": self.stats.misses,
+            "stores": self.stats.stores,
+            "evictions": self.stats.evictions,
+            "errors": self.stats.errors,
+            "max_distance": self.max_distance,
+            "max_entries": self.max_entries,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+def create_near_duplicate_index() -> NearDuplicateIndex | None:
+    """Builds the index from the NEAR_DUPLICATE_* environment, or None when NEAR_DUPLICATE_DB is unset."""
+    if NEAR_DUPLICATE_DB is None:
+        return None
+    return NearDuplicateIndex(NEAR_DUPLICATE_DB)
@@ -0,0 +1,259 @@
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from os import getenv
+from pathlib import Path
+from typing import Any, Final
+
+import orjson
+from cachetools import TTLCache
+
+from src.application.dtos import GeneratedImage
+
+
+RESULT_CACHE_ENABLED: Final[bool] = getenv("RESULT_CACHE_ENABLED", "true").strip().lower() == "true"
+RESULT_CACHE_MEMORY_MAX_BYTES: Final[int] = int(getenv("RESULT_CACHE_MEMORY_MAX_BYTES", str(256 * 1024 * 1024)))
+RESULT_CACHE_TTL: Final[float] = float(getenv("RESULT_CACHE_TTL", "3600"))
+RESULT_CACHE_DIR: Final[str | None] = getenv("RESULT_CACHE_DIR") or None
+RESULT_CACHE_DISK_MAX_BYTES: Final[int] = int(getenv("RESULT_CACHE_DISK_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+RESULT_CACHE_DISK_TTL: Final[float] = float(getenv("RESULT_CACHE_DISK_TTL", "86400"))
+
+# Separates the MIME type header from the image bytes in disk entries
+_DISK_HEADER_SEPARATOR: Final[bytes] = b"\n"
+
+
+def build_cache_key(provider: str, image_digest: str, params: dict[str, Any]) -> str:
+    """
+    Builds a content-addressed cache key.
+
+    Args:
+        provider: Provider name ("vertex", "gradio"), so results never cross providers.
+        image_digest: SHA-256 hex digest of the input image (or of its reference).
+        params: Every generation parameter that influences the output.
+
+    Returns:
+        A SHA-256 hex digest identifying the generation.
+    """
+    hasher = hashlib.sha256()
+    hasher.update(provider.encode("utf-8"))
+    hasher.update(image_digest.encode("ascii"))
+    hasher.update(orjson.dumps(params, option=orjson.OPT_SORT_KEYS))
+    return hasher.hexdigest()
+
+
+def digest_bytes(*chunks: bytes) -> str:
+    """SHA-256 hex digest of the given byte strings, in order."""
+    hasher = hashlib.sha256()
+    for chunk in chunks:
+        hasher.update(len(chunk).to_bytes(8, "big"))
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def digest_file(path: str) -> str:
+    """SHA-256 hex digest of a file, read in chunks."""
+    hasher = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+@dataclass
+class CacheStats:
+    """Hit/miss counters of a ResultCache."""
+
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    disk_evictions: int = 0
+
+
+class DiskCache:
+    """
+    File-per-entry cache directory with a TTL and a total size budget.
+
+    Entries are written atomically so several workers can share the directory.
+    When the budget is exceeded the least recently used files are removed.
+    Methods are called from worker threads: the size accounting is locked.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, ttl: float) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._size_lock = threading.Lock()
+        self._size = sum(entry.stat().st_size for entry in self._entries())
+
+    def _entries(self) -> list[os.DirEntry]:
+        return [entry for entry in os.scandir(self.directory) if entry.is_file() and entry.name.endswith(".bin")]
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.bin"
+
+    def get(self, key: str) -> GeneratedImage | None:
+        path = self._path(key)
+        try:
+            stat = path.stat()
+            if time.time() - stat.st_mtime > self.ttl:
+                path.unlink(missing_ok=True)
+                with self._size_lock:
+                    self._size -= stat.st_size
+                return None
+            content = path.read_bytes()
+            # Access time drives the LRU eviction
+            os.utime(path, (time.time(), stat.st_mtime))
+        except FileNotFoundError:
+            return None
+        mime_type, _, data = content.partition(_DISK_HEADER_SEPARATOR)
+        return GeneratedImage(data=data, mime_type=mime_type.decode("ascii"))
+
+    def set(self, key: str, image: GeneratedImage) -> int:
+        """Stores an entry and returns the number of entries evicted to make room."""
+        content = image.mime_type.encode("ascii") + _DISK_HEADER_SEPARATOR + image.data
+        if len(content) > self.max_bytes:
+            return 0
+        path = self._path(key)
+        file_descriptor, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, "wb") as file:
+                file.write(content)
+            try:
+                replaced_size = path.stat().st_size
+            except FileNotFoundError:
+                replaced_size = 0
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        with self._size_lock:
+            # Re-storing a key replaces its file
+            self._size += len(content) - replaced_size
+            over_budget = self._size > self.max_bytes
+        if over_budget:
+            return self._evict()
+        return 0
+
+    def _evict(self) -> int:
+        """Removes expired entries, then the least recently used ones, down to 90% of the budget."""
+        now = time.time()
+        entries = []
+        for entry in self._entries():
+            stat = entry.stat()
+            entries.append((stat.st_atime, stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        total = sum(size for _, _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        for atime, mtime, size, path in entries:
+            if total <= target and now - mtime <= self.ttl:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        with self._size_lock:
+            self._size = total
+        return evicted
+
+
+class ResultCache:
+    """
+    Two-tier cache of generated images: an in-memory LRU with TTL in front of
+    an optional on-disk tier.
+
+    Keys are built with `build_cache_key` from the input image hash and every
+    generation parameter, so identical requests map to the same entry.
+    """
+
+    def __init__(
+        self,
+        memory_max_bytes: int = RESULT_CACHE_MEMORY_MAX_BYTES,
+        ttl: float = RESULT_CACHE_TTL,
+        disk_dir: str | None = RESULT_CACHE_DIR,
+        disk_max_bytes: int = RESULT_CACHE_DISK_MAX_BYTES,
+        disk_ttl: float = RESULT_CACHE_DISK_TTL,
+    ) -> None:
+        """
+        Args:
+            memory_max_bytes: Size budget of the in-memory tier, in image bytes.
+            ttl: Lifetime of in-memory entries, in seconds.
+            disk_dir: Directory of the on-disk tier. None disables it.
+            disk_max_bytes: Size budget of the on-disk tier.
+            disk_ttl: Lifetime of on-disk entries, in seconds.
+        """
+        self.memory: TTLCache = TTLCache(
+            maxsize=memory_max_bytes,
+            ttl=ttl,
+            getsizeof=lambda image: len(image.data),
+        )
+        self.disk: DiskCache | None = DiskCache(disk_dir, disk_max_bytes, disk_ttl) if disk_dir else None
+        self.stats = CacheStats()
+
+    async def get(self, key: str) -> GeneratedImage | None:
+        """Returns the cached image for `key`, promoting disk hits to memory."""
+        image = self.memory.get(key)
+        if image is not None:
+            self.stats.memory_hits += 1
+            return image
+        if self.disk is not None:
+            try:
+                image = await asyncio.to_thread(self.disk.get, key)
+            except OSError as e:
+                logging.warning(f"Result cache disk read failed: {e}")
+                image = None
+            if image is not None:
+                self.stats.disk_hits += 1
+                self._set_memory(key, image)
+                return image
+        self.stats.misses += 1
+        return None
+
+    async def set(self, key: str, image: GeneratedImage) -> None:
+        """Stores a generated image in every tier."""
+        self.stats.stores += 1
+        self._set_memory(key, image)
+        if self.disk is not None:
+            try:
+                self.stats.disk_evictions += await asyncio.to_thread(self.disk.set, key, image)
+            except OSError as e:
+                logging.warning(f"Result cache disk write failed: {e}")
+
+    def _set_memory(self, key: str, image: GeneratedImage) -> None:
+        try:
+            self.memory[key] = image
+        except ValueError:
+            # Larger than the whole memory budget: keep it on disk only
+            pass
+
+    def describe(self) -> dict[str, Any]:
+        """Counters and sizes, serializable as JSON."""
+        return {
+            "memory_hits": self.stats.memory_hits,
+            "disk_hits": self.stats.disk_hits,
+            "misses": self.stats.misses,
+            "stores": self.stats.stores,
+            "disk_evictions": self.stats.disk_evictions,
+            "memory_entries": len(self.memory),
+            "memory_bytes": self.memory.currsize,
+            "disk_enabled": self.disk is not None,
+        }
+
+
+def create_result_cache() -> ResultCache | None:
+    """Builds the result cache from the RESULT_CACHE_* environment, or None when disabled."""
+    if not RESULT_CACHE_ENABLED:
+        return None
+    return ResultCache()
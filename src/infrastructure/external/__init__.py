@@ -0,0 +1,7 @@
+from .http_client import HttpClient, close_http_client, get_http_client
+
+__all__ = [
+    "HttpClient",
+    "close_http_client",
+    "get_http_client",
+]
@@ -1,8 +1,43 @@
-from typing import Any, AsyncGenerator, Final
+from os import getenv
+from typing import TYPE_CHECKING, Final
 
-from httpx import AsyncClient, Response
+from src.infrastructure.external.http_client import httpx_client_args
 
+if TYPE_CHECKING:
+    from google import genai
 
-REQUEST_TIMEOUT: Final[float] = 60.0
 
+REQUEST_TIMEOUT: Final[float] = float(getenv("VERTEX_REQUEST_TIMEOUT", "60"))
 
+
+class GoogleClient:
+    """
+    Builds the google-genai client on the process-wide connection settings:
+    a keep-alive pool sized like the shared HTTP client, HTTP/2 when `h2` is
+    installed, and an explicit request timeout instead of the SDK default.
+    """
+
+    @staticmethod
+    def create(project: str, location: str, use_vertexai: bool = True) -> "genai.Client":
+        """
+        Args:
+            project: Google Cloud project.
+            location: Vertex AI region.
+            use_vertexai: Whether to call Vertex AI rather than the Gemini API.
+
+        Returns:
+            The configured genai client.
+        """
+        # Imported here: google.genai takes about a second to import
+        from google import genai
+        from google.genai.types import HttpOptions
+
+        return genai.Client(
+            vertexai=use_vertexai,
+            project=project,
+            location=location,
+            http_options=HttpOptions(
+                timeout=int(REQUEST_TIMEOUT * 1000),
+                async_client_args=httpx_client_args(REQUEST_TIMEOUT),
+            ),
+        )
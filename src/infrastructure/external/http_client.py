@@ -0,0 +1,106 @@
+import asyncio
+import importlib.util
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from os import getenv
+from typing import Any, Final
+
+import httpx
+
+HTTP_MAX_CONNECTIONS: Final[int] = int(getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS: Final[int] = int(getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY: Final[float] = float(getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_CONNECT_TIMEOUT: Final[float] = float(getenv("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_TIMEOUT: Final[float] = float(getenv("HTTP_TIMEOUT", "60"))
+HTTP_MAX_CONCURRENCY: Final[int] = int(getenv("HTTP_MAX_CONCURRENCY", "32"))
+HTTP2_ENABLED: Final[bool] = getenv("HTTP2_ENABLED", "true").strip().lower() == "true"
+
+
+def http2_available() -> bool:
+    """True when HTTP/2 is enabled and its optional dependency (`h2`, from `httpx[http2]`) is installed."""
+    return HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+
+
+def httpx_client_args(timeout: float = HTTP_TIMEOUT) -> dict[str, Any]:
+    """
+    Connection pool settings shared by every httpx client of the process,
+    including the ones built by the provider SDKs.
+
+    Args:
+        timeout: Read/write/pool timeout, in seconds.
+
+    Returns:
+        Keyword arguments for `httpx.AsyncClient`.
+    """
+    return {
+        "limits": httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        "timeout": httpx.Timeout(timeout, connect=HTTP_CONNECT_TIMEOUT),
+        "http2": http2_available(),
+    }
+
+
+class HttpClient:
+    """
+    Process-wide async HTTP client: one keep-alive connection pool (HTTP/2
+    when available) shared by every outgoing request, with a cap on the
+    requests in flight so a burst cannot exhaust sockets.
+    """
+
+    def __init__(self, max_concurrency: int = HTTP_MAX_CONCURRENCY, **client_args: Any) -> None:
+        """
+        Args:
+            max_concurrency: Maximum number of requests in flight.
+            client_args: Overrides of `httpx_client_args()` (e.g. a test transport).
+        """
+        args = {**httpx_client_args(), "follow_redirects": True, **client_args}
+        # Whether the pool offers HTTP/2 (servers may still answer in HTTP/1.1)
+        self.http2: bool = args["http2"]
+        self._client = httpx.AsyncClient(**args)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """Sends a request and reads the whole response body."""
+        async with self._semaphore:
+            return await self._client.request(method, url, **kwargs)
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs: Any) -> AsyncIterator[httpx.Response]:
+        """
+        Sends a request and yields the response before its body is read:
+
+            async with client.stream("GET", url) as response:
+                async for chunk in response.aiter_bytes():
+                    ...
+        """
+        async with self._semaphore:
+            async with self._client.stream(method, url, **kwargs) as response:
+                yield response
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+_http_client: HttpClient | None = None
+
+
+def get_http_client() -> HttpClient:
+    """Returns the process-wide HTTP client, creating it on first use."""
+    global _http_client
+    if _http_client is None:
+        _http_client = HttpClient()
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Closes the process-wide HTTP client and its connections if it was created."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
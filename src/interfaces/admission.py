@@ -0,0 +1,66 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from http import HTTPStatus
+
+from fastapi import HTTPException
+
+from src.domain.schema.image_edit_payload import ImgExpandOptions
+from src.shared.helpers.encode import read_base64_image_header, read_image_header
+from src.shared.memory_budget import (
+    ImageTooLargeError,
+    MemoryBudgetBusyError,
+    estimate_outpaint_memory,
+    get_memory_budget,
+)
+
+
+@asynccontextmanager
+async def admit_outpaint(image: str | bytes, options: ImgExpandOptions) -> AsyncIterator[None]:
+    """
+    Reserves the memory an outpaint needs for the duration of the block,
+    estimated from the image header and the paddings before any pixel is decoded.
+
+    Raises:
+        HTTPException: 400 for an unreadable image, 413 when the request
+            exceeds the whole budget, 503 when the memory did not free up in time.
+    """
+    try:
+        if isinstance(image, str):
+            width, height, mode = read_base64_image_header(image)
+        else:
+            width, height, mode = read_image_header(image)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=str(e),
+        )
+    estimate = estimate_outpaint_memory(
+        width,
+        height,
+        mode,
+        options.left_pixels,
+        options.right_pixels,
+        options.top_pixels,
+        options.bottom_pixels,
+        encoded_size=len(image),
+        num_candidates=options.num_candidates,
+    )
+
+    budget = get_memory_budget()
+    try:
+        await budget.acquire(estimate)
+    except ImageTooLargeError as e:
+        raise HTTPException(
+            status_code=HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e),
+        )
+    except MemoryBudgetBusyError as e:
+        raise HTTPException(
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "2"},
+        )
+    try:
+        yield
+    finally:
+        await budget.release(estimate)
@@ -0,0 +1,85 @@
+import asyncio
+from dataclasses import asdict, is_dataclass
+from http import HTTPStatus
+from os import getenv
+from typing import Any, AsyncIterator, Awaitable, Callable, Final, Sequence, TypeVar
+
+import orjson
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from src.shared.executor import waiting_for_capacity
+
+
+BATCH_MAX_ITEMS: Final[int] = int(getenv("BATCH_MAX_ITEMS", "100"))
+BATCH_MAX_CONCURRENCY: Final[int] = int(getenv("BATCH_MAX_CONCURRENCY", "8"))
+
+NDJSON_MEDIA_TYPE: Final[str] = "application/x-ndjson"
+
+# OpenAPI description of the streamed batch responses
+BATCH_RESPONSES: Final[dict[int | str, dict[str, Any]]] = {
+    200: {
+        "content": {NDJSON_MEDIA_TYPE: {}},
+        "description": "One JSON line per item, in completion order, with its `index` in the request.",
+    },
+}
+
+T = TypeVar("T")
+
+
+async def _run_item(index: int, item: T, process: Callable[[T], Awaitable[Any]], semaphore: asyncio.Semaphore) -> dict[str, Any]:
+    """
+    Processes one item and turns its outcome, success or failure, into a result line.
+    Its CPU work waits for executor capacity instead of failing when the executor is full.
+    """
+    async with semaphore:
+        try:
+            with waiting_for_capacity():
+                result = await process(item)
+        except HTTPException as e:
+            return {"index": index, "status": "failed", "status_code": e.status_code, "error": e.detail}
+        except Exception as e:
+            return {
+                "index": index,
+                "status": "failed",
+                "status_code": HTTPStatus.INTERNAL_SERVER_ERROR,
+                "error": str(e),
+            }
+    return {"index": index, "status": "succeeded", **(asdict(result) if is_dataclass(result) else {"data": result})}
+
+
+async def _stream_results(
+    items: Sequence[T],
+    process: Callable[[T], Awaitable[Any]],
+    concurrency: int,
+) -> AsyncIterator[bytes]:
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = [asyncio.create_task(_run_item(index, item, process, semaphore)) for index, item in enumerate(items)]
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            yield orjson.dumps(await next_result) + b"\n"
+    finally:
+        # The client went away or the stream was closed: stop the remaining work and wait for
+        # the cancelled provider calls to release their slots before the response ends
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def stream_batch(
+    items: Sequence[T],
+    process: Callable[[T], Awaitable[Any]],
+    concurrency: int = BATCH_MAX_CONCURRENCY,
+) -> StreamingResponse:
+    """
+    Processes the items concurrently and streams one NDJSON line per item as
+    soon as it completes. A failing item yields an error line instead of
+    failing the whole batch.
+
+    Args:
+        items: The batch items.
+        process: Coroutine function handling one item; HTTPException is
+            reported with its status code.
+        concurrency: Maximum items processed at the same time.
+    """
+    return StreamingResponse(_stream_results(items, process, concurrency), media_type=NDJSON_MEDIA_TYPE)
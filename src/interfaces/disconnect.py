@@ -0,0 +1,52 @@
+import asyncio
+from typing import Awaitable, Final, TypeVar
+
+from fastapi import HTTPException, Request
+
+from src.shared.metrics import CLIENT_DISCONNECTS
+
+T = TypeVar("T")
+
+# Non-standard status (nginx) logged for requests abandoned by their client; never actually received
+CLIENT_CLOSED_REQUEST: Final[int] = 499
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    """Returns once the client has closed the connection. The request body must already be read."""
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def cancel_on_disconnect(request: Request, work: Awaitable[T]) -> T:
+    """
+    Awaits `work` while watching the connection: if the client disconnects
+    first, the work is cancelled, which cancels the provider call in flight
+    and skips the post-processing of a result nobody would read.
+
+    Args:
+        request: The incoming request, whose body has been read.
+        work: The handler's coroutine.
+
+    Returns:
+        The result of `work`.
+
+    Raises:
+        HTTPException: 499 when the client disconnected before the work finished.
+    """
+    work_task = asyncio.ensure_future(work)
+    disconnect_task = asyncio.create_task(_wait_for_disconnect(request))
+    try:
+        await asyncio.wait((work_task, disconnect_task), return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        disconnect_task.cancel()
+        if not work_task.done():
+            work_task.cancel()
+            # Let the work release its provider slot, memory reservation and temp files
+            await asyncio.gather(work_task, return_exceptions=True)
+    if work_task.cancelled():
+        route = request.scope.get("route")
+        CLIENT_DISCONNECTS.inc(route=getattr(route, "path", request.url.path))
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed the request.")
+    return work_task.result()
@@ -1,16 +1,4 @@
-from typing import Union
-
-from fastapi import FastAPI
-from fastapi.responses import ORJSONResponse
-from src.shared import API, DEBUG
-
-from .routers import (
-    image_edit_router,
-    google_router,
-    gradio_router,
-)
-
-from os import getenv, path
+from os import path
 from dotenv import load_dotenv
 
 # --- NEW: Calculate the path to the .env file ---
@@ -30,6 +18,53 @@ dotenv_path = path.join(project_root_dir, '.env')
 # This line should be at the very top of your application's loading process.
 load_dotenv(dotenv_path=dotenv_path)
 
+# Logging goes through a background queue from the first import on (LOG_* variables)
+from src.shared.logs import configure_logging
+
+configure_logging()
+
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from src.application.services.external import ProviderRegistry, ProviderRouter
+from src.application.services.jobs import JobManager
+from src.infrastructure.external import close_http_client
+from src.shared import API, DEBUG, shutdown_cpu_executor
+from src.shared.metrics import METRICS
+
+from .middleware import MetricsMiddleware, RequestLoggingMiddleware
+from .openapi import install_openapi
+
+from .routers import (
+    examples_router,
+    image_edit_router,
+    google_router,
+    gradio_router,
+    health_router,
+    jobs_router,
+    outpaint_router,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Application lifespan: builds and warms up the provider clients, provider router and job workers, releases them on shutdown."""
+    providers = ProviderRegistry()
+    app.state.providers = providers
+    app.state.router = ProviderRouter(providers)
+    jobs = JobManager()
+    app.state.jobs = jobs
+    await providers.start()
+    jobs.start()
+    yield
+    await jobs.stop()
+    await providers.close()
+    await close_http_client()
+    shutdown_cpu_executor()
+
+
 app = FastAPI(
     debug=DEBUG,
     title="Shopify API",
@@ -37,9 +72,28 @@ app = FastAPI(
     version="0.1.0",
     default_response_class=ORJSONResponse,
     swagger_ui_parameters={"defaultModelsExpandDepth": -1},
+    lifespan=lifespan,
+    # Served by install_openapi: generated once and precompressed
+    openapi_url=None,
+    docs_url=None,
+    redoc_url=None,
 )
 
 
 app.include_router(router=image_edit_router, prefix=API.V1)
 app.include_router(router=google_router, prefix=API.V1)
 app.include_router(router=gradio_router, prefix=API.V1)
+app.include_router(router=health_router, prefix=API.V1)
+app.include_router(router=jobs_router, prefix=API.V1)
+app.include_router(router=outpaint_router, prefix=API.V1)
+app.include_router(router=examples_router, prefix=API.V1)
+install_openapi(app)
+
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestLoggingMiddleware)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> PlainTextResponse:
+    """Prometheus scrape endpoint with the metrics of this worker process."""
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,83 @@
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.shared.logs import end_request_logging, start_request_logging
+from src.shared.metrics import (
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUEST_SIZE,
+    HTTP_REQUESTS,
+    HTTP_REQUESTS_IN_FLIGHT,
+    HTTP_RESPONSE_SIZE,
+    server_timing_header,
+    start_request_timings,
+)
+
+
+class MetricsMiddleware:
+    """
+    Records per-route request counters, latency and payload-size histograms,
+    and adds a `Server-Timing` header with the stages timed while the
+    response was being built.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        timings = start_request_timings()
+        status_code = 500
+        request_size = 0
+        response_size = 0
+
+        async def receive_wrapper() -> Message:
+            nonlocal request_size
+            message = await receive()
+            if message["type"] == "http.request":
+                request_size += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, response_size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", server_timing_header(timings, time.perf_counter() - started))
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            # Route templates keep the label cardinality bounded; unmatched paths are grouped
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUESTS.inc(method=scope["method"], route=route, status=str(status_code))
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, method=scope["method"], route=route)
+            HTTP_REQUEST_SIZE.observe(request_size, route=route)
+            HTTP_RESPONSE_SIZE.observe(response_size, route=route)
+
+
+class RequestLoggingMiddleware:
+    """Tags the log records of each request with its path and applies the LOG_SAMPLE_RATES sampling."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        tokens = start_request_logging(scope["path"])
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            end_request_logging(tokens)
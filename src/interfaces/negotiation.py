@@ -0,0 +1,160 @@
+import asyncio
+from dataclasses import dataclass
+from enum import StrEnum
+from os import getenv
+from http import HTTPStatus
+from pathlib import Path
+from typing import Annotated, Any, Final
+
+from fastapi import Header, HTTPException, Query
+from fastapi.responses import FileResponse, Response
+from starlette.background import BackgroundTask
+
+from src.application.dtos import GeneratedImage, GeneratedImageFile
+from src.shared.executor import run_cpu_bound
+from src.shared.helpers.encode import MIME_TYPE_FORMATS, convert_image_bytes
+from src.shared.helpers.temp_files import remove_files_under
+from src.shared.metrics import timed_stage
+
+
+DEFAULT_IMAGE_QUALITY: Final[int] = int(getenv("IMAGE_RESPONSE_QUALITY", "90"))
+
+# Pseudo MIME type meaning "any image format": the upstream bytes are returned as they are.
+ANY_IMAGE: Final[str] = "image/*"
+
+
+class ImageResponseFormat(StrEnum):
+    """Values accepted by the `response_format` query parameter."""
+
+    JSON = "json"
+    PNG = "png"
+    WEBP = "webp"
+    JPEG = "jpeg"
+
+
+RESPONSE_FORMAT_MIME_TYPES: Final[dict[ImageResponseFormat, str]] = {
+    ImageResponseFormat.PNG: "image/png",
+    ImageResponseFormat.WEBP: "image/webp",
+    ImageResponseFormat.JPEG: "image/jpeg",
+}
+
+# OpenAPI description of the raw image responses, merged into the outpaint routes
+IMAGE_RESPONSES: Final[dict[int | str, dict[str, Any]]] = {
+    200: {
+        "content": {mime_type: {} for mime_type in MIME_TYPE_FORMATS},
+        "description": "The generated image, when requested through `Accept` or `response_format`.",
+    },
+}
+
+
+@dataclass(frozen=True)
+class ImageOutput:
+    """Response mode negotiated for an outpaint request."""
+
+    mime_type: str | None
+    quality: int = DEFAULT_IMAGE_QUALITY
+
+    @property
+    def raw(self) -> bool:
+        """True when the image must be returned as raw bytes instead of base64-in-JSON."""
+        return self.mime_type is not None
+
+
+def negotiate_image_mime_type(accept: str | None, response_format: ImageResponseFormat | None) -> str | None:
+    """
+    Picks the response MIME type from the `response_format` query parameter
+    or, when it is absent, from the `Accept` header.
+
+    Args:
+        accept: The raw `Accept` header.
+        response_format: The explicit format requested in the query string.
+
+    Returns:
+        An image MIME type, ANY_IMAGE, or None for the JSON response.
+    """
+    if response_format is not None:
+        return RESPONSE_FORMAT_MIME_TYPES.get(response_format)
+    if not accept:
+        return None
+
+    media_ranges: list[tuple[float, int, str]] = []
+    for position, media_range in enumerate(accept.split(",")):
+        media_type, *params = [part.strip() for part in media_range.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            media_ranges.append((-quality, position, media_type.lower()))
+
+    for _, _, media_type in sorted(media_ranges):
+        if media_type in MIME_TYPE_FORMATS or media_type == ANY_IMAGE:
+            return media_type
+        if media_type in ("application/json", "*/*"):
+            return None
+    return None
+
+
+def image_output(
+    accept: Annotated[str | None, Header(include_in_schema=False)] = None,
+    response_format: Annotated[
+        ImageResponseFormat | None,
+        Query(description="Return the raw image instead of JSON. Overrides the Accept header."),
+    ] = None,
+    quality: Annotated[
+        int,
+        Query(ge=1, le=100, description="Quality used when the image has to be transcoded to WEBP or JPEG."),
+    ] = DEFAULT_IMAGE_QUALITY,
+) -> ImageOutput:
+    """Dependency negotiating the response mode of the outpaint endpoints."""
+    return ImageOutput(mime_type=negotiate_image_mime_type(accept, response_format), quality=quality)
+
+
+def check_single_image_output(output: ImageOutput, num_candidates: int) -> None:
+    """
+    A raw image response carries one image: several candidates are only returned as JSON.
+
+    Raises:
+        HTTPException: 406 when a raw image was negotiated for more than one candidate.
+    """
+    if output.raw and num_candidates > 1:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_ACCEPTABLE,
+            detail="Several candidates are returned as JSON: drop `response_format` or accept `application/json`.",
+        )
+
+
+async def build_image_response(image: GeneratedImage | GeneratedImageFile, output: ImageOutput) -> Response:
+    """
+    Returns the generated image as a raw response, passing the upstream bytes
+    through when they already match the requested format and transcoding otherwise.
+
+    A GeneratedImageFile is streamed from disk in chunks and its files are
+    deleted once the response has been sent (or as soon as it is read, when
+    it has to be transcoded).
+    """
+    if isinstance(image, GeneratedImageFile):
+        if output.mime_type in (None, ANY_IMAGE, image.mime_type):
+            return FileResponse(
+                image.path,
+                media_type=image.mime_type,
+                headers={"Vary": "Accept"},
+                background=BackgroundTask(remove_files_under, list(image.cleanup_paths), image.cleanup_root),
+            )
+        try:
+            data = await asyncio.to_thread(Path(image.path).read_bytes)
+        finally:
+            await asyncio.to_thread(remove_files_under, list(image.cleanup_paths), image.cleanup_root)
+        image = GeneratedImage(data=data, mime_type=image.mime_type)
+
+    if output.mime_type in (None, ANY_IMAGE, image.mime_type):
+        content, media_type = image.data, image.mime_type
+    else:
+        with timed_stage("transcode"):
+            content = await run_cpu_bound(convert_image_bytes, image.data, output.mime_type, output.quality)
+        media_type = output.mime_type
+    return Response(content=content, media_type=media_type, headers={"Vary": "Accept"})
@@ -0,0 +1,87 @@
+import gzip
+import hashlib
+from typing import Final
+
+import orjson
+from fastapi import FastAPI, Request
+from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html, get_swagger_ui_oauth2_redirect_html
+from fastapi.responses import HTMLResponse, Response
+
+OPENAPI_URL: Final[str] = "/openapi.json"
+DOCS_URL: Final[str] = "/docs"
+REDOC_URL: Final[str] = "/redoc"
+
+
+class OpenAPIDocument:
+    """
+    The application's OpenAPI document, generated and gzip-compressed once on
+    its first request instead of being serialized again for every request.
+    """
+
+    def __init__(self, app: FastAPI) -> None:
+        self.app = app
+        self._body: bytes | None = None
+        self._gzip_body = b""
+        self._etag = ""
+
+    def _build(self) -> None:
+        body = orjson.dumps(self.app.openapi())
+        self._gzip_body = gzip.compress(body, compresslevel=9, mtime=0)
+        self._etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        self._body = body
+
+    def response(self, request: Request) -> Response:
+        """
+        Serves the document, gzipped when the client accepts it.
+
+        Args:
+            request: The incoming request, for its Accept-Encoding and If-None-Match headers.
+
+        Returns:
+            The JSON document, or 304 when the client's copy is current.
+        """
+        if self._body is None:
+            self._build()
+        headers = {"ETag": self._etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+        if request.headers.get("if-none-match") == self._etag:
+            return Response(status_code=304, headers=headers)
+        if "gzip" in request.headers.get("accept-encoding", ""):
+            headers["Content-Encoding"] = "gzip"
+            return Response(self._gzip_body, media_type="application/json", headers=headers)
+        return Response(self._body, media_type="application/json", headers=headers)
+
+
+def install_openapi(app: FastAPI) -> None:
+    """
+    Serves the OpenAPI document and the Swagger UI / ReDoc pages on their
+    usual URLs. The app must be built with `openapi_url=None` so FastAPI
+    does not register its own per-request serializer.
+    """
+    document = OpenAPIDocument(app)
+
+    async def openapi(request: Request) -> Response:
+        return document.response(request)
+
+    async def swagger_ui_html(request: Request) -> HTMLResponse:
+        root_path = request.scope.get("root_path", "").rstrip("/")
+        oauth2_redirect_url = app.swagger_ui_oauth2_redirect_url
+        return get_swagger_ui_html(
+            openapi_url=root_path + OPENAPI_URL,
+            title=f"{app.title} - Swagger UI",
+            oauth2_redirect_url=root_path + oauth2_redirect_url if oauth2_redirect_url else None,
+            init_oauth=app.swagger_ui_init_oauth,
+            swagger_ui_parameters=app.swagger_ui_parameters,
+        )
+
+    async def swagger_ui_redirect(request: Request) -> HTMLResponse:
+        return get_swagger_ui_oauth2_redirect_html()
+
+    async def redoc_html(request: Request) -> HTMLResponse:
+        root_path = request.scope.get("root_path", "").rstrip("/")
+        return get_redoc_html(openapi_url=root_path + OPENAPI_URL, title=f"{app.title} - ReDoc")
+
+    app.add_route(OPENAPI_URL, openapi, include_in_schema=False)
+    app.add_route(DOCS_URL, swagger_ui_html, include_in_schema=False)
+    if app.swagger_ui_oauth2_redirect_url:
+        app.add_route(app.swagger_ui_oauth2_redirect_url, swagger_ui_redirect, include_in_schema=False)
+    app.add_route(REDOC_URL, redoc_html, include_in_schema=False)
@@ -1,9 +1,17 @@
 from .image_edit import image_edit_router
+from .examples import examples_router
 from .google_ai import google_router
 from .gradio import gradio_router
+from .health import health_router
+from .jobs import jobs_router
+from .outpaint import outpaint_router
 
 __all__ = [
     "image_edit_router",
+    "examples_router",
     "google_router",
-    "gradio_router"
-]
\ No newline at end of file
+    "gradio_router",
+    "health_router",
+    "jobs_router",
+    "outpaint_router",
+]
@@ -0,0 +1,49 @@
+import base64
+from enum import StrEnum
+from functools import cache
+
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from src.domain.constants import examples
+
+
+class ExampleImage(StrEnum):
+    """Full-size example images, kept out of the OpenAPI document."""
+
+    IMAGE = "image"
+    MASK = "mask"
+
+
+EXAMPLE_IMAGE_CONSTANTS = {
+    ExampleImage.IMAGE: "TINY_IMAGE_B64",
+    ExampleImage.MASK: "TINY_MASK_IMAGE_B64",
+}
+
+
+examples_router = APIRouter(
+    prefix="/examples",
+    tags=["Examples"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+@cache
+def _example_png(name: ExampleImage) -> bytes:
+    """Decodes an example image on first request."""
+    return base64.b64decode(getattr(examples, EXAMPLE_IMAGE_CONSTANTS[name]))
+
+
+@examples_router.get(
+    path="/{name}",
+    summary="Download a full-size example image",
+    response_class=Response,
+    responses={200: {"content": {"image/png": {}}}},
+)
+async def get_example_image(name: ExampleImage) -> Response:
+    """Returns the example image (PNG) to try the outpaint endpoints with, e.g. as a multipart upload."""
+    return Response(
+        content=_example_png(name),
+        media_type="image/png",
+        headers={"Cache-Control": "public, max-age=86400"},
+    )
@@ -1,61 +1,379 @@
+import asyncio
+from dataclasses import asdict
 from http import HTTPStatus
+from typing import Annotated, Any, Final
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, Form, HTTPException, Request
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 
+from src.application.dtos import GeneratedImage
 from src.application.dtos.response_dtos import ResponseDataDictDTO
-from src.domain.schema.google_payload import GooglePayload
-from src.domain.schema.image_edit_payload import ImgExpandPayload
-from src.shared.helpers.add_black_pixels import add_black_pixel_padding
-from src.shared.helpers.add_mask import create_mask
-from src.application.services.external import GoogleService
+from src.domain.schema.image_edit_form import ImgExpandForm
+from src.domain.schema.image_edit_payload import ImgExpandOptions, ImgExpandPayload
+from src.shared.concurrency import ProviderBusyError
+from src.shared.executor import ExecutorOverloadedError, run_cpu_bound
+from src.shared.resilience import ProviderCallError
+from src.shared.helpers.encode import decode_base64_image
+from src.shared.metrics import record_stages, timed_stage
+from src.shared.helpers.prepare_outpaint import OutpaintCanvas, prepare_outpaint_canvas
+from src.application.services.external import GoogleService, ProviderRegistry, TiledOutpainter
+from src.application.services.external.google_service import DEFAULT_OUTPAINT_MODEL, VERTEX_UPLOAD_MAX_PIXELS
+from src.application.services.external.near_duplicates import (
+    NearDuplicateLookup,
+    find_near_duplicate,
+    remember_generation,
+)
+from src.interfaces.admission import admit_outpaint
+from src.interfaces.disconnect import cancel_on_disconnect
+from src.interfaces.batch import BATCH_MAX_ITEMS, BATCH_RESPONSES, stream_batch
+from src.interfaces.routers.jobs import enqueue_job
+from src.interfaces.negotiation import (
+    IMAGE_RESPONSES,
+    ImageOutput,
+    build_image_response,
+    check_single_image_output,
+    image_output,
+)
+from src.interfaces.uploads import UploadRoute
+
 
+VERTEX_OUTPAINT_MODEL: Final[str] = DEFAULT_OUTPAINT_MODEL
 
 
-def getGoogleService() -> GoogleService:
-    """Dependency to get the GoogleService instance."""
-    return GoogleService()
+async def getGoogleService(request: Request) -> GoogleService:
+    """Dependency to get the shared GoogleService instance built by the app lifespan (or on first use)."""
+    providers: ProviderRegistry = request.app.state.providers
+    await providers.ensure_started("vertex")
+    if providers.google is None:
+        raise HTTPException(
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+            detail=f"Vertex AI is unavailable: {providers.status['vertex'].detail}",
+        )
+    return providers.google
 
 
 google_router: APIRouter = APIRouter(
     prefix="/vertex",
     tags=["Vertex"],
     responses={404: {"description": "Not found"}},
+    route_class=UploadRoute,
 )
 
+async def _prepare_canvas(image_bytes: bytes, options: ImgExpandOptions) -> OutpaintCanvas:
+    """Builds the padded canvas and mask on the CPU executor, mapping failures to HTTP errors."""
+    try:
+        with timed_stage("prepare"):
+            canvas = await run_cpu_bound(
+                prepare_outpaint_canvas,
+                image_bytes,
+                options.left_pixels,
+                options.right_pixels,
+                options.top_pixels,
+                options.bottom_pixels,
+                VERTEX_UPLOAD_MAX_PIXELS if options.downscale else None,
+            )
+        record_stages(canvas.timings)
+        return canvas
+    except ExecutorOverloadedError as e:
+        raise HTTPException(
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"},
+        )
+    except (TypeError, ValueError) as e:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=str(e),
+        )
+
+
+async def _find_near_duplicate(
+    google_service: GoogleService,
+    image: str | bytes,
+    options: ImgExpandOptions,
+) -> tuple[bytes, NearDuplicateLookup]:
+    """Decodes the input and looks it up in the near-duplicate index, mapping failures to HTTP errors."""
+    try:
+        with timed_stage("b64_decode"):
+            image_bytes = await run_cpu_bound(decode_base64_image, image) if isinstance(image, str) else image
+        return image_bytes, await find_near_duplicate(google_service.near_duplicates, image_bytes, options)
+    except ExecutorOverloadedError as e:
+        raise HTTPException(
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"},
+        )
+    except (TypeError, ValueError) as e:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=str(e),
+        )
+
+
+async def _outpaint_cache_key(
+    google_service: GoogleService,
+    image: str | bytes,
+    options: ImgExpandOptions,
+) -> tuple[bytes, str | None]:
+    """Decodes the input and builds its result-cache key, mapping failures to HTTP errors."""
+    try:
+        # Off the image executor: a cached result is served even when the executor is full
+        with timed_stage("b64_decode"):
+            image_bytes = await asyncio.to_thread(decode_base64_image, image) if isinstance(image, str) else image
+        return image_bytes, await google_service.outpaint_cache_key(image_bytes, options, VERTEX_OUTPAINT_MODEL)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=str(e),
+        )
+
+
+async def _build_outpaint_response(
+    google_service: GoogleService,
+    generated_images: list[GeneratedImage],
+    options: ImgExpandOptions,
+    output: ImageOutput,
+) -> ResponseDataDictDTO | Response:
+    """Returns the first image raw, or the images as JSON (several candidates in `generated_images_b64`)."""
+    if output.raw:
+        return await build_image_response(generated_images[0], output)
+    if options.num_candidates > 1:
+        return await google_service.build_candidates_response(generated_images)
+    return await google_service.build_response(generated_images[0])
+
+
+async def _outpaint_stored(
+    google_service: GoogleService,
+    generated_images: list[GeneratedImage],
+    options: ImgExpandOptions,
+    output: ImageOutput,
+) -> ResponseDataDictDTO | Response:
+    """Returns a cached or reused generation without calling Vertex AI, mapping failures to HTTP errors."""
+    try:
+        return await _build_outpaint_response(google_service, generated_images, options, output)
+    except ExecutorOverloadedError as e:
+        raise HTTPException(
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"},
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+            detail=str(e),
+        )
+
+
+async def _outpaint_near_duplicate(
+    google_service: GoogleService,
+    generated_images: list[GeneratedImage],
+    options: ImgExpandOptions,
+    output: ImageOutput,
+) -> ResponseDataDictDTO | Response:
+    """Returns the generation reused for a near-duplicate input, flagged with `near_duplicate`."""
+    response = await _outpaint_stored(google_service, generated_images, options, output)
+    if isinstance(response, Response):
+        response.headers["X-Near-Duplicate"] = "true"
+    else:
+        response.data["near_duplicate"] = True
+    return response
+
+
+async def _outpaint_canvas(
+    google_service: GoogleService,
+    canvas: OutpaintCanvas,
+    options: ImgExpandOptions,
+    output: ImageOutput,
+    lookup: NearDuplicateLookup | None = None,
+    cache_key: str | None = None,
+) -> ResponseDataDictDTO | Response:
+    """
+    Sends a prepared canvas to Vertex AI, mapping failures to HTTP errors.
+    With a near-duplicate `lookup`, the result is stored for near duplicates of the input.
+    With a `cache_key`, it is cached under the key of the request's input.
+    """
+    try:
+        generated_images = await google_service.generate_canvas_images(
+            canvas=canvas,
+            prompt=options.prompt,
+            model_name=VERTEX_OUTPAINT_MODEL,
+            mask_dilation=options.mask_dilation,
+            num_candidates=options.num_candidates,
+            cache_key=cache_key,
+        )
+        if lookup is not None and google_service.near_duplicates is not None:
+            await remember_generation(google_service.near_duplicates, lookup.fingerprint, options, "vertex", generated_images)
+        return await _build_outpaint_response(google_service, generated_images, options, output)
+    except (ExecutorOverloadedError, ProviderBusyError) as e:
+        raise HTTPException(
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"},
+        )
+    except ProviderCallError as e:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_GATEWAY,
+            detail=str(e),
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+            detail=str(e),
+        )
+
+
+async def _outpaint_tiled(
+    google_service: GoogleService,
+    image: str | bytes,
+    options: ImgExpandOptions,
+    output: ImageOutput,
+) -> ResponseDataDictDTO | Response:
+    """Runs a tiled outpaint, mapping failures to HTTP errors."""
+    try:
+        with timed_stage("b64_decode"):
+            image_bytes = await run_cpu_bound(decode_base64_image, image) if isinstance(image, str) else image
+        generated_image = await TiledOutpainter(google_service).outpaint(
+            image_bytes=image_bytes,
+            left_pixels=options.left_pixels,
+            right_pixels=options.right_pixels,
+            top_pixels=options.top_pixels,
+            bottom_pixels=options.bottom_pixels,
+            prompt=options.prompt,
+            model_name=VERTEX_OUTPAINT_MODEL,
+            mask_dilation=options.mask_dilation,
+        )
+        if output.raw:
+            return await build_image_response(generated_image, output)
+        return await google_service.build_response(generated_image)
+    except (ExecutorOverloadedError, ProviderBusyError) as e:
+        raise HTTPException(
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"},
+        )
+    except (TypeError, ValueError) as e:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=str(e),
+        )
+    except ProviderCallError as e:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_GATEWAY,
+            detail=str(e),
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+            detail=str(e),
+        )
+
+
+async def _outpaint(
+    google_service: GoogleService,
+    image: str | bytes,
+    options: ImgExpandOptions,
+    output: ImageOutput,
+) -> ResponseDataDictDTO | Response:
+    """
+    Outpaints in one call, or tile by tile when the options ask for it, once the memory budget admits it.
+    A cached result for the same input and parameters is returned before admission and canvas preparation.
+    With the near-duplicate index, a previous generation for a near duplicate of the input is reused.
+    """
+    check_single_image_output(output, options.num_candidates)
+    cache_key = None
+    if not options.tiled:
+        image, cache_key = await _outpaint_cache_key(google_service, image, options)
+        if cache_key is not None:
+            cached_images = await google_service.cached_images(cache_key, options.num_candidates)
+            if cached_images is not None:
+                return await _outpaint_stored(google_service, cached_images, options, output)
+    async with admit_outpaint(image, options):
+        if options.tiled:
+            return await _outpaint_tiled(google_service, image, options, output)
+        lookup = None
+        if google_service.near_duplicates is not None:
+            image, lookup = await _find_near_duplicate(google_service, image, options)
+            if lookup.images is not None:
+                return await _outpaint_near_duplicate(google_service, lookup.images, options, output)
+        canvas = await _prepare_canvas(image, options)
+        return await _outpaint_canvas(google_service, canvas, options, output, lookup, cache_key)
+
+
 @google_router.post(
     path="/outpaint",
     summary="Outline an image using Vertex AI",
     response_model=ResponseDataDictDTO,
+    responses=IMAGE_RESPONSES,
 )
 async def outpaint_image(
+    request: Request,
     payload: ImgExpandPayload,
     google_service: GoogleService = Depends(getGoogleService),
-) -> ResponseDataDictDTO:
+    output: ImageOutput = Depends(image_output),
+) -> ResponseDataDictDTO | Response:
     """Endpoint to outline an image using Vertex AI."""
-    data: GooglePayload = GooglePayload(
-        input_image_b64=add_black_pixel_padding(
-            payload.input_image_b64,
-            payload.left_pixels,
-            payload.right_pixels,
-            payload.top_pixels,
-            payload.bottom_pixels,
-        ),
-        mask_image_b64=create_mask(
-            payload.input_image_b64,
-            payload.left_pixels,
-            payload.right_pixels,
-            payload.top_pixels,
-            payload.bottom_pixels,
-        ),
-        prompt=payload.prompt,
-        model="imagen-3.0-capability-001",
-        mask_dilation=payload.mask_dilation,
+    return await cancel_on_disconnect(
+        request,
+        _outpaint(google_service, payload.input_image_b64, payload, output),
     )
-    try:
-        response = await google_service.outpaint(data)
-        return response
-    except Exception as e:
-        raise HTTPException(
-            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
-            detail=str(e),
-        )
\ No newline at end of file
+
+
+@google_router.post(
+    path="/outpaint/multipart",
+    summary="Outline an uploaded image using Vertex AI",
+    response_model=ResponseDataDictDTO,
+    responses=IMAGE_RESPONSES,
+)
+async def outpaint_image_multipart(
+    request: Request,
+    form: Annotated[ImgExpandForm, Form()],
+    google_service: GoogleService = Depends(getGoogleService),
+    output: ImageOutput = Depends(image_output),
+) -> ResponseDataDictDTO | Response:
+    """Endpoint to outline an image sent as a raw multipart file part using Vertex AI."""
+    image_bytes = await form.image.read()
+    await form.image.close()
+    return await cancel_on_disconnect(
+        request, _outpaint(google_service, image_bytes, form, output)
+    )
+
+
+@google_router.post(
+    path="/outpaint/jobs",
+    summary="Queue an outpaint job on Vertex AI",
+    status_code=HTTPStatus.ACCEPTED,
+)
+async def submit_outpaint_job(
+    request: Request,
+    payload: ImgExpandPayload,
+    google_service: GoogleService = Depends(getGoogleService),
+) -> ORJSONResponse:
+    """Queues the outpaint and returns a job id immediately; poll or stream `/jobs/{id}` for the result."""
+
+    async def run() -> dict[str, Any]:
+        response = await _outpaint(
+            google_service, payload.input_image_b64, payload, ImageOutput(mime_type=None)
+        )
+        return asdict(response)
+
+    return enqueue_job(request, "vertex.outpaint", run)
+
+
+@google_router.post(
+    path="/outpaint/batch",
+    summary="Outline a batch of images using Vertex AI",
+    response_class=StreamingResponse,
+    responses=BATCH_RESPONSES,
+)
+async def outpaint_batch(
+    payloads: Annotated[list[ImgExpandPayload], Body(min_length=1, max_length=BATCH_MAX_ITEMS)],
+    google_service: GoogleService = Depends(getGoogleService),
+) -> StreamingResponse:
+    """Endpoint to outline many images at once; results are streamed as NDJSON as each one completes."""
+
+    async def process(payload: ImgExpandPayload) -> ResponseDataDictDTO:
+        return await _outpaint(
+            google_service, payload.input_image_b64, payload, ImageOutput(mime_type=None)
+        )
+
+    return stream_batch(payloads, process)
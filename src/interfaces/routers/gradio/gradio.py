@@ -1,44 +1,171 @@
+import asyncio
+from dataclasses import asdict
 from http import HTTPStatus
+from pathlib import Path
+from typing import Annotated, Any
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, Form, HTTPException, Request
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 
 from src.application.dtos.response_dtos import ResponseDataDictDTO
+from src.domain.schema.image_edit_form import ImgExpandFormV2
 from src.domain.schema.image_edit_payload import ImgExpandPayloadV2
-from src.application.services.external import GradioService
+from src.application.services.external import GradioService, ProviderRegistry
+from src.infrastructure.cache import ImageFetchError
+from src.interfaces.disconnect import cancel_on_disconnect
+from src.interfaces.batch import BATCH_MAX_ITEMS, BATCH_RESPONSES, stream_batch
+from src.interfaces.routers.jobs import enqueue_job
+from src.interfaces.negotiation import (
+    IMAGE_RESPONSES,
+    ImageOutput,
+    build_image_response,
+    check_single_image_output,
+    image_output,
+)
+from src.interfaces.uploads import UploadRoute
+from src.shared.concurrency import ProviderBusyError
+from src.shared.executor import ExecutorOverloadedError
+from src.shared.resilience import ProviderCallError
+from src.shared.helpers.temp_files import copy_to_tempfile, remove_file
 
 
 
-def getGradioService() -> GradioService:
-    """Dependency to get the GradioService instance."""
-    return GradioService("jallenjia/flux-fill-outpaint")
+async def getGradioService(request: Request) -> GradioService:
+    """Dependency to get the shared GradioService instance built by the app lifespan (or on first use)."""
+    providers: ProviderRegistry = request.app.state.providers
+    await providers.ensure_started("gradio")
+    if providers.gradio is None:
+        raise HTTPException(
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+            detail=f"Gradio is unavailable: {providers.status['gradio'].detail}",
+        )
+    return providers.gradio
 
 
 gradio_router: APIRouter = APIRouter(
     prefix="/gradio",
     tags=["Gradio"],
     responses={404: {"description": "Not found"}},
+    route_class=UploadRoute,
 )
 
+async def _outpaint(
+    gradio_service: GradioService,
+    payload: ImgExpandPayloadV2,
+    output: ImageOutput,
+    image_path: str | None = None,
+) -> ResponseDataDictDTO | Response:
+    """Runs the Gradio outpaint, mapping failures to HTTP errors."""
+    check_single_image_output(output, payload.num_candidates)
+    try:
+        if output.raw:
+            generated_image = await gradio_service.generate_image_file(payload, image_path=image_path)
+            return await build_image_response(generated_image, output)
+        response = await gradio_service.outpaint(payload, image_path=image_path)
+        return response
+    except (ExecutorOverloadedError, ProviderBusyError) as e:
+        raise HTTPException(
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"},
+        )
+    except ImageFetchError as e:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=str(e),
+        )
+    except ProviderCallError as e:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_GATEWAY,
+            detail=str(e),
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+            detail=str(e),
+        )
+
+
 @gradio_router.post(
     path="/outpaint",
     summary="Outpaint function using Flux Fill Outpaint AI tool",
     response_model=ResponseDataDictDTO,
+    responses=IMAGE_RESPONSES,
 )
 async def outpaint_image(
+    request: Request,
     payload: ImgExpandPayloadV2,
     gradio_service: GradioService = Depends(getGradioService),
-) -> ResponseDataDictDTO:
+    output: ImageOutput = Depends(image_output),
+) -> ResponseDataDictDTO | Response:
     """Endpoint to outline an image using Vertex AI."""
-    print("payload: ", payload)
+    return await cancel_on_disconnect(request, _outpaint(gradio_service, payload, output))
+
+
+@gradio_router.post(
+    path="/outpaint/multipart",
+    summary="Outpaint an uploaded image using Flux Fill Outpaint AI tool",
+    response_model=ResponseDataDictDTO,
+    responses=IMAGE_RESPONSES,
+)
+async def outpaint_image_multipart(
+    request: Request,
+    form: Annotated[ImgExpandFormV2, Form()],
+    gradio_service: GradioService = Depends(getGradioService),
+    output: ImageOutput = Depends(image_output),
+) -> ResponseDataDictDTO | Response:
+    """Endpoint to outpaint an image sent as a raw multipart file part."""
+    payload = ImgExpandPayloadV2(
+        url=None,
+        has_url=False,
+        **form.model_dump(exclude={"image"}),
+    )
+    # gradio_client uploads from a path: copy the spooled upload to a named temp file
+    suffix = Path(form.image.filename or "").suffix
+    image_path = await asyncio.to_thread(copy_to_tempfile, form.image.file, suffix)
     try:
-        response = await gradio_service.outpaint(payload)
-        return response
-    except Exception as e:
-        raise HTTPException(
-            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
-            detail=str(e),
-        )
-    
+        return await cancel_on_disconnect(request, _outpaint(gradio_service, payload, output, image_path=image_path))
+    finally:
+        await form.image.close()
+        await asyncio.to_thread(remove_file, image_path)
+
+
+@gradio_router.post(
+    path="/outpaint/jobs",
+    summary="Queue an outpaint job on the Flux Fill Outpaint AI tool",
+    status_code=HTTPStatus.ACCEPTED,
+)
+async def submit_outpaint_job(
+    request: Request,
+    payload: ImgExpandPayloadV2,
+    gradio_service: GradioService = Depends(getGradioService),
+) -> ORJSONResponse:
+    """Queues the outpaint and returns a job id immediately; poll or stream `/jobs/{id}` for the result."""
+
+    async def run() -> dict[str, Any]:
+        response = await _outpaint(gradio_service, payload, ImageOutput(mime_type=None))
+        return asdict(response)
+
+    return enqueue_job(request, "gradio.outpaint", run)
+
+
+@gradio_router.post(
+    path="/outpaint/batch",
+    summary="Outpaint a batch of images using Flux Fill Outpaint AI tool",
+    response_class=StreamingResponse,
+    responses=BATCH_RESPONSES,
+)
+async def outpaint_batch(
+    payloads: Annotated[list[ImgExpandPayloadV2], Body(min_length=1, max_length=BATCH_MAX_ITEMS)],
+    gradio_service: GradioService = Depends(getGradioService),
+) -> StreamingResponse:
+    """Endpoint to outpaint many images at once; results are streamed as NDJSON as each one completes."""
+
+    async def process(payload: ImgExpandPayloadV2) -> ResponseDataDictDTO | Response:
+        return await _outpaint(gradio_service, payload, ImageOutput(mime_type=None))
+
+    return stream_batch(payloads, process)
+
 
 # {
 #   "message": "Image outpainted successfully",
@@ -0,0 +1,72 @@
+from http import HTTPStatus
+
+from fastapi import APIRouter, Request
+from fastapi.responses import ORJSONResponse
+
+from src.application.services.external import ProviderRegistry, ProviderRouter
+
+
+health_router = APIRouter(prefix="/health", tags=["health"])
+
+
+@health_router.get(
+    path="/live",
+    summary="Liveness probe",
+)
+async def live() -> dict[str, str]:
+    """Returns as soon as the worker answers requests."""
+    return {"status": "ok"}
+
+
+@health_router.get(
+    path="/ready",
+    summary="Readiness probe reporting the state of every provider client",
+)
+async def ready(request: Request) -> ORJSONResponse:
+    """Returns 200 once every provider is ready (or degraded), 503 otherwise."""
+    providers: ProviderRegistry = request.app.state.providers
+    return ORJSONResponse(
+        status_code=HTTPStatus.OK if providers.ready else HTTPStatus.SERVICE_UNAVAILABLE,
+        content={
+            "status": "ready" if providers.ready else "not_ready",
+            "providers": providers.describe(),
+        },
+    )
+
+
+@health_router.get(
+    path="/cache",
+    summary="Result cache and request coalescing counters",
+)
+async def cache(request: Request) -> dict:
+    """Returns the result cache, single-flight, image fetch cache and near-duplicate index counters of this worker."""
+    providers: ProviderRegistry = request.app.state.providers
+    single_flight = providers.single_flight
+    return {
+        "enabled": providers.cache is not None,
+        **(providers.cache.describe() if providers.cache is not None else {}),
+        "single_flight": {
+            "enabled": single_flight is not None,
+            "in_flight": single_flight.in_flight if single_flight else 0,
+            "leaders": single_flight.stats.leaders if single_flight else 0,
+            "followers": single_flight.stats.followers if single_flight else 0,
+        },
+        "image_fetch": {
+            "enabled": providers.image_fetcher is not None,
+            **(providers.image_fetcher.describe() if providers.image_fetcher is not None else {}),
+        },
+        "near_duplicates": {
+            "enabled": providers.near_duplicates is not None,
+            **(providers.near_duplicates.describe() if providers.near_duplicates is not None else {}),
+        },
+    }
+
+
+@health_router.get(
+    path="/router",
+    summary="Provider router hedging and failover counters",
+)
+async def router(request: Request) -> dict:
+    """Returns the hedging/failover counters and the current hedge deadlines of this worker."""
+    provider_router: ProviderRouter = request.app.state.router
+    return provider_router.describe()
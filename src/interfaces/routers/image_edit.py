@@ -1,16 +1,115 @@
-from fastapi import APIRouter
+from http import HTTPStatus
+from typing import Annotated
 
+from fastapi import APIRouter, Depends, Form, HTTPException, Query
+from fastapi.responses import Response
 
-image_edit_router = APIRouter(prefix="/image_edit", tags=["image_edit"])
+from src.application.dtos import GeneratedImage
+from src.application.dtos.response_dtos import ResponseDataDictDTO
+from src.domain.schema.image_edit_form import ImgExpandForm
+from src.domain.schema.image_edit_payload import ImgExpandOptions, ImgExpandPayload
+from src.interfaces.admission import admit_outpaint
+from src.interfaces.negotiation import IMAGE_RESPONSES, ImageOutput, build_image_response, image_output
+from src.interfaces.uploads import UploadRoute
+from src.shared.executor import ExecutorOverloadedError, run_cpu_bound
+from src.shared.helpers.encode import decode_base64_image, encode_bytes_to_base64, sniff_mime_type
+from src.shared.helpers.local_fill_mode import LocalFillMode
+from src.shared.metrics import timed_stage
 
 
+image_edit_router = APIRouter(prefix="/image_edit", tags=["image_edit"], route_class=UploadRoute)
 
-@image_edit_router.get(
+FillQuery = Annotated[LocalFillMode, Query(description="How the expansion is filled from the image's own pixels.")]
+
+
+async def _local_outpaint(
+    image: str | bytes,
+    options: ImgExpandOptions,
+    fill: LocalFillMode,
+    output: ImageOutput,
+) -> ResponseDataDictDTO | Response:
+    """Fills the expansion locally once the memory budget admits it, mapping failures to HTTP errors."""
+    # numpy takes about 100 ms to import: it is loaded by the first preview
+    from src.shared.helpers.local_outpaint import local_outpaint
+
+    async with admit_outpaint(image, options):
+        try:
+            with timed_stage("b64_decode"):
+                image_bytes = await run_cpu_bound(decode_base64_image, image) if isinstance(image, str) else image
+            with timed_stage("local_outpaint"):
+                data = await run_cpu_bound(
+                    local_outpaint,
+                    image_bytes,
+                    options.left_pixels,
+                    options.right_pixels,
+                    options.top_pixels,
+                    options.bottom_pixels,
+                    fill,
+                )
+            generated_image = GeneratedImage(data=data, mime_type=sniff_mime_type(data) or "image/jpeg")
+            if output.raw:
+                response = await build_image_response(generated_image, output)
+                response.headers["X-Provider"] = "local"
+                return response
+        except ExecutorOverloadedError as e:
+            raise HTTPException(
+                status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+                detail=str(e),
+                headers={"Retry-After": "1"},
+            )
+        except (TypeError, ValueError) as e:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail=str(e),
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+                detail=str(e),
+            )
+        # A preview is returned as encoded (JPEG, or PNG with alpha) rather than transcoded to PNG
+        return ResponseDataDictDTO(
+            message="Image outpainted successfully",
+            data={
+                "generated_image_b64": encode_bytes_to_base64(generated_image.data),
+                "mime_type": generated_image.mime_type,
+                "provider": "local",
+                "fill": fill,
+            },
+        )
+
+
+@image_edit_router.post(
     path="/outpaint",
-    summary="Expand an image",
-    
+    summary="Expand an image locally, without any provider",
+    response_model=ResponseDataDictDTO,
+    responses=IMAGE_RESPONSES,
 )
+async def outpaint(
+    payload: ImgExpandPayload,
+    fill: FillQuery = LocalFillMode.BLUR,
+    output: ImageOutput = Depends(image_output),
+) -> ResponseDataDictDTO | Response:
+    """
+    Endpoint to expand an image in milliseconds by extending, mirroring or
+    blurring its borders: an instant preview to show while a provider
+    generates the real outpaint. The prompt and the generation options are ignored.
+    """
+    return await _local_outpaint(payload.input_image_b64, payload, fill, output)
 
-async def outpaint():
-    return {"Hello": "World"}
 
+@image_edit_router.post(
+    path="/outpaint/multipart",
+    summary="Expand an uploaded image locally, without any provider",
+    response_model=ResponseDataDictDTO,
+    responses=IMAGE_RESPONSES,
+)
+async def outpaint_multipart(
+    form: Annotated[ImgExpandForm, Form()],
+    fill: FillQuery = LocalFillMode.BLUR,
+    output: ImageOutput = Depends(image_output),
+) -> ResponseDataDictDTO | Response:
+    """Endpoint to expand an image sent as a raw multipart file part locally, without any provider."""
+    image_bytes = await form.image.read()
+    await form.image.close()
+    return await _local_outpaint(image_bytes, form, fill, output)
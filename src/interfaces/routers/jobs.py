@@ -0,0 +1,91 @@
+from http import HTTPStatus
+from typing import Any, AsyncIterator
+
+import orjson
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
+
+from src.application.services.jobs import Job, JobManager, JobQueueFullError
+from src.application.services.jobs.job_manager import JobFunction
+
+
+jobs_router = APIRouter(
+    prefix="/jobs",
+    tags=["Jobs"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+def enqueue_job(request: Request, kind: str, fn: JobFunction) -> ORJSONResponse:
+    """
+    Queues provider work on the application JobManager and answers 202
+    with the URLs to poll or stream the job.
+    """
+    jobs: JobManager = request.app.state.jobs
+    try:
+        job = jobs.submit(kind, fn)
+    except JobQueueFullError as e:
+        raise HTTPException(
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "5"},
+        )
+    status_url = str(request.url_for("get_job", job_id=job.id))
+    return ORJSONResponse(
+        status_code=HTTPStatus.ACCEPTED,
+        headers={"Location": status_url},
+        content={
+            "id": job.id,
+            "status": job.status,
+            "status_url": status_url,
+            "events_url": str(request.url_for("stream_job_events", job_id=job.id)),
+        },
+    )
+
+
+def _get_job_or_404(request: Request, job_id: str) -> Job:
+    jobs: JobManager = request.app.state.jobs
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND,
+            detail=f"Job {job_id} not found or expired.",
+        )
+    return job
+
+
+@jobs_router.get(
+    path="/{job_id}",
+    summary="Get the status and result of a job",
+)
+async def get_job(request: Request, job_id: str) -> dict[str, Any]:
+    """Returns the job status, and its result once it has finished."""
+    return _get_job_or_404(request, job_id).snapshot()
+
+
+@jobs_router.get(
+    path="/{job_id}/events",
+    summary="Stream job status changes as Server-Sent Events",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+async def stream_job_events(request: Request, job_id: str) -> StreamingResponse:
+    """Streams a `status` event on every change; the last event carries the result."""
+    jobs: JobManager = request.app.state.jobs
+    job = _get_job_or_404(request, job_id)
+
+    async def events() -> AsyncIterator[bytes]:
+        async for snapshot in jobs.watch(job):
+            if await request.is_disconnected():
+                return
+            if snapshot is None:
+                # Comment line keeping proxies from closing an idle stream
+                yield b": keep-alive\n\n"
+                continue
+            yield b"event: status\ndata: " + orjson.dumps(snapshot) + b"\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,137 @@
+import asyncio
+from http import HTTPStatus
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Form, HTTPException, Request
+from fastapi.responses import Response
+
+from src.application.dtos.response_dtos import ResponseDataDictDTO
+from src.application.services.external.provider_router import NoProviderAvailableError, ProviderRouter, RoutedImage
+from src.domain.schema.image_edit_form import ImgExpandForm
+from src.domain.schema.image_edit_payload import ImgExpandOptions, ImgExpandPayload
+from src.interfaces.admission import admit_outpaint
+from src.interfaces.disconnect import cancel_on_disconnect
+from src.interfaces.negotiation import (
+    IMAGE_RESPONSES,
+    ImageOutput,
+    build_image_response,
+    check_single_image_output,
+    image_output,
+)
+from src.interfaces.uploads import UploadRoute
+from src.shared.concurrency import ProviderBusyError
+from src.shared.executor import ExecutorOverloadedError, run_cpu_bound
+from src.shared.resilience import ProviderCallError
+from src.shared.helpers.encode import decode_base64_image, encode_image_bytes_to_png_base64
+from src.shared.metrics import timed_stage
+
+
+def getProviderRouter(request: Request) -> ProviderRouter:
+    """Dependency to get the shared ProviderRouter built by the app lifespan."""
+    return request.app.state.router
+
+
+outpaint_router: APIRouter = APIRouter(
+    prefix="/outpaint",
+    tags=["Outpaint"],
+    responses={404: {"description": "Not found"}},
+    route_class=UploadRoute,
+)
+
+
+async def _route_outpaint(
+    router: ProviderRouter,
+    image: str | bytes,
+    options: ImgExpandOptions,
+    output: ImageOutput,
+) -> ResponseDataDictDTO | Response:
+    """Runs the outpaint on the fastest healthy provider once the memory budget admits it, mapping failures to HTTP errors."""
+    check_single_image_output(output, options.num_candidates)
+    async with admit_outpaint(image, options):
+        try:
+            with timed_stage("b64_decode"):
+                image_bytes = await run_cpu_bound(decode_base64_image, image) if isinstance(image, str) else image
+            routed: RoutedImage = await router.generate(image_bytes, options)
+            headers = {"X-Provider": routed.provider}
+            if routed.near_duplicate:
+                headers["X-Near-Duplicate"] = "true"
+            if output.raw:
+                response = await build_image_response(routed.image, output)
+                response.headers.update(headers)
+                return response
+            # Candidates are encoded in parallel on the CPU executor
+            with timed_stage("encode"):
+                images_b64 = await asyncio.gather(
+                    *(run_cpu_bound(encode_image_bytes_to_png_base64, image.data) for image in routed.images)
+                )
+        except (ExecutorOverloadedError, ProviderBusyError, NoProviderAvailableError) as e:
+            raise HTTPException(
+                status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+                detail=str(e),
+                headers={"Retry-After": "1"},
+            )
+        except (TypeError, ValueError) as e:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail=str(e),
+            )
+        except ProviderCallError as e:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_GATEWAY,
+                detail=str(e),
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+                detail=str(e),
+            )
+        data = {
+            "generated_image_b64": images_b64[0],
+            "provider": routed.provider,
+            "hedged": routed.hedged,
+            "failed_over": routed.failed_over,
+            "near_duplicate": routed.near_duplicate,
+        }
+        if options.num_candidates > 1:
+            data["generated_images_b64"] = list(images_b64)
+        return ResponseDataDictDTO(
+            message="Image outpainted successfully",
+            data=data,
+        )
+
+
+@outpaint_router.post(
+    path="",
+    summary="Outpaint an image on the fastest healthy provider",
+    response_model=ResponseDataDictDTO,
+    responses=IMAGE_RESPONSES,
+)
+async def outpaint_image(
+    request: Request,
+    payload: ImgExpandPayload,
+    router: ProviderRouter = Depends(getProviderRouter),
+    output: ImageOutput = Depends(image_output),
+) -> ResponseDataDictDTO | Response:
+    """
+    Endpoint to outpaint an image on Vertex AI or the Gradio Space: slow
+    requests are hedged on the other provider and failed ones fail over to it.
+    """
+    return await cancel_on_disconnect(request, _route_outpaint(router, payload.input_image_b64, payload, output))
+
+
+@outpaint_router.post(
+    path="/multipart",
+    summary="Outpaint an uploaded image on the fastest healthy provider",
+    response_model=ResponseDataDictDTO,
+    responses=IMAGE_RESPONSES,
+)
+async def outpaint_image_multipart(
+    request: Request,
+    form: Annotated[ImgExpandForm, Form()],
+    router: ProviderRouter = Depends(getProviderRouter),
+    output: ImageOutput = Depends(image_output),
+) -> ResponseDataDictDTO | Response:
+    """Endpoint to outpaint an image sent as a raw multipart file part on the fastest healthy provider."""
+    image_bytes = await form.image.read()
+    await form.image.close()
+    return await cancel_on_disconnect(request, _route_outpaint(router, image_bytes, form, output))
@@ -0,0 +1,44 @@
+from collections.abc import Awaitable, Callable
+from http import HTTPStatus
+
+from fastapi import HTTPException, Request, Response
+from fastapi.routing import APIRoute
+from starlette.formparsers import MultiPartException, MultiPartParser
+
+from src.shared.api import UPLOAD_SPOOL_MAX_SIZE
+
+
+class UploadMultiPartParser(MultiPartParser):
+    """Multipart parser keeping uploaded parts in memory up to UPLOAD_SPOOL_MAX_SIZE, then spooling them to disk."""
+
+    spool_max_size = UPLOAD_SPOOL_MAX_SIZE
+
+
+def _is_multipart(request: Request) -> bool:
+    content_type = request.headers.get("content-type", "")
+    return content_type.partition(";")[0].strip().lower() == "multipart/form-data"
+
+
+class UploadRoute(APIRoute):
+    """
+    Route parsing multipart bodies with UploadMultiPartParser, so that the
+    spool threshold applies to this app's upload endpoints only.
+
+    Starlette (0.47) builds its parser inside `Request.form()` without a
+    spool option. The form is parsed here first and cached in
+    `Request._form`, where `Request.form()` returns it to FastAPI, which
+    still closes it once the response is sent.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Awaitable[Response]]:
+        handler = super().get_route_handler()
+
+        async def parse_upload_then_handle(request: Request) -> Response:
+            if _is_multipart(request) and request._form is None:
+                try:
+                    request._form = await UploadMultiPartParser(request.headers, request.stream()).parse()
+                except MultiPartException as e:
+                    raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=e.message)
+            return await handler(request)
+
+        return parse_upload_then_handle
@@ -1,9 +1,13 @@
 from .debug import DEBUG
 from .api import API, APIContentType
+from .executor import ExecutorOverloadedError, run_cpu_bound, shutdown_cpu_executor
 
 
 __all__ = [
     "DEBUG",
     "API", 
     "APIContentType",
-]
\ No newline at end of file
+    "ExecutorOverloadedError",
+    "run_cpu_bound",
+    "shutdown_cpu_executor",
+]
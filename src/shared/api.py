@@ -1,8 +1,12 @@
 from enum import StrEnum
+from os import getenv
 from typing import Final
 
 BASE: Final[str] = "/api"
 
+# Multipart uploads larger than this many bytes are spooled to a temporary file on disk.
+UPLOAD_SPOOL_MAX_SIZE: Final[int] = int(getenv("UPLOAD_SPOOL_MAX_SIZE", str(1024 * 1024)))
+
 
 class API(StrEnum):
     """API endpoint constants."""
@@ -0,0 +1,126 @@
+import asyncio
+from os import getenv
+from types import TracebackType
+from typing import Final
+
+
+DEFAULT_PROVIDER_MAX_CONCURRENCY: Final[dict[str, int]] = {
+    "vertex": 8,
+    "gradio": 2,
+}
+
+
+class ProviderBusyError(RuntimeError):
+    """Raised when a provider slot could not be acquired within the queue timeout."""
+
+
+class ProviderLimiter:
+    """
+    Caps the number of in-flight calls to an upstream provider.
+
+    The cap adapts AIMD-style between `min_concurrency` and `max_concurrency`:
+    every successful call raises it by 1/limit (about one slot per round of
+    calls), every throttled call halves it.
+
+    Used as an async context manager around each provider call:
+
+        async with get_provider_limiter("vertex"):
+            await client.aio.models.edit_image(...)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int,
+        queue_timeout: float | None = None,
+        min_concurrency: int = 1,
+    ) -> None:
+        """
+        Args:
+            name: Provider name, used in error messages.
+            max_concurrency: Maximum number of simultaneous calls.
+            queue_timeout: Seconds to wait for a free slot before raising
+                ProviderBusyError. None waits forever.
+            min_concurrency: Floor of the adaptive cap.
+        """
+        if max_concurrency < 1:
+            raise ValueError(f"{name} max concurrency must be a positive integer.")
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = max(1, min(min_concurrency, max_concurrency))
+        self.queue_timeout = queue_timeout
+        self._limit = float(max_concurrency)
+        self._condition = asyncio.Condition()
+        self._in_flight = 0
+
+    @property
+    def in_flight(self) -> int:
+        """Number of calls currently holding a slot."""
+        return self._in_flight
+
+    @property
+    def limit(self) -> int:
+        """Current adaptive cap."""
+        return int(self._limit)
+
+    def _has_slot(self) -> bool:
+        return self._in_flight < self.limit
+
+    async def __aenter__(self) -> "ProviderLimiter":
+        async with self._condition:
+            try:
+                await asyncio.wait_for(self._condition.wait_for(self._has_slot), timeout=self.queue_timeout)
+            except TimeoutError:
+                raise ProviderBusyError(
+                    f"All {self.limit} {self.name} slots are busy. Retry later."
+                )
+            self._in_flight += 1
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        async with self._condition:
+            self._in_flight -= 1
+            # Wakes a waiter per free slot, including those opened by record_success
+            self._condition.notify(max(1, self.limit - self._in_flight))
+
+    def record_success(self) -> None:
+        """
+        Additive increase after a successful call. Called while the call still
+        holds its slot: the waiters for the new slots are woken when it is released.
+        """
+        self._limit = min(float(self.max_concurrency), self._limit + 1 / self._limit)
+
+    def record_throttle(self) -> None:
+        """Multiplicative decrease after the provider throttled a call."""
+        self._limit = max(float(self.min_concurrency), self._limit / 2)
+
+
+_limiters: dict[str, ProviderLimiter] = {}
+
+
+def get_provider_limiter(name: str) -> ProviderLimiter:
+    """
+    Returns the process-wide limiter of a provider, creating it on first use.
+
+    The cap is read from `<NAME>_MAX_CONCURRENCY`, its adaptive floor from
+    `<NAME>_MIN_CONCURRENCY` and the optional queue timeout (seconds) from
+    `<NAME>_QUEUE_TIMEOUT`.
+    """
+    if name not in _limiters:
+        env_prefix = name.upper()
+        max_concurrency = int(
+            getenv(f"{env_prefix}_MAX_CONCURRENCY", str(DEFAULT_PROVIDER_MAX_CONCURRENCY.get(name, 4)))
+        )
+        queue_timeout = getenv(f"{env_prefix}_QUEUE_TIMEOUT")
+        _limiters[name] = ProviderLimiter(
+            name,
+            max_concurrency,
+            float(queue_timeout) if queue_timeout else None,
+            int(getenv(f"{env_prefix}_MIN_CONCURRENCY", "1")),
+        )
+    return _limiters[name]
@@ -0,0 +1,172 @@
+import asyncio
+import multiprocessing
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import StrEnum
+from functools import partial
+from os import cpu_count, getenv
+from typing import Any, Callable, Final, TypeVar
+
+T = TypeVar("T")
+
+
+class ExecutorKind(StrEnum):
+    """Kinds of pool available to run CPU-bound work."""
+
+    PROCESS = "process"
+    THREAD = "thread"
+
+
+EXECUTOR_KIND: Final[ExecutorKind] = ExecutorKind(getenv("IMAGE_EXECUTOR_KIND", ExecutorKind.PROCESS).strip().lower())
+EXECUTOR_WORKERS: Final[int] = int(getenv("IMAGE_EXECUTOR_WORKERS", str(cpu_count() or 1)))
+EXECUTOR_MAX_PENDING: Final[int] = int(getenv("IMAGE_EXECUTOR_MAX_PENDING", str(EXECUTOR_WORKERS * 4)))
+
+
+class ExecutorOverloadedError(RuntimeError):
+    """Raised when the CPU executor already holds its maximum number of pending tasks."""
+
+
+# Set for work that queues for a free slot instead of being rejected (batch items); inherited by its subtasks
+_wait_for_capacity: ContextVar[bool] = ContextVar("wait_for_capacity", default=False)
+
+
+@contextmanager
+def waiting_for_capacity() -> Iterator[None]:
+    """Within the block, `CPUExecutor.run` waits for a free slot instead of raising ExecutorOverloadedError."""
+    token = _wait_for_capacity.set(True)
+    try:
+        yield
+    finally:
+        _wait_for_capacity.reset(token)
+
+
+class CPUExecutor:
+    """
+    Runs CPU-bound callables (PIL decode/encode, padding, masks) outside the
+    event loop, in a process or thread pool with a bounded number of pending tasks.
+    """
+
+    def __init__(
+        self,
+        kind: ExecutorKind = EXECUTOR_KIND,
+        max_workers: int = EXECUTOR_WORKERS,
+        max_pending: int = EXECUTOR_MAX_PENDING,
+    ) -> None:
+        """
+        Args:
+            kind: Whether to use a process pool or a thread pool.
+            max_workers: Number of workers in the pool.
+            max_pending: Maximum number of submitted tasks (running + queued)
+                before new submissions are rejected.
+        """
+        if max_workers < 1 or max_pending < 1:
+            raise ValueError("Executor max_workers and max_pending must be positive integers.")
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._pending = 0
+        self._executor: Executor | None = None
+        # Callers waiting for a free slot, in arrival order
+        self._waiters: deque[asyncio.Future] = deque()
+
+    @property
+    def pending(self) -> int:
+        """Number of tasks submitted and not finished yet."""
+        return self._pending
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == ExecutorKind.PROCESS:
+                # "spawn" avoids forking a process that already runs gRPC/HTTP client threads.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="image-worker",
+                )
+        return self._executor
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Runs `fn(*args, **kwargs)` in the pool and awaits its result.
+
+        With a process pool `fn` and its arguments must be picklable,
+        i.e. module-level functions and plain data.
+
+        Raises:
+            ExecutorOverloadedError: If `max_pending` tasks are already in
+                flight, unless called within `waiting_for_capacity`.
+        """
+        while self._pending >= self.max_pending:
+            if not _wait_for_capacity.get():
+                raise ExecutorOverloadedError(
+                    f"Image processing queue is full ({self._pending}/{self.max_pending} pending tasks). Retry later."
+                )
+            await self._wait_for_slot()
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), partial(fn, *args, **kwargs))
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM kill); start a fresh pool for the next task.
+            self.shutdown(wait=False)
+            raise
+        finally:
+            self._pending -= 1
+            self._wake_next_waiter()
+
+    async def _wait_for_slot(self) -> None:
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # Pass a wake-up received just before the cancellation on to the next waiter
+            if waiter.done() and not waiter.cancelled():
+                self._wake_next_waiter()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def _wake_next_waiter(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Shuts the underlying pool down; a later `run` starts a fresh one."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+
+_cpu_executor: CPUExecutor | None = None
+
+
+def get_cpu_executor() -> CPUExecutor:
+    """Returns the process-wide CPU executor, creating it on first use."""
+    global _cpu_executor
+    if _cpu_executor is None:
+        _cpu_executor = CPUExecutor()
+    return _cpu_executor
+
+
+async def run_cpu_bound(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Runs a CPU-bound callable on the process-wide executor."""
+    return await get_cpu_executor().run(fn, *args, **kwargs)
+
+
+def shutdown_cpu_executor(wait: bool = True) -> None:
+    """Shuts the process-wide CPU executor down if it was started."""
+    if _cpu_executor is not None:
+        _cpu_executor.shutdown(wait=wait)
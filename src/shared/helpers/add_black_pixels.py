@@ -1,43 +1,41 @@
 import base64
-import io
 from PIL import Image
 
-def add_black_pixel_padding(
-    image_b64: str,
+from src.shared.helpers.encode import decode_base64_image, image_to_bytes, open_image
+
+
+def validate_padding(
     left_pixels: int,
     right_pixels: int,
     top_pixels: int,
     bottom_pixels: int
-) -> str:
+) -> None:
+    """Raises ValueError unless every padding value is a non-negative integer."""
+    if not all(isinstance(p, int) and p >= 0 for p in [left_pixels, right_pixels, top_pixels, bottom_pixels]):
+        raise ValueError("Padding values (left, right, top, bottom) must be non-negative integers.")
+
+
+def pad_image(
+    original_image: Image.Image,
+    left_pixels: int,
+    right_pixels: int,
+    top_pixels: int,
+    bottom_pixels: int
+) -> Image.Image:
     """
-    Adds black pixels as padding to the sides of a base64-encoded image.
+    Pastes an already decoded image onto a larger black canvas.
 
     Args:
-        image_b64: The input image as a base64-encoded string.
+        original_image: The decoded PIL image.
         left_pixels: Number of black pixels to add to the left side.
         right_pixels: Number of black pixels to add to the right side.
         top_pixels: Number of black pixels to add to the top side.
         bottom_pixels: Number of black pixels to add to the bottom side.
 
     Returns:
-        The new image as a base64-encoded string with the added black padding.
+        The padded PIL image, in RGBA mode if the original has transparency, RGB otherwise.
     """
-    if not isinstance(image_b64, str):
-        raise TypeError("Input image_b64 must be a string.")
-    if not all(isinstance(p, int) and p >= 0 for p in [left_pixels, right_pixels, top_pixels, bottom_pixels]):
-        raise ValueError("Padding values (left, right, top, bottom) must be non-negative integers.")
-
-    try:
-        # 1. Decode the input base64 string to bytes
-        image_bytes = base64.b64decode(image_b64)
-    except Exception as e:
-        raise ValueError(f"Could not decode base64 input image: {e}")
-
-    try:
-        # 2. Open the image bytes with PIL
-        original_image = Image.open(io.BytesIO(image_bytes))
-    except Exception as e:
-        raise ValueError(f"Could not open image from bytes. Ensure it's a valid image format: {e}")
+    validate_padding(left_pixels, right_pixels, top_pixels, bottom_pixels)
 
     original_width, original_height = original_image.size
 
@@ -57,22 +55,44 @@ def add_black_pixel_padding(
         new_mode = 'RGB'
         background_color = (0, 0, 0) # Solid black
 
-    # 3. Create a new blank image with the desired black background and new dimensions
+    # Create a new blank image with the desired black background and new dimensions
     new_image = Image.new(new_mode, (new_width, new_height), background_color)
 
-    # 4. Paste the original image onto the new canvas at the correct offset
+    # Paste the original image onto the new canvas at the correct offset
     new_image.paste(original_image, (left_pixels, top_pixels))
+    return new_image
+
 
-    # 5. Convert the new PIL Image back to bytes
-    output_buffer = io.BytesIO()
+def padded_image_format(padded_image: Image.Image) -> str:
+    """Returns the PIL format used to serialize a canvas produced by `pad_image`."""
     # Save as PNG to preserve alpha channel if present, otherwise JPEG is fine but PNG is safer.
     # If the original was JPEG and you explicitly need JPEG output, handle mode conversion carefully.
-    save_format = "PNG" if new_mode == "RGBA" else "JPEG"
-    try:
-        new_image.save(output_buffer, format=save_format)
-    except Exception as e:
-        raise RuntimeError(f"Failed to save padded image to buffer in {save_format} format: {e}")
+    return "PNG" if padded_image.mode == "RGBA" else "JPEG"
 
-    # 6. Encode the bytes to base64 string and return
-    return base64.b64encode(output_buffer.getvalue()).decode("utf-8")
 
+def add_black_pixel_padding(
+    image_b64: str,
+    left_pixels: int,
+    right_pixels: int,
+    top_pixels: int,
+    bottom_pixels: int
+) -> str:
+    """
+    Adds black pixels as padding to the sides of a base64-encoded image.
+
+    Args:
+        image_b64: The input image as a base64-encoded string.
+        left_pixels: Number of black pixels to add to the left side.
+        right_pixels: Number of black pixels to add to the right side.
+        top_pixels: Number of black pixels to add to the top side.
+        bottom_pixels: Number of black pixels to add to the bottom side.
+
+    Returns:
+        The new image as a base64-encoded string with the added black padding.
+    """
+    validate_padding(left_pixels, right_pixels, top_pixels, bottom_pixels)
+
+    original_image = open_image(decode_base64_image(image_b64))
+    new_image = pad_image(original_image, left_pixels, right_pixels, top_pixels, bottom_pixels)
+    image_bytes = image_to_bytes(new_image, padded_image_format(new_image))
+    return base64.b64encode(image_bytes).decode("utf-8")
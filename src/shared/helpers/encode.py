@@ -1,7 +1,221 @@
 import base64
+import binascii
+import io
+from typing import Final
+
+from PIL import Image
+
+# PIL format name for each image MIME type we can produce
+MIME_TYPE_FORMATS: Final[dict[str, str]] = {
+    "image/png": "PNG",
+    "image/webp": "WEBP",
+    "image/jpeg": "JPEG",
+}
+
 
 def encode_image_to_base64(filepath):
     """Encodes an image file to a base64 string."""
     with open(filepath, "rb") as image_file:
         return base64.b64encode(image_file.read()).decode('utf-8')
 
+
+def encode_bytes_to_base64(data: bytes) -> str:
+    """Encodes raw bytes to a base64 string."""
+    return base64.b64encode(data).decode("utf-8")
+
+
+def decode_base64_image(image_b64: str) -> bytes:
+    """
+    Decodes a base64-encoded image into raw bytes.
+
+    Args:
+        image_b64: The input image as a base64-encoded string.
+
+    Returns:
+        The decoded image bytes.
+    """
+    if not isinstance(image_b64, str):
+        raise TypeError("Input image_b64 must be a string.")
+    try:
+        image_bytes = base64.b64decode(image_b64)
+    except (binascii.Error, ValueError) as e:
+        raise ValueError(f"Could not decode base64 input image: {e}")
+    if not image_bytes:
+        raise ValueError("Decoded input image bytes are empty.")
+    return image_bytes
+
+
+def open_image(image_bytes: bytes, draft_size: tuple[int, int] | None = None) -> Image.Image:
+    """
+    Opens raw image bytes with PIL and loads the pixel data.
+
+    Args:
+        image_bytes: The encoded image (PNG, JPEG, WEBP...).
+        draft_size: Size the image is about to be reduced to. JPEG decoding
+            then skips the detail it does not need (the result is at least
+            this large, but may be smaller than the original).
+
+    Returns:
+        The decoded PIL image.
+    """
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        if draft_size is not None:
+            image.draft(image.mode, draft_size)
+        image.load()
+    except Exception as e:
+        raise ValueError(f"Could not open image from bytes. Ensure it's a valid image format: {e}")
+    return image
+
+
+def read_image_size(image_bytes: bytes) -> tuple[int, int]:
+    """
+    Reads the (width, height) of an encoded image from its header
+    without decoding the pixel data.
+
+    Args:
+        image_bytes: The encoded image (PNG, JPEG, WEBP...).
+
+    Returns:
+        The image dimensions as a (width, height) tuple.
+    """
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            return image.size
+    except Exception as e:
+        raise ValueError(f"Could not read image dimensions from bytes: {e}")
+
+
+def read_image_header(image_bytes: bytes) -> tuple[int, int, str]:
+    """
+    Reads the (width, height, mode) of an encoded image from its header
+    without decoding the pixel data.
+
+    Args:
+        image_bytes: The encoded image, or at least its first bytes.
+
+    Returns:
+        The image dimensions and PIL mode.
+    """
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            return image.width, image.height, image.mode
+    except Exception as e:
+        raise ValueError(f"Could not read image header from bytes: {e}")
+
+
+def read_base64_image_header(image_b64: str, prefix_chars: int = 65536) -> tuple[int, int, str]:
+    """
+    Reads the (width, height, mode) of a base64-encoded image, decoding only
+    its first `prefix_chars` characters when the header fits in them.
+
+    Args:
+        image_b64: The input image as a base64-encoded string.
+        prefix_chars: Characters decoded on the first attempt.
+
+    Returns:
+        The image dimensions and PIL mode.
+    """
+    if len(image_b64) > prefix_chars:
+        try:
+            return read_image_header(base64.b64decode(image_b64[: prefix_chars // 4 * 4]))
+        except (binascii.Error, ValueError):
+            # Header beyond the prefix (e.g. large JPEG metadata): decode everything
+            pass
+    return read_image_header(decode_base64_image(image_b64))
+
+
+def image_to_bytes(image: Image.Image, format: str, **save_kwargs) -> bytes:
+    """
+    Encodes a PIL image into bytes using the given format.
+
+    Args:
+        image: The PIL image to encode.
+        format: The PIL format name (e.g. "PNG", "JPEG").
+        **save_kwargs: Extra options forwarded to `Image.save`.
+
+    Returns:
+        The encoded image bytes.
+    """
+    output_buffer = io.BytesIO()
+    try:
+        image.save(output_buffer, format=format, **save_kwargs)
+    except Exception as e:
+        raise RuntimeError(f"Failed to save image to buffer in {format} format: {e}")
+    return output_buffer.getvalue()
+
+
+def sniff_mime_type(image_bytes: bytes) -> str | None:
+    """
+    Detects the MIME type of an encoded image from its magic bytes.
+
+    Args:
+        image_bytes: The encoded image.
+
+    Returns:
+        "image/png", "image/jpeg", "image/webp" or None when unknown.
+    """
+    if image_bytes.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if image_bytes.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if image_bytes[:4] == b"RIFF" and image_bytes[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def transcode_image(image_bytes: bytes, mime_type: str, quality: int = 90) -> bytes:
+    """
+    Re-encodes an image into another format.
+
+    Args:
+        image_bytes: The encoded source image.
+        mime_type: Target MIME type, one of MIME_TYPE_FORMATS.
+        quality: Quality (1-100) used by the lossy WEBP and JPEG encoders.
+
+    Returns:
+        The re-encoded image bytes.
+    """
+    if mime_type not in MIME_TYPE_FORMATS:
+        raise ValueError(f"Unsupported output image type: {mime_type}")
+    image_format = MIME_TYPE_FORMATS[mime_type]
+    image = open_image(image_bytes)
+    if image_format == "JPEG":
+        # JPEG has no alpha channel
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        return image_to_bytes(image, image_format, quality=quality)
+    if image_format == "WEBP":
+        return image_to_bytes(image, image_format, quality=quality)
+    return image_to_bytes(image, image_format)
+
+
+def convert_image_bytes(image_bytes: bytes, mime_type: str, quality: int = 90) -> bytes:
+    """
+    Returns the image in the requested format, passing the bytes through
+    untouched when they are already encoded that way.
+
+    Args:
+        image_bytes: The encoded source image.
+        mime_type: Target MIME type, one of MIME_TYPE_FORMATS.
+        quality: Quality (1-100) used when a lossy transcode is needed.
+
+    Returns:
+        The image bytes in the requested format.
+    """
+    if sniff_mime_type(image_bytes) == mime_type:
+        return image_bytes
+    return transcode_image(image_bytes, mime_type, quality)
+
+
+def encode_image_bytes_to_png_base64(image_bytes: bytes) -> str:
+    """
+    Returns an image as a base64 PNG string, re-encoding it only when it is not a PNG already.
+
+    Args:
+        image_bytes: The encoded source image.
+
+    Returns:
+        The PNG image as a base64-encoded string.
+    """
+    return base64.b64encode(convert_image_bytes(image_bytes, "image/png")).decode("utf-8")
@@ -0,0 +1,12 @@
+from enum import StrEnum
+
+
+class LocalFillMode(StrEnum):
+    """How the local engine fills the expansion."""
+
+    # Repeats the outermost row/column of the image
+    EDGE = "edge"
+    # Reflects the image across its borders
+    MIRROR = "mirror"
+    # Extends the edges, then fades them into a blur of their colours away from the image
+    BLUR = "blur"
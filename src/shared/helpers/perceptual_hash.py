@@ -0,0 +1,84 @@
+from dataclasses import dataclass
+from functools import cache
+from typing import TYPE_CHECKING, Final
+
+from PIL import Image
+
+from src.shared.helpers.encode import open_image, read_image_size
+
+if TYPE_CHECKING:
+    # numpy takes about 100 ms to import: it is loaded by the first fingerprint
+    import numpy as np
+
+# Side of the grayscale thumbnail whose DCT gives the pHash
+PHASH_SAMPLE_SIZE: Final[int] = 32
+# Side of the low-frequency DCT block kept by the pHash: 8 x 8 = 64 bits
+PHASH_BLOCK_SIZE: Final[int] = 8
+HASH_BITS: Final[int] = PHASH_BLOCK_SIZE * PHASH_BLOCK_SIZE
+HASH_MASK: Final[int] = (1 << HASH_BITS) - 1
+
+
+@cache
+def _dct_matrix(size: int) -> "np.ndarray":
+    """Orthonormal DCT-II matrix: `matrix @ x` is the DCT of the column vector `x`."""
+    import numpy as np
+
+    frequencies = np.arange(size)[:, None]
+    samples = np.arange(size)[None, :]
+    matrix = np.cos(np.pi * (2 * samples + 1) * frequencies / (2 * size)) * np.sqrt(2 / size)
+    matrix[0] /= np.sqrt(2)
+    return matrix.astype(np.float32)
+
+
+@dataclass(frozen=True)
+class ImageFingerprint:
+    """
+    Perceptual hashes of an image, which survive re-encoding and resizing,
+    together with its size, which they ignore.
+    """
+
+    phash: int
+    dhash: int
+    width: int
+    height: int
+
+
+def _bits_to_int(bits: "np.ndarray") -> int:
+    return int.from_bytes(bits.ravel().tobytes(), "big")
+
+
+def fingerprint_image(image_bytes: bytes) -> ImageFingerprint:
+    """
+    Computes the 64-bit pHash (signs of the low DCT frequencies around their
+    median) and dHash (horizontal gradient signs) of an encoded image.
+
+    Args:
+        image_bytes: The encoded image.
+
+    Returns:
+        ImageFingerprint with both hashes and the image size.
+    """
+    import numpy as np
+
+    width, height = read_image_size(image_bytes)
+    # JPEG decoding skips the detail a 32 x 32 thumbnail does not need
+    grayscale = open_image(image_bytes, draft_size=(PHASH_SAMPLE_SIZE, PHASH_SAMPLE_SIZE)).convert("L")
+
+    thumbnail = np.asarray(
+        grayscale.resize((PHASH_SAMPLE_SIZE, PHASH_SAMPLE_SIZE), Image.Resampling.LANCZOS), dtype=np.float32
+    )
+    dct = _dct_matrix(PHASH_SAMPLE_SIZE)
+    frequencies = (dct @ thumbnail @ dct.T)[:PHASH_BLOCK_SIZE, :PHASH_BLOCK_SIZE]
+    # The DC term only carries the average brightness
+    phash_bits = np.packbits(frequencies > np.median(frequencies.ravel()[1:]))
+
+    gradient = np.asarray(
+        grayscale.resize((PHASH_BLOCK_SIZE + 1, PHASH_BLOCK_SIZE), Image.Resampling.LANCZOS), dtype=np.int16
+    )
+    dhash_bits = np.packbits(gradient[:, 1:] > gradient[:, :-1])
+    return ImageFingerprint(_bits_to_int(phash_bits), _bits_to_int(dhash_bits), width, height)
+
+
+def hamming_distance(first: int, second: int) -> int:
+    """Number of differing bits of two 64-bit hashes (signed or unsigned)."""
+    return ((first ^ second) & HASH_MASK).bit_count()
@@ -0,0 +1,241 @@
+import math
+import time
+from dataclasses import dataclass, field
+
+from PIL import Image
+
+from src.shared.helpers.add_black_pixels import pad_image, padded_image_format, validate_padding
+from src.shared.helpers.add_mask import draw_mask
+from src.shared.helpers.encode import decode_base64_image, image_to_bytes, open_image, read_image_size
+
+
+@dataclass(frozen=True)
+class OutpaintCanvas:
+    """
+    Padded canvas and mask ready to be sent to an outpainting provider.
+
+    When the canvas was downscaled for upload, `image_bytes` and `mask_bytes`
+    are at `upload_size` and `source_bytes` keeps the original image so that
+    `recompose_outpaint` can rebuild the result at `canvas_size`.
+    """
+
+    image_bytes: bytes
+    mask_bytes: bytes
+    original_size: tuple[int, int]
+    canvas_size: tuple[int, int]
+    upload_size: tuple[int, int] | None = None
+    paddings: tuple[int, int, int, int] = (0, 0, 0, 0)
+    source_bytes: bytes | None = None
+    # Seconds spent in each preparation stage, reported by the request metrics
+    timings: dict[str, float] = field(default_factory=dict, compare=False)
+
+    @property
+    def downscaled(self) -> bool:
+        """True when the provider receives a smaller canvas than the requested one."""
+        return self.source_bytes is not None
+
+
+def prepare_outpaint_canvas(
+    image_bytes: bytes,
+    left_pixels: int,
+    right_pixels: int,
+    top_pixels: int,
+    bottom_pixels: int,
+    max_pixels: int | None = None,
+) -> OutpaintCanvas:
+    """
+    Decodes the input image once and builds both the padded canvas
+    and the mask from the same in-memory image.
+
+    Args:
+        image_bytes: The encoded input image.
+        left_pixels: Number of pixels to add to the left side.
+        right_pixels: Number of pixels to add to the right side.
+        top_pixels: Number of pixels to add to the top side.
+        bottom_pixels: Number of pixels to add to the bottom side.
+        max_pixels: Working resolution of the provider. A larger canvas is
+            downscaled to fit it before upload (see `recompose_outpaint`).
+
+    Returns:
+        An OutpaintCanvas holding the encoded padded image and mask.
+    """
+    validate_padding(left_pixels, right_pixels, top_pixels, bottom_pixels)
+
+    if max_pixels is not None:
+        original_width, original_height = read_image_size(image_bytes)
+        canvas_size = (original_width + left_pixels + right_pixels, original_height + top_pixels + bottom_pixels)
+        if canvas_size[0] * canvas_size[1] > max_pixels:
+            return _prepare_downscaled_canvas(
+                image_bytes, (original_width, original_height), canvas_size,
+                (left_pixels, right_pixels, top_pixels, bottom_pixels), max_pixels,
+            )
+
+    started = time.perf_counter()
+    original_image = open_image(image_bytes)
+    open_seconds = time.perf_counter() - started
+    canvas = prepare_outpaint_canvas_from_image(original_image, left_pixels, right_pixels, top_pixels, bottom_pixels)
+    canvas.timings["open"] = open_seconds
+    return canvas
+
+
+def prepare_outpaint_canvas_from_image(
+    original_image: Image.Image,
+    left_pixels: int,
+    right_pixels: int,
+    top_pixels: int,
+    bottom_pixels: int
+) -> OutpaintCanvas:
+    """Same as `prepare_outpaint_canvas`, starting from an already decoded image."""
+    timings = {}
+    started = time.perf_counter()
+    padded_image = pad_image(original_image, left_pixels, right_pixels, top_pixels, bottom_pixels)
+    timings["pad"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    mask_image = draw_mask(original_image.size, left_pixels, right_pixels, top_pixels, bottom_pixels)
+    timings["mask"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    image_bytes = image_to_bytes(padded_image, padded_image_format(padded_image))
+    mask_bytes = image_to_bytes(mask_image, "PNG")
+    timings["canvas_encode"] = time.perf_counter() - started
+
+    return OutpaintCanvas(
+        image_bytes=image_bytes,
+        mask_bytes=mask_bytes,
+        original_size=original_image.size,
+        canvas_size=padded_image.size,
+        timings=timings,
+    )
+
+
+def prepare_outpaint_canvas_from_b64(
+    image_b64: str,
+    left_pixels: int,
+    right_pixels: int,
+    top_pixels: int,
+    bottom_pixels: int,
+    max_pixels: int | None = None,
+) -> OutpaintCanvas:
+    """Same as `prepare_outpaint_canvas`, starting from a base64-encoded image."""
+    started = time.perf_counter()
+    image_bytes = decode_base64_image(image_b64)
+    decode_seconds = time.perf_counter() - started
+    canvas = prepare_outpaint_canvas(image_bytes, left_pixels, right_pixels, top_pixels, bottom_pixels, max_pixels)
+    canvas.timings["b64_decode"] = decode_seconds
+    return canvas
+
+
+def _scale_edges(edges: tuple[int, ...], scale: float) -> list[int]:
+    """Scales increasing edge coordinates, keeping every span at least one pixel wide when it was non-empty."""
+    scaled = [0]
+    for previous, edge in zip(edges, edges[1:]):
+        position = round(edge * scale)
+        if edge > previous:
+            position = max(position, scaled[-1] + 1)
+        scaled.append(position)
+    return scaled
+
+
+def _prepare_downscaled_canvas(
+    image_bytes: bytes,
+    original_size: tuple[int, int],
+    canvas_size: tuple[int, int],
+    paddings: tuple[int, int, int, int],
+    max_pixels: int,
+) -> OutpaintCanvas:
+    """Builds the canvas and mask directly at the provider's working resolution."""
+    left_pixels, right_pixels, top_pixels, bottom_pixels = paddings
+    scale = math.sqrt(max_pixels / (canvas_size[0] * canvas_size[1]))
+
+    x_edges = _scale_edges((0, left_pixels, left_pixels + original_size[0], canvas_size[0]), scale)
+    y_edges = _scale_edges((0, top_pixels, top_pixels + original_size[1], canvas_size[1]), scale)
+    scaled_size = (x_edges[2] - x_edges[1], y_edges[2] - y_edges[1])
+    scaled_paddings = (x_edges[1], x_edges[3] - x_edges[2], y_edges[1], y_edges[3] - y_edges[2])
+
+    started = time.perf_counter()
+    original_image = open_image(image_bytes, draft_size=scaled_size)
+    scaled_image = original_image.resize(scaled_size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+    open_seconds = time.perf_counter() - started
+
+    canvas = prepare_outpaint_canvas_from_image(scaled_image, *scaled_paddings)
+    return OutpaintCanvas(
+        image_bytes=canvas.image_bytes,
+        mask_bytes=canvas.mask_bytes,
+        original_size=original_size,
+        canvas_size=canvas_size,
+        upload_size=canvas.canvas_size,
+        paddings=paddings,
+        source_bytes=image_bytes,
+        timings={**canvas.timings, "open": open_seconds},
+    )
+
+
+def recompose_outpaint(canvas: OutpaintCanvas, generated_bytes: bytes) -> bytes:
+    """
+    Rebuilds a full-resolution outpaint from a result generated on a downscaled
+    canvas: only the generated borders are upscaled, and the original pixels are
+    pasted back untouched.
+
+    Args:
+        canvas: The downscaled canvas the result was generated from.
+        generated_bytes: The encoded image returned by the provider.
+
+    Returns:
+        The full-resolution result as PNG bytes.
+    """
+    if canvas.source_bytes is None:
+        raise ValueError("Only a downscaled canvas can be recomposed.")
+    return compose_outpaint(generated_bytes, canvas.source_bytes, canvas.paddings)
+
+
+def compose_outpaint(generated_bytes: bytes, original_bytes: bytes, paddings: tuple[int, int, int, int]) -> bytes:
+    """
+    Fits an outpaint result onto the canvas of an image expanded by `paddings`:
+    the generated borders are resampled from the result, whatever its size,
+    and the original pixels are pasted back untouched. The result must come
+    from the same expansion, proportionally (e.g. at another resolution).
+
+    Args:
+        generated_bytes: The encoded outpaint result.
+        original_bytes: The encoded image being expanded.
+        paddings: (left, right, top, bottom) pixels added around the image.
+
+    Returns:
+        The result at the canvas size of `original_bytes`, as PNG bytes.
+    """
+    generated_image = open_image(generated_bytes)
+    original_image = open_image(original_bytes)
+    if original_image.mode not in ("RGB", "RGBA"):
+        original_image = original_image.convert("RGBA" if "transparency" in original_image.info else "RGB")
+    if generated_image.mode != original_image.mode:
+        generated_image = generated_image.convert(original_image.mode)
+
+    left_pixels, right_pixels, top_pixels, bottom_pixels = paddings
+    original_width, original_height = original_image.size
+    canvas_width = original_width + left_pixels + right_pixels
+    canvas_height = original_height + top_pixels + bottom_pixels
+    # The provider may answer at a different size than the upload: map coordinates from its own size
+    scale_x = generated_image.width / canvas_width
+    scale_y = generated_image.height / canvas_height
+
+    result = Image.new(original_image.mode, (canvas_width, canvas_height))
+    inner_bottom = top_pixels + original_height
+    border_boxes = [
+        (0, 0, canvas_width, top_pixels),
+        (0, inner_bottom, canvas_width, canvas_height),
+        (0, top_pixels, left_pixels, inner_bottom),
+        (left_pixels + original_width, top_pixels, canvas_width, inner_bottom),
+    ]
+    for x0, y0, x1, y1 in border_boxes:
+        if x1 <= x0 or y1 <= y0:
+            continue
+        # Resampling a source box keeps the filter support across the strip edges, so strips join seamlessly
+        strip = generated_image.resize(
+            (x1 - x0, y1 - y0),
+            Image.Resampling.LANCZOS,
+            box=(x0 * scale_x, y0 * scale_y, x1 * scale_x, y1 * scale_y),
+        )
+        result.paste(strip, (x0, y0))
+    result.paste(original_image, (left_pixels, top_pixels))
+    return image_to_bytes(result, "PNG")
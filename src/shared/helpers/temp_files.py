@@ -0,0 +1,118 @@
+import os
+import shutil
+import tempfile
+import time
+from typing import BinaryIO, Final
+
+COPY_CHUNK_SIZE: Final[int] = 1024 * 1024
+
+
+def copy_to_tempfile(source: BinaryIO, suffix: str = "") -> str:
+    """
+    Copies a file object to a named temporary file in fixed-size chunks.
+
+    Args:
+        source: The readable binary file object (e.g. an upload's spooled file).
+        suffix: Suffix of the temporary file name, such as ".png".
+
+    Returns:
+        The path of the temporary file. The caller is responsible for deleting it.
+    """
+    source.seek(0)
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as destination:
+        shutil.copyfileobj(source, destination, COPY_CHUNK_SIZE)
+        return destination.name
+
+
+def write_tempfile(data: bytes, suffix: str = "") -> str:
+    """
+    Writes bytes to a named temporary file.
+
+    Args:
+        data: The content to write.
+        suffix: Suffix of the temporary file name, such as ".png".
+
+    Returns:
+        The path of the temporary file. The caller is responsible for deleting it.
+    """
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as destination:
+        destination.write(data)
+        return destination.name
+
+
+def remove_file(path: str) -> None:
+    """Deletes a file, ignoring it if it is already gone."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def remove_files_under(paths: list[str], root: str) -> None:
+    """
+    Deletes files and then their parent directories when they became empty,
+    never touching anything outside `root`.
+
+    Args:
+        paths: Files to delete (e.g. the outputs downloaded by gradio_client).
+        root: Directory the files are expected to live in.
+    """
+    root_path = os.path.realpath(root)
+    for path in paths:
+        real_path = os.path.realpath(path)
+        if os.path.commonpath([root_path, real_path]) != root_path:
+            continue
+        remove_file(real_path)
+        parent = os.path.dirname(real_path)
+        if parent != root_path:
+            try:
+                os.rmdir(parent)
+            except OSError:
+                # Not empty (another output still in use) or already removed
+                pass
+
+
+def sweep_directory(directory: str, max_bytes: int, max_age: float) -> int:
+    """
+    Enforces a disk budget on a directory: deletes files older than
+    `max_age`, then the oldest files until the total size fits `max_bytes`.
+    Empty sub-directories are removed afterwards.
+
+    Args:
+        directory: The directory to sweep, recursively.
+        max_bytes: Total size budget, in bytes.
+        max_age: Maximum file age, in seconds.
+
+    Returns:
+        The number of files deleted.
+    """
+    if not os.path.isdir(directory):
+        return 0
+    now = time.time()
+    files: list[tuple[float, int, str]] = []
+    for dirpath, _, filenames in os.walk(directory):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+    files.sort()
+
+    total = sum(size for _, size, _ in files)
+    deleted = 0
+    for mtime, size, path in files:
+        if total <= max_bytes and now - mtime <= max_age:
+            continue
+        remove_file(path)
+        total -= size
+        deleted += 1
+
+    for dirpath, dirnames, filenames in os.walk(directory, topdown=False):
+        if dirpath != directory and not dirnames and not filenames:
+            try:
+                os.rmdir(dirpath)
+            except OSError:
+                pass
+    return deleted
@@ -0,0 +1,148 @@
+import math
+from dataclasses import dataclass
+from enum import StrEnum
+
+from PIL import Image
+
+from src.shared.helpers.prepare_outpaint import OutpaintCanvas, prepare_outpaint_canvas_from_image
+from src.shared.helpers.encode import open_image
+
+
+class Side(StrEnum):
+    """Side of the known region a tile extends."""
+
+    LEFT = "left"
+    RIGHT = "right"
+    TOP = "top"
+    BOTTOM = "bottom"
+
+
+@dataclass(frozen=True)
+class Tile:
+    """
+    One outpaint tile: a crop of the known region extended by `depth`
+    pixels on one side.
+
+    `source_box` is the context cropped from the working canvas and
+    `target_box` the generated area it fills, both in canvas coordinates.
+    """
+
+    side: Side
+    depth: int
+    source_box: tuple[int, int, int, int]
+    target_box: tuple[int, int, int, int]
+    # Pixels shared with the previous tile of the same strip, cross-faded when pasting
+    blend: int
+
+
+def split_span(start: int, end: int, tile_size: int, overlap: int) -> list[tuple[int, int]]:
+    """
+    Splits [start, end) into evenly spaced windows of at most `tile_size`
+    pixels, neighbouring windows sharing at least `overlap` pixels.
+    """
+    length = end - start
+    if length <= tile_size:
+        return [(start, end)]
+    count = math.ceil((length - overlap) / (tile_size - overlap))
+    offsets = [round(i * (length - tile_size) / (count - 1)) for i in range(count)]
+    return [(start + offset, start + offset + tile_size) for offset in offsets]
+
+
+def plan_strip(
+    side: Side,
+    known_box: tuple[int, int, int, int],
+    depth: int,
+    tile_size: int,
+    overlap: int,
+) -> list[Tile]:
+    """
+    Plans the tiles extending the known region by `depth` pixels on one side.
+    Tiles along the same strip are independent and can be generated concurrently.
+
+    Args:
+        side: The side to extend.
+        known_box: The region of the canvas already holding final pixels.
+        depth: Pixels generated by this strip, at most `tile_size` minus the context.
+        tile_size: Maximum side of a tile canvas sent to the provider.
+        overlap: Minimum overlap between two tiles of the strip.
+
+    Returns:
+        The strip tiles, ordered along the strip.
+    """
+    x0, y0, x1, y1 = known_box
+    horizontal = side in (Side.LEFT, Side.RIGHT)
+    context = min(tile_size - depth, (x1 - x0) if horizontal else (y1 - y0))
+    spans = split_span(y0, y1, tile_size, overlap) if horizontal else split_span(x0, x1, tile_size, overlap)
+
+    tiles = []
+    previous_end = None
+    for start, end in spans:
+        blend = max(0, previous_end - start) if previous_end is not None else 0
+        previous_end = end
+        if side == Side.LEFT:
+            source_box, target_box = (x0, start, x0 + context, end), (x0 - depth, start, x0, end)
+        elif side == Side.RIGHT:
+            source_box, target_box = (x1 - context, start, x1, end), (x1, start, x1 + depth, end)
+        elif side == Side.TOP:
+            source_box, target_box = (start, y0, end, y0 + context), (start, y0 - depth, end, y0)
+        else:
+            source_box, target_box = (start, y1 - context, end, y1), (start, y1, end, y1 + depth)
+        tiles.append(Tile(side, depth, source_box, target_box, blend))
+    return tiles
+
+
+def tile_paddings(tile: Tile) -> tuple[int, int, int, int]:
+    """(left, right, top, bottom) paddings of a tile canvas."""
+    return (
+        tile.depth if tile.side == Side.LEFT else 0,
+        tile.depth if tile.side == Side.RIGHT else 0,
+        tile.depth if tile.side == Side.TOP else 0,
+        tile.depth if tile.side == Side.BOTTOM else 0,
+    )
+
+
+def build_tile_canvas(canvas: Image.Image, tile: Tile) -> OutpaintCanvas:
+    """Crops the tile context from the working canvas and pads it with the existing helpers."""
+    return prepare_outpaint_canvas_from_image(canvas.crop(tile.source_box), *tile_paddings(tile))
+
+
+def paste_tile(canvas: Image.Image, tile: Tile, tile_canvas: OutpaintCanvas, generated_bytes: bytes) -> None:
+    """
+    Pastes the generated area of a tile into the working canvas, cross-fading
+    linearly over the pixels shared with the previous tile of the strip.
+
+    Args:
+        canvas: The working canvas, modified in place.
+        tile: The planned tile.
+        tile_canvas: The canvas that was sent to the provider.
+        generated_bytes: The encoded image returned by the provider.
+    """
+    generated_image = open_image(generated_bytes)
+    if generated_image.size != tile_canvas.canvas_size:
+        generated_image = generated_image.resize(tile_canvas.canvas_size, Image.Resampling.LANCZOS)
+    if generated_image.mode != canvas.mode:
+        generated_image = generated_image.convert(canvas.mode)
+
+    left, _, top, _ = tile_paddings(tile)
+    target_x0, target_y0, target_x1, target_y1 = tile.target_box
+    source_x0, source_y0 = tile.source_box[0] - left, tile.source_box[1] - top
+    # Position of the generated area inside the tile canvas
+    piece = generated_image.crop((
+        target_x0 - source_x0,
+        target_y0 - source_y0,
+        target_x1 - source_x0,
+        target_y1 - source_y0,
+    ))
+
+    mask = None
+    if tile.blend:
+        horizontal = tile.side in (Side.LEFT, Side.RIGHT)
+        # The strip runs vertically for left/right tiles: fade along y, otherwise along x
+        ramp_length = piece.height if horizontal else piece.width
+        ramp = Image.linear_gradient("L").resize((1, tile.blend))
+        profile = Image.new("L", (1, ramp_length), 255)
+        profile.paste(ramp, (0, 0))
+        mask = profile.resize((piece.width, ramp_length)) if horizontal else profile.transpose(
+            Image.Transpose.TRANSPOSE
+        ).resize((ramp_length, piece.height))
+    canvas.paste(piece, (target_x0, target_y0), mask)
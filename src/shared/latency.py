@@ -0,0 +1,31 @@
+import math
+from collections import deque
+
+
+class LatencyWindow:
+    """Rolling window of the most recent latencies of an operation, in seconds."""
+
+    def __init__(self, size: int = 200) -> None:
+        """
+        Args:
+            size: Number of samples kept; older ones are forgotten.
+        """
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def observe(self, seconds: float) -> None:
+        """Records one latency."""
+        self._samples.append(seconds)
+
+    def percentile(self, percentile: float) -> float | None:
+        """
+        Returns the given percentile (0-100) of the window, nearest-rank,
+        or None while it holds no sample.
+        """
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        rank = max(1, math.ceil(percentile / 100 * len(ordered)))
+        return ordered[min(rank, len(ordered)) - 1]
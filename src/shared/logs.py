@@ -0,0 +1,215 @@
+import atexit
+import logging
+import queue
+import random
+import re
+from collections.abc import Mapping
+from contextvars import ContextVar, Token
+from datetime import UTC, datetime
+from logging.handlers import QueueHandler, QueueListener
+from os import getenv
+from typing import Any, Final
+
+import orjson
+from pydantic import BaseModel
+
+from src.shared.metrics import LOG_RECORDS_DROPPED
+
+LOG_LEVEL: Final[str] = getenv("LOG_LEVEL", "INFO").strip().upper()
+LOG_FORMAT: Final[str] = getenv("LOG_FORMAT", "text").strip().lower()
+LOG_QUEUE_SIZE: Final[int] = int(getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_MAX_FIELD_CHARS: Final[int] = int(getenv("LOG_MAX_FIELD_CHARS", "128"))
+# Comma-separated `path-prefix=rate` pairs, e.g. "/api/v1/health=0,/api/v1/jobs=0.1"
+LOG_SAMPLE_RATES: Final[str] = getenv("LOG_SAMPLE_RATES", "")
+
+TEXT_FORMAT: Final[str] = "%(asctime)s - %(levelname)s - %(message)s"
+# Field names whose values are never logged
+SECRET_FIELDS: Final[frozenset[str]] = frozenset({"authorization", "api_key", "hf_token", "password", "secret", "token"})
+# Runs of base64 (or data URIs) left in an already formatted message
+_BASE64_RUN: Final[re.Pattern[str]] = re.compile(r"[A-Za-z0-9+/=_-]{%d,}" % max(LOG_MAX_FIELD_CHARS, 64))
+
+# Route prefix of the request being handled and whether its INFO/DEBUG records are kept
+_request_route: ContextVar[str | None] = ContextVar("request_route", default=None)
+_request_sampled: ContextVar[bool] = ContextVar("request_sampled", default=True)
+
+
+def _parse_sample_rates(value: str) -> list[tuple[str, float]]:
+    rates = []
+    for item in value.split(","):
+        prefix, _, rate = item.partition("=")
+        if prefix.strip() and rate.strip():
+            rates.append((prefix.strip(), min(1.0, max(0.0, float(rate)))))
+    # Longest prefix first, so the most specific rule wins
+    return sorted(rates, key=lambda item: len(item[0]), reverse=True)
+
+
+SAMPLE_RATES: Final[list[tuple[str, float]]] = _parse_sample_rates(LOG_SAMPLE_RATES)
+
+
+def start_request_logging(path: str) -> tuple[Token, Token]:
+    """
+    Decides once per request whether its INFO/DEBUG records are kept, from
+    the LOG_SAMPLE_RATES rule matching `path`, so a sampled request keeps all
+    of its records. Warnings and errors are always kept.
+
+    Returns:
+        Tokens to pass to `end_request_logging`.
+    """
+    rate = next((rate for prefix, rate in SAMPLE_RATES if path.startswith(prefix)), 1.0)
+    return _request_route.set(path), _request_sampled.set(rate >= 1.0 or random.random() < rate)
+
+
+def end_request_logging(tokens: tuple[Token, Token]) -> None:
+    route_token, sampled_token = tokens
+    _request_sampled.reset(sampled_token)
+    _request_route.reset(route_token)
+
+
+class _Redacted:
+    """Already redacted value, whose repr is the given text."""
+
+    __slots__ = ("text",)
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+    def __repr__(self) -> str:
+        return self.text
+
+    __str__ = __repr__
+
+
+def _truncate(value: str, max_chars: int) -> str:
+    if len(value) <= max_chars:
+        return value
+    return f"{value[:32]}…<{len(value)} chars>"
+
+
+def redact(value: Any, max_chars: int = LOG_MAX_FIELD_CHARS, key: str | None = None) -> Any:
+    """
+    Returns a copy of `value` safe and cheap to log: long strings (base64
+    images, data URIs) are truncated with their length, bytes are replaced by
+    their size, secrets are masked, and models, mappings and sequences are
+    redacted field by field.
+
+    Args:
+        value: Any log argument.
+        max_chars: Length above which strings are truncated.
+        key: Name of the field holding `value`, if any.
+
+    Returns:
+        The redacted value; pydantic models keep their usual repr shape.
+    """
+    if key is not None and key.lower() in SECRET_FIELDS and value:
+        return _Redacted("'***'")
+    if isinstance(value, str):
+        return _truncate(value, max_chars)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return _Redacted(f"<{len(value)} bytes>")
+    if isinstance(value, BaseModel):
+        fields = ", ".join(
+            f"{name}={redact(getattr(value, name), max_chars, name)!r}" for name in type(value).model_fields
+        )
+        return _Redacted(f"{type(value).__name__}({fields})")
+    if isinstance(value, Mapping):
+        return {name: redact(item, max_chars, str(name)) for name, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(redact(item, max_chars) for item in value)
+    return value
+
+
+def _redact_message(message: str) -> str:
+    if len(message) <= LOG_MAX_FIELD_CHARS:
+        return message
+    return _BASE64_RUN.sub(lambda match: _truncate(match.group(0), 0), message)
+
+
+class RedactingQueueHandler(QueueHandler):
+    """
+    Queue handler run on the caller's thread: it drops unsampled records,
+    redacts the arguments, merges the message and enqueues the record without
+    blocking. Formatting and I/O happen on the listener thread; when the
+    queue is full, records are dropped and counted instead of stalling the
+    event loop.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING and not _request_sampled.get():
+            return False
+        return super().filter(record)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if isinstance(record.args, Mapping):
+            record.args = redact(record.args)
+        elif record.args:
+            record.args = tuple(redact(arg) for arg in record.args)
+        record.msg = _redact_message(record.getMessage())
+        record.args = None
+        record.route = _request_route.get()
+        # The queue stays in this process: the traceback is formatted by the listener
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request route and traceback."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created, UTC).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        route = getattr(record, "route", None)
+        if route:
+            entry["route"] = route
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return orjson.dumps(entry).decode("utf-8")
+
+
+_listener: QueueListener | None = None
+
+
+def configure_logging() -> None:
+    """
+    Routes every log record of the process, uvicorn's included, through a
+    bounded queue to a background thread writing to stderr, as text or JSON
+    (LOG_FORMAT). Safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+    records: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _listener = QueueListener(records, stream_handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(RedactingQueueHandler(records))
+    root.setLevel(LOG_LEVEL)
+    # uvicorn installs its own synchronous handlers before the app is imported
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers.clear()
+        uvicorn_logger.propagate = True
+
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Writes the queued records and stops the background thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,180 @@
+import asyncio
+import itertools
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from os import getenv
+from typing import Final
+
+from src.shared.metrics import MEMORY_BUDGET_RESERVED, MEMORY_BUDGET_REJECTIONS
+
+MEMORY_BUDGET_BYTES: Final[int] = int(getenv("IMAGE_MEMORY_BUDGET_BYTES", str(2 * 1024 ** 3)))
+MEMORY_QUEUE_TIMEOUT: Final[float] = float(getenv("IMAGE_MEMORY_QUEUE_TIMEOUT", "10"))
+
+# Bytes per decoded pixel: PIL stores 1, L and P in one byte, every 8-bit multi-band mode in four
+SINGLE_BYTE_MODES: Final[frozenset[str]] = frozenset({"1", "L", "P"})
+# Modes padded without converting them to RGB(A) first
+CANVAS_MODES: Final[frozenset[str]] = frozenset({"RGB", "RGBA"})
+# Bytes held per pixel of the padded canvas: RGBA canvas (4), L mask (1),
+# and their encodings, as large as the raw pixels for photos (4 + 1)
+CANVAS_BYTES_PER_PIXEL: Final[int] = 10
+# Bytes held per canvas pixel by each candidate beyond the first: its decoded
+# RGBA pixels while it is recomposed or re-encoded (4) and its encodings (4)
+CANDIDATE_BYTES_PER_PIXEL: Final[int] = 8
+
+
+class ImageTooLargeError(ValueError):
+    """Raised when a request would need more memory than the whole budget."""
+
+
+class MemoryBudgetBusyError(RuntimeError):
+    """
+    Raised when the memory a request needs did not free up within the queue
+    timeout. Not an executor overload: callers map it to 503 themselves.
+    """
+
+
+def estimate_outpaint_memory(
+    width: int,
+    height: int,
+    mode: str,
+    left_pixels: int,
+    right_pixels: int,
+    top_pixels: int,
+    bottom_pixels: int,
+    encoded_size: int = 0,
+    num_candidates: int = 1,
+) -> int:
+    """
+    Upper bound of the memory an outpaint of this image needs at its peak:
+    the decoded source, the padded canvas and mask, and their encodings.
+
+    Args:
+        width: Width of the source image.
+        height: Height of the source image.
+        mode: PIL mode of the source image.
+        left_pixels: Pixels added on the left.
+        right_pixels: Pixels added on the right.
+        top_pixels: Pixels added at the top.
+        bottom_pixels: Pixels added at the bottom.
+        encoded_size: Size of the request body holding the image (bytes or base64).
+        num_candidates: Variants generated, held and encoded at the same time.
+
+    Returns:
+        The estimated peak in bytes.
+    """
+    source_bytes_per_pixel = 1 if mode in SINGLE_BYTE_MODES else 4
+    if mode not in CANVAS_MODES:
+        source_bytes_per_pixel += 4
+    canvas_pixels = (width + left_pixels + right_pixels) * (height + top_pixels + bottom_pixels)
+    return (
+        width * height * source_bytes_per_pixel
+        + canvas_pixels * (CANVAS_BYTES_PER_PIXEL + (num_candidates - 1) * CANDIDATE_BYTES_PER_PIXEL)
+        + 2 * encoded_size
+    )
+
+
+class MemoryBudget:
+    """
+    Admits image work against a per-process memory budget.
+
+    A request reserves its estimated peak for as long as it holds its
+    buffers; requests that do not fit wait, in arrival order, until enough
+    memory is released. A request larger than the whole budget is rejected
+    right away, one still waiting after `queue_timeout` seconds is rejected
+    as busy.
+
+        async with get_memory_budget().reserve(estimate):
+            await run_cpu_bound(...)
+    """
+
+    def __init__(self, capacity: int, queue_timeout: float | None = None) -> None:
+        """
+        Args:
+            capacity: Bytes that admitted requests may hold together.
+            queue_timeout: Seconds to wait for memory before raising
+                MemoryBudgetBusyError. None waits forever.
+        """
+        if capacity < 1:
+            raise ValueError("The memory budget must be a positive number of bytes.")
+        self.capacity = capacity
+        self.queue_timeout = queue_timeout
+        self._reserved = 0
+        self._waiters: list[int] = []
+        self._tickets = itertools.count()
+        self._condition = asyncio.Condition()
+
+    @property
+    def reserved(self) -> int:
+        """Bytes currently reserved by admitted requests."""
+        return self._reserved
+
+    def _fits(self, ticket: int, nbytes: int) -> bool:
+        # First come, first served: a large request is not starved by smaller ones behind it
+        return self._waiters[0] == ticket and self._reserved + nbytes <= self.capacity
+
+    async def acquire(self, nbytes: int) -> None:
+        """
+        Reserves `nbytes` of the budget, waiting for earlier requests to release theirs.
+
+        Raises:
+            ImageTooLargeError: If `nbytes` exceeds the whole budget.
+            MemoryBudgetBusyError: If the memory did not free up in time.
+        """
+        if nbytes > self.capacity:
+            MEMORY_BUDGET_REJECTIONS.inc(reason="too_large")
+            raise ImageTooLargeError(
+                f"Processing this image needs about {nbytes / 1024 ** 2:.0f} MiB, more than the "
+                f"{self.capacity / 1024 ** 2:.0f} MiB allowed. Send a smaller image or smaller paddings."
+            )
+        ticket = next(self._tickets)
+        async with self._condition:
+            self._waiters.append(ticket)
+            try:
+                if not self._fits(ticket, nbytes):
+                    await asyncio.wait_for(
+                        self._condition.wait_for(lambda: self._fits(ticket, nbytes)), timeout=self.queue_timeout
+                    )
+            except TimeoutError:
+                MEMORY_BUDGET_REJECTIONS.inc(reason="busy")
+                raise MemoryBudgetBusyError(
+                    f"Image memory budget is in use ({self._reserved / 1024 ** 2:.0f}/"
+                    f"{self.capacity / 1024 ** 2:.0f} MiB). Retry later."
+                )
+            finally:
+                self._waiters.remove(ticket)
+                # The next waiter may fit now that this one left the head of the line
+                self._condition.notify_all()
+            self._reserved += nbytes
+            MEMORY_BUDGET_RESERVED.set(self._reserved)
+
+    async def release(self, nbytes: int) -> None:
+        """Gives back memory reserved by `acquire`."""
+        async with self._condition:
+            self._reserved -= nbytes
+            MEMORY_BUDGET_RESERVED.set(self._reserved)
+            self._condition.notify_all()
+
+    @asynccontextmanager
+    async def reserve(self, nbytes: int) -> AsyncIterator[None]:
+        """Holds `nbytes` of the budget for the duration of the block."""
+        await self.acquire(nbytes)
+        try:
+            yield
+        finally:
+            await self.release(nbytes)
+
+
+_memory_budget: MemoryBudget | None = None
+
+
+def get_memory_budget() -> MemoryBudget:
+    """
+    Returns the process-wide memory budget, creating it on first use.
+
+    Sized by `IMAGE_MEMORY_BUDGET_BYTES`; requests wait up to
+    `IMAGE_MEMORY_QUEUE_TIMEOUT` seconds for memory (0 rejects at once).
+    """
+    global _memory_budget
+    if _memory_budget is None:
+        _memory_budget = MemoryBudget(MEMORY_BUDGET_BYTES, MEMORY_QUEUE_TIMEOUT)
+    return _memory_budget
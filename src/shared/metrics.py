@@ -0,0 +1,261 @@
+import math
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Final, TypeVar
+
+# Seconds; covers the sub-millisecond CPU stages up to slow provider calls
+LATENCY_BUCKETS: Final[tuple[float, ...]] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120,
+)
+# Bytes; 1 KiB to 64 MiB
+SIZE_BUCKETS: Final[tuple[float, ...]] = tuple(float(1024 * 4 ** i) for i in range(9))
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = labels
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonic counter."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, labels)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = dict(self._values)
+        for key, value in values.items():
+            yield f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+
+
+class Gauge(_Metric):
+    """Value that goes up and down."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, labels)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = dict(self._values)
+        for key, value in values.items():
+            yield f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed buckets."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (+Inf last), sum]
+        self._values: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = {key: (list(counts), total[0]) for key, (counts, total) in self._values.items()}
+        for key, (counts, total) in values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                le = _format_labels(self.label_names, key, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            labels = _format_labels(self.label_names, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+M = TypeVar("M", bound=_Metric)
+
+
+class MetricsRegistry:
+    """Set of metrics rendered together in the Prometheus text format."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def _register(self, metric: M) -> M:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered.")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labels))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        """Exposition text (format 0.0.4) of every registered metric."""
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+METRICS: Final[MetricsRegistry] = MetricsRegistry()
+
+HTTP_REQUESTS = METRICS.counter(
+    "http_requests_total", "HTTP requests by route, method and status code.", ("method", "route", "status")
+)
+HTTP_REQUEST_DURATION = METRICS.histogram(
+    "http_request_duration_seconds", "HTTP request latency until the response is sent.", ("method", "route")
+)
+HTTP_REQUESTS_IN_FLIGHT = METRICS.gauge("http_requests_in_flight", "HTTP requests being processed.")
+HTTP_REQUEST_SIZE = METRICS.histogram(
+    "http_request_size_bytes", "HTTP request body sizes.", ("route",), SIZE_BUCKETS
+)
+HTTP_RESPONSE_SIZE = METRICS.histogram(
+    "http_response_size_bytes", "HTTP response body sizes.", ("route",), SIZE_BUCKETS
+)
+PROVIDER_CALLS = METRICS.counter(
+    "provider_calls_total", "Upstream provider call attempts by outcome.", ("provider", "outcome")
+)
+PROVIDER_CALL_DURATION = METRICS.histogram(
+    "provider_call_duration_seconds", "Upstream provider call attempt latency.", ("provider",)
+)
+PROVIDER_IN_FLIGHT = METRICS.gauge("provider_calls_in_flight", "Upstream provider calls in progress.", ("provider",))
+STAGE_DURATION = METRICS.histogram(
+    "stage_duration_seconds", "Time spent in each processing stage of a request.", ("stage",)
+)
+MEMORY_BUDGET_RESERVED = METRICS.gauge(
+    "image_memory_reserved_bytes", "Memory reserved by admitted image requests."
+)
+MEMORY_BUDGET_REJECTIONS = METRICS.counter(
+    "image_memory_rejections_total", "Requests refused by the image memory budget.", ("reason",)
+)
+LOG_RECORDS_DROPPED = METRICS.counter("log_records_dropped_total", "Log records dropped because the log queue was full.")
+CLIENT_DISCONNECTS = METRICS.counter(
+    "http_client_disconnects_total", "Requests whose work was cancelled because the client disconnected.", ("route",)
+)
+
+# Stage durations (seconds) of the current request, reported in its Server-Timing header
+_request_timings: ContextVar[dict[str, float] | None] = ContextVar("request_timings", default=None)
+
+
+def start_request_timings() -> dict[str, float]:
+    """Starts collecting the stage durations of the current request and returns them."""
+    timings: dict[str, float] = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """Records a stage duration in the histogram and in the current request's timings."""
+    STAGE_DURATION.observe(seconds, stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        # Stages repeated within a request (tiles, retries) add up
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+def record_stages(timings: dict[str, float]) -> None:
+    """Records durations measured elsewhere, e.g. in a CPU executor worker."""
+    for stage, seconds in timings.items():
+        record_stage(stage, seconds)
+
+
+@contextmanager
+def timed_stage(stage: str) -> Iterator[None]:
+    """
+    Times the enclosed block as a request stage. Works around `await`s too:
+
+        with timed_stage("encode"):
+            await run_cpu_bound(...)
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+
+def server_timing_header(timings: dict[str, float], total: float | None = None) -> str:
+    """Formats stage durations as a `Server-Timing` header value (milliseconds)."""
+    entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()]
+    if total is not None:
+        entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
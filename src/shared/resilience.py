@@ -0,0 +1,321 @@
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from enum import StrEnum
+from os import getenv
+from typing import Any, Awaitable, Callable, Final, TypeVar
+
+import httpx
+
+from src.shared.concurrency import ProviderBusyError, ProviderLimiter, get_provider_limiter
+from src.shared.metrics import PROVIDER_CALL_DURATION, PROVIDER_CALLS, PROVIDER_IN_FLIGHT, record_stage
+
+T = TypeVar("T")
+
+# Fragments of upstream error messages meaning "slow down" (Vertex quota, Space queue, ZeroGPU quota)
+THROTTLE_MARKERS: Final[tuple[str, ...]] = (
+    "429",
+    "resource_exhausted",
+    "quota",
+    "rate limit",
+    "too many requests",
+    "queue is full",
+)
+TRANSIENT_STATUS_CODES: Final[frozenset[int]] = frozenset({500, 502, 503, 504})
+TRANSIENT_MARKERS: Final[tuple[str, ...]] = ("unavailable", "deadline_exceeded", "timed out", "connection")
+
+
+class ErrorKind(StrEnum):
+    """How a failed provider call should be handled."""
+
+    THROTTLED = "throttled"
+    TRANSIENT = "transient"
+    FATAL = "fatal"
+
+
+class CircuitState(StrEnum):
+    """State of a circuit breaker."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(ProviderBusyError):
+    """Raised without calling the provider while its circuit breaker is open."""
+
+
+class ProviderThrottledError(ProviderBusyError):
+    """Raised when the provider kept throttling a call after every retry."""
+
+
+class ProviderCallError(RuntimeError):
+    """Raised when a provider call failed for good."""
+
+
+def classify_error(error: BaseException) -> ErrorKind:
+    """
+    Tells throttling and transient upstream failures apart from errors a
+    retry would not fix.
+
+    Args:
+        error: The exception raised by the provider SDK.
+
+    Returns:
+        The ErrorKind of the failure.
+    """
+    code = getattr(error, "code", None)
+    if code is None and isinstance(error, httpx.HTTPStatusError):
+        code = error.response.status_code
+    message = str(error).lower()
+    if code == 429 or any(marker in message for marker in THROTTLE_MARKERS):
+        return ErrorKind.THROTTLED
+    if isinstance(code, int) and code in TRANSIENT_STATUS_CODES:
+        return ErrorKind.TRANSIENT
+    if isinstance(error, (TimeoutError, ConnectionError, httpx.TransportError)):
+        return ErrorKind.TRANSIENT
+    if code is None and any(marker in message for marker in TRANSIENT_MARKERS):
+        return ErrorKind.TRANSIENT
+    return ErrorKind.FATAL
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Exponential backoff with full jitter."""
+
+    attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+
+    def delay(self, attempt: int) -> float:
+        """Random delay before retry number `attempt` (1-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class TokenBucket:
+    """Spaces provider calls to a sustained rate with a bounded burst."""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        """
+        Args:
+            rate: Tokens added per second.
+            capacity: Maximum number of tokens, i.e. the burst size.
+        """
+        if rate <= 0 or capacity < 1:
+            raise ValueError("The token bucket rate must be positive and its capacity at least 1.")
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """Waits until a token is available and takes it. Waiters are served in order."""
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+
+class CircuitBreaker:
+    """
+    Fails fast while a provider is down.
+
+    Opens after `failure_threshold` consecutive transient failures, rejects
+    calls for `reset_timeout` seconds, then lets a single probe call through:
+    its success closes the circuit, its failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float) -> None:
+        """
+        Args:
+            name: Provider name, used in error messages.
+            failure_threshold: Consecutive failures opening the circuit.
+            reset_timeout: Seconds the circuit stays open before a probe.
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    def before_call(self) -> None:
+        """Raises CircuitOpenError unless a call may go through."""
+        if self.state == CircuitState.OPEN:
+            remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+            if remaining > 0:
+                raise CircuitOpenError(f"{self.name} is failing; calls are suspended for {remaining:.0f}s.")
+            self.state = CircuitState.HALF_OPEN
+        if self.state == CircuitState.HALF_OPEN:
+            if self._probing:
+                raise CircuitOpenError(f"{self.name} is being probed after failures. Retry later.")
+            self._probing = True
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._probing = False
+        self.state = CircuitState.CLOSED
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._probing = False
+        if self.state == CircuitState.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self.state != CircuitState.OPEN:
+                logging.warning(f"Circuit of {self.name} opened after {self._failures} failures")
+            self.state = CircuitState.OPEN
+            self._opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Frees the probe slot of a call that ended without telling anything about the provider."""
+        self._probing = False
+
+
+class ProviderResilience:
+    """
+    Wraps every call to a provider with, in order: the circuit breaker, the
+    token-bucket rate limiter, the adaptive concurrency limiter and jittered
+    exponential retries of throttled or transient failures.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        limiter: ProviderLimiter,
+        retry: RetryPolicy,
+        breaker: CircuitBreaker,
+        bucket: TokenBucket | None = None,
+    ) -> None:
+        """
+        Args:
+            name: Provider name, used in error messages.
+            limiter: Adaptive concurrency limiter of the provider.
+            retry: Retry policy of throttled and transient failures.
+            breaker: Circuit breaker of the provider.
+            bucket: Optional rate limiter matched to the provider quota.
+        """
+        self.name = name
+        self.limiter = limiter
+        self.retry = retry
+        self.breaker = breaker
+        self.bucket = bucket
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Calls the provider through the resilience layer.
+
+        Args:
+            fn: Zero-argument coroutine function making one provider call.
+
+        Returns:
+            The result of the first successful attempt.
+        """
+        for attempt in range(1, self.retry.attempts + 1):
+            self.breaker.before_call()
+            try:
+                if self.bucket is not None:
+                    await self.bucket.acquire()
+                async with self.limiter:
+                    result = await self._timed_call(fn)
+                    self.limiter.record_success()
+            except asyncio.CancelledError:
+                # The caller went away (e.g. the client disconnected): not a provider failure
+                PROVIDER_CALLS.inc(provider=self.name, outcome="cancelled")
+                self.breaker.release()
+                raise
+            except ProviderBusyError:
+                self.breaker.release()
+                raise
+            except Exception as e:
+                kind = classify_error(e)
+                PROVIDER_CALLS.inc(provider=self.name, outcome=kind)
+                if kind == ErrorKind.THROTTLED:
+                    self.limiter.record_throttle()
+                    self.breaker.release()
+                elif kind == ErrorKind.TRANSIENT:
+                    self.breaker.record_failure()
+                else:
+                    # The provider answered: the request itself is at fault
+                    self.breaker.record_success()
+                    raise ProviderCallError(f"{self.name} call failed: {e}") from e
+
+                if attempt == self.retry.attempts:
+                    if kind == ErrorKind.THROTTLED:
+                        raise ProviderThrottledError(f"{self.name} is throttling requests: {e}") from e
+                    raise ProviderCallError(f"{self.name} call failed after {attempt} attempts: {e}") from e
+                delay = self.retry.delay(attempt)
+                logging.info(f"{self.name} call {kind} ({e}); retry {attempt} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            PROVIDER_CALLS.inc(provider=self.name, outcome="success")
+            self.breaker.record_success()
+            return result
+        raise AssertionError("unreachable")
+
+    async def _timed_call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """Runs one attempt, recording its latency and the in-flight gauge."""
+        started = time.perf_counter()
+        PROVIDER_IN_FLIGHT.inc(provider=self.name)
+        try:
+            return await fn()
+        finally:
+            PROVIDER_IN_FLIGHT.dec(provider=self.name)
+            elapsed = time.perf_counter() - started
+            PROVIDER_CALL_DURATION.observe(elapsed, provider=self.name)
+            record_stage(self.name, elapsed)
+
+    def describe(self) -> dict[str, Any]:
+        """Current state of the layer, serializable as JSON."""
+        return {
+            "circuit": self.breaker.state,
+            "concurrency_limit": self.limiter.limit,
+            "in_flight": self.limiter.in_flight,
+        }
+
+
+_resilience: dict[str, ProviderResilience] = {}
+
+
+def get_provider_resilience(name: str) -> ProviderResilience:
+    """
+    Returns the process-wide resilience layer of a provider, creating it on first use.
+
+    Configured through `<NAME>_RETRY_ATTEMPTS`, `<NAME>_RETRY_BASE_DELAY`,
+    `<NAME>_RETRY_MAX_DELAY`, `<NAME>_REQUESTS_PER_MINUTE` (0 disables the
+    rate limiter), `<NAME>_RATE_BURST`, `<NAME>_BREAKER_THRESHOLD` and
+    `<NAME>_BREAKER_RESET_TIMEOUT`, on top of the limiter settings.
+    """
+    if name not in _resilience:
+        env_prefix = name.upper()
+        requests_per_minute = float(getenv(f"{env_prefix}_REQUESTS_PER_MINUTE", "0"))
+        bucket = None
+        if requests_per_minute > 0:
+            burst = float(getenv(f"{env_prefix}_RATE_BURST", str(max(1.0, requests_per_minute / 60))))
+            bucket = TokenBucket(requests_per_minute / 60, burst)
+        _resilience[name] = ProviderResilience(
+            name,
+            limiter=get_provider_limiter(name),
+            retry=RetryPolicy(
+                attempts=int(getenv(f"{env_prefix}_RETRY_ATTEMPTS", "3")),
+                base_delay=float(getenv(f"{env_prefix}_RETRY_BASE_DELAY", "0.5")),
+                max_delay=float(getenv(f"{env_prefix}_RETRY_MAX_DELAY", "8")),
+            ),
+            breaker=CircuitBreaker(
+                name,
+                failure_threshold=int(getenv(f"{env_prefix}_BREAKER_THRESHOLD", "5")),
+                reset_timeout=float(getenv(f"{env_prefix}_BREAKER_RESET_TIMEOUT", "30")),
+            ),
+            bucket=bucket,
+        )
+    return _resilience[name]
@@ -0,0 +1,77 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Call(Generic[T]):
+    task: "asyncio.Task[T]"
+    waiters: int = 0
+
+
+@dataclass
+class SingleFlightStats:
+    """Counters of a SingleFlight group."""
+
+    leaders: int = 0
+    followers: int = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key starts the work; callers arriving while it is
+    in flight await the same task and receive its result or its exception.
+    A caller that is cancelled only detaches itself: the shared task is
+    cancelled when its last waiter goes away.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[str, _Call[Any]] = {}
+        self.stats = SingleFlightStats()
+
+    @property
+    def in_flight(self) -> int:
+        """Number of distinct keys currently executing."""
+        return len(self._calls)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Runs `fn()` unless a call with the same key is already in flight,
+        in which case its result is shared.
+
+        Args:
+            key: Identity of the work, e.g. a content hash of the request.
+            fn: Zero-argument coroutine function performing the work.
+
+        Returns:
+            The result of the (possibly shared) call.
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(task=asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.stats.leaders += 1
+        else:
+            self.stats.followers += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _forget(self, key: str, call: _Call[Any]) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Mark the exception as retrieved when every waiter left before completion
+        if not call.task.cancelled():
+            call.task.exception()
@@ -0,0 +1,50 @@
+import asyncio
+import logging
+
+from src.shared.helpers.temp_files import sweep_directory
+
+
+class DirectorySweeper:
+    """
+    Background task enforcing a disk budget on a directory at a fixed interval,
+    for files left behind by crashed or cancelled requests.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, max_age: float, interval: float) -> None:
+        """
+        Args:
+            directory: The directory to keep under budget.
+            max_bytes: Total size budget, in bytes.
+            max_age: Maximum file age, in seconds.
+            interval: Seconds between two sweeps.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+    async def sweep(self) -> int:
+        """Runs one sweep off the event loop and returns the number of deleted files."""
+        deleted = await asyncio.to_thread(sweep_directory, self.directory, self.max_bytes, self.max_age)
+        if deleted:
+            logging.info(f"Swept {deleted} stale files from {self.directory}")
+        return deleted
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                logging.warning(f"Sweeping {self.directory} failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name=f"sweeper:{self.directory}")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None